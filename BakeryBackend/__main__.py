@@ -0,0 +1,77 @@
+"""
+Command line entry point for Bakery Backend
+
+    python -m BakeryBackend serve [--host HOST] [--port PORT] [--workers N]
+    python -m BakeryBackend init-db
+    python -m BakeryBackend rebalance --shards N --url-template URL
+"""
+
+import argparse
+import logging
+
+from BakeryBackend.config import get_settings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m BakeryBackend", description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="set up the schema once, then serve from forked workers")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8000)
+    serve_parser.add_argument(
+        "--workers", type=int, default=0,
+        help="worker processes (default: BAKERY_SERVER_WORKERS, else one per CPU)"
+    )
+    commands.add_parser("init-db", help="create tables and indexes, then exit")
+    rebalance_parser = commands.add_parser(
+        "rebalance", help="copy the current database or shards into a new set of shard files"
+    )
+    rebalance_parser.add_argument("--shards", type=int, required=True, help="shard count of the new layout")
+    rebalance_parser.add_argument(
+        "--url-template", required=True,
+        help="URL of each new shard file, with {shard} (must differ from the current files)"
+    )
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    settings = get_settings()
+
+    if args.command == "serve":
+        from BakeryBackend.server import serve
+        serve(settings, host=args.host, port=args.port, workers=args.workers)
+    elif args.command == "init-db":
+        from BakeryBackend.main import setup_storage
+        setup_storage()
+    elif args.command == "rebalance":
+        rebalance(settings, args.shards, args.url_template)
+
+
+def rebalance(settings, shards: int, url_template: str):
+    """Copy the configured storage into shards new files and print the new settings"""
+    import json
+    from BakeryBackend.database import database
+    from BakeryBackend.main import setup_database
+    from BakeryBackend.sharding import rebalance as copy_into, shard_urls
+    from sqlalchemy import create_engine
+
+    if shards < 1 or "{shard}" not in url_template:
+        raise SystemExit("--shards must be positive and --url-template must contain {shard}")
+    sources = database.shards.engines if database.shards is not None else [database.engine]
+    targets = [create_engine(url) for url in shard_urls(url_template, shards)]
+    if {str(e.url) for e in targets} & {str(e.url) for e in sources}:
+        raise SystemExit("The new shard files must not be the current ones")
+    try:
+        result = copy_into(sources, targets, setup_database)
+    finally:
+        for target in targets:
+            target.dispose()
+    print(json.dumps(result))
+    if shards == 1:
+        print(f"Now set BAKERY_DB_SHARDS=1 BAKERY_DATABASE_URL={url_template.format(shard=0)}")
+    else:
+        print(f"Now set BAKERY_DB_SHARDS={shards} BAKERY_DB_SHARD_URL_TEMPLATE={url_template}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Admission control and rate limiting (BAKERY_ADMISSION_* / BAKERY_RATE_LIMIT_*).
+
+AdmissionMiddleware is plain ASGI and runs before any routing work. With a
+global cap, at most max_in_flight requests are served at once. Up to
+max_queue more wait in FIFO order, each for at most max_queue_wait_seconds.
+Anything beyond that gets a 503 with Retry-After right away, instead of
+joining a threadpool and database pool backlog where every request would
+eventually time out.
+
+Mutating /favorites requests also draw from token buckets keyed by user_id
+and by client IP, and get a 429 when either is empty. user_id is taken from
+the path, the query string, or the top-level "user_id" of a small JSON body
+(which is buffered and replayed to the app). Bulk adds carry many users and
+are limited per IP only. The client IP is the ASGI peer address; behind a
+proxy, run uvicorn with --proxy-headers so that it is the real client.
+
+/health, /metrics and the event streams are never queued or shed: probes
+must answer during overload, and a long-lived stream would hold a slot
+for its whole life.
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+from urllib.parse import parse_qs
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from BakeryBackend.exception_handlers import create_error_response
+from BakeryBackend.metrics import admission_decisions, admission_queue_depth, admission_queue_wait
+
+EXEMPT_PATHS = ("/health", "/metrics")
+EXEMPT_SUFFIXES = ("/stream",)
+
+MUTATING_METHODS = frozenset(("POST", "PUT", "PATCH", "DELETE"))
+# POST routes under /favorites that only read
+READ_ONLY_SUFFIXES = ("/check",)
+
+# Largest request body buffered to find its user_id
+USER_ID_BODY_MAX_BYTES = 64 * 1024
+
+
+class TokenBuckets:
+    """Per-key token buckets refilled at rate tokens per second, holding at most burst"""
+
+    def __init__(self, rate: float, burst: int, clock=time.monotonic, max_keys: int = 100000):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.max_keys = max_keys
+        self._buckets: Dict[str, Tuple[float, float]] = {}  # key -> (tokens, updated_at)
+
+    def take(self, key: str) -> float:
+        """Take a token for key; returns 0 when allowed, else seconds until one is available"""
+        now = self.clock()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            tokens = float(self.burst)
+        else:
+            tokens = min(float(self.burst), bucket[0] + (now - bucket[1]) * self.rate)
+        if tokens >= 1:
+            self._buckets[key] = (tokens - 1, now)
+            return 0.0
+        self._buckets[key] = (tokens, now)
+        return (1 - tokens) / self.rate
+
+    def _prune(self, now: float):
+        # Buckets idle long enough to have refilled are the same as absent ones
+        refill_seconds = self.burst / self.rate
+        for key in [key for key, (_, updated_at) in self._buckets.items() if now - updated_at >= refill_seconds]:
+            del self._buckets[key]
+        if len(self._buckets) >= self.max_keys:
+            self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+def _user_id_from_target(scope: Scope) -> Optional[str]:
+    """user_id from a /favorites/user/{user_id}/... path or a user_id query parameter"""
+    parts = scope["path"].split("/")
+    if len(parts) > 3 and parts[2] == "user" and parts[3].isdigit():
+        return parts[3]
+    if scope.get("query_string"):
+        values = parse_qs(scope["query_string"].decode("latin-1")).get("user_id")
+        if values and values[0].isdigit():
+            return values[0]
+    return None
+
+
+def _user_id_from_body(body: bytes) -> Optional[str]:
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return None
+    user_id = payload.get("user_id") if isinstance(payload, dict) else None
+    return str(user_id) if isinstance(user_id, int) and not isinstance(user_id, bool) else None
+
+
+class AdmissionMiddleware:
+    """Global in-flight cap with a bounded wait queue, plus per-user/per-IP rate limits on writes"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_in_flight: int = 0,
+        max_queue: int = 100,
+        max_queue_wait_seconds: float = 1.0,
+        retry_after_seconds: int = 1,
+        user_buckets: Optional[TokenBuckets] = None,
+        ip_buckets: Optional[TokenBuckets] = None
+    ):
+        self.app = app
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_queue_wait_seconds = max_queue_wait_seconds
+        self.retry_after_seconds = retry_after_seconds
+        self.user_buckets = user_buckets
+        self.ip_buckets = ip_buckets
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        path = scope.get("path", "")
+        if scope["type"] != "http" or path in EXEMPT_PATHS or path.endswith(EXEMPT_SUFFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        if (self.user_buckets is not None or self.ip_buckets is not None) and self._is_write(scope):
+            receive, wait_seconds, limit = await self._take_tokens(scope, receive)
+            if wait_seconds:
+                admission_decisions.inc(decision=f"rate_limited_{limit}")
+                await self._reject(scope, receive, send, 429, "RateLimitError", "Too many requests", {
+                    "limit": limit, "retry_after_seconds": round(wait_seconds, 3)
+                }, wait_seconds)
+                return
+
+        if self.max_in_flight <= 0:
+            await self.app(scope, receive, send)
+            return
+        if not await self._acquire():
+            admission_decisions.inc(decision="shed")
+            await self._reject(scope, receive, send, 503, "ServiceUnavailable", "Server is overloaded", {
+                "max_in_flight": self.max_in_flight, "queued": len(self._waiters)
+            }, self.retry_after_seconds)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._release()
+
+    @staticmethod
+    def _is_write(scope: Scope) -> bool:
+        path = scope["path"]
+        return (
+            scope["method"] in MUTATING_METHODS
+            and path.startswith("/favorites")
+            and not path.endswith(READ_ONLY_SUFFIXES)
+        )
+
+    async def _take_tokens(self, scope: Scope, receive: Receive) -> Tuple[Receive, float, str]:
+        """Charge the request's buckets; returns (receive to use, seconds to wait or 0, limit name)"""
+        if self.ip_buckets is not None:
+            client = scope.get("client")
+            wait_seconds = self.ip_buckets.take(client[0] if client else "unknown")
+            if wait_seconds:
+                return receive, wait_seconds, "ip"
+        if self.user_buckets is None:
+            return receive, 0.0, ""
+
+        user_id = _user_id_from_target(scope)
+        if user_id is None:
+            receive, body = await self._buffer_body(scope, receive)
+            user_id = _user_id_from_body(body) if body else None
+        if user_id is None:
+            return receive, 0.0, ""
+        return receive, self.user_buckets.take(user_id), "user"
+
+    @staticmethod
+    async def _buffer_body(scope: Scope, receive: Receive) -> Tuple[Receive, bytes]:
+        """Read a small body up front, returning a receive that replays it to the app"""
+        content_length = next((value for key, value in scope["headers"] if key == b"content-length"), None)
+        if content_length is None or not content_length.isdigit() or int(content_length) > USER_ID_BODY_MAX_BYTES:
+            return receive, b""
+        messages = []
+        while True:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request" or not message.get("more_body", False):
+                break
+        body = b"".join(message.get("body", b"") for message in messages if message["type"] == "http.request")
+
+        async def replay() -> Message:
+            if messages:
+                return messages.pop(0)
+            return await receive()
+        return replay, body
+
+    async def _acquire(self) -> bool:
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            admission_decisions.inc(decision="admitted")
+            return True
+        if len(self._waiters) >= self.max_queue:
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        admission_queue_depth.set(len(self._waiters))
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(future, self.max_queue_wait_seconds)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            self._abandon(future)
+            raise
+        admission_queue_wait.observe(time.perf_counter() - start)
+        if future.done() and not future.cancelled():
+            admission_decisions.inc(decision="admitted_after_queue")
+            return True
+        self._abandon(future)
+        return False
+
+    def _abandon(self, future: asyncio.Future):
+        """Leave the queue; a slot handed over just as the wait ended is passed on"""
+        if future.done() and not future.cancelled():
+            self._release()
+        else:
+            future.cancel()
+        try:
+            self._waiters.remove(future)
+        except ValueError:
+            pass
+        admission_queue_depth.set(len(self._waiters))
+
+    def _release(self):
+        # Hand the slot straight to the oldest waiter still waiting
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                admission_queue_depth.set(len(self._waiters))
+                return
+        self.in_flight -= 1
+        admission_queue_depth.set(0)
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send, status_code: int, error_type: str,
+                      message: str, details: dict, retry_after: float):
+        response = create_error_response(
+            status_code=status_code,
+            error_type=error_type,
+            message=message,
+            details=details,
+            request_id=scope.get("state", {}).get("request_id")
+        )
+        response.headers["Retry-After"] = str(max(1, int(retry_after + 0.999)))
+        await response(scope, receive, send)
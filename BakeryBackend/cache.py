@@ -0,0 +1,278 @@
+"""
+Read-through cache for per-user favorites lists
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from starlette.requests import Request
+
+from BakeryBackend.config import Settings, get_settings
+
+
+def user_favorites_key(user_id: int) -> str:
+    return f"favorites:user:{user_id}"
+
+
+class WriteLog:
+    """
+    Sequence numbers of the latest invalidations, for the generation guard.
+
+    token() is taken before reading from the database, and stale(key, token)
+    before storing what was read: it is true when key was invalidated since.
+    Only the last max_keys invalidated keys are remembered. A token older than
+    the newest forgotten invalidation counts as stale, so memory stays bounded
+    and no write is missed; a slow reader just skips storing. Not thread-safe,
+    callers hold their own lock.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max(1, max_keys)
+        self._seq = 0
+        self._floor = 0
+        self._written: "OrderedDict[Hashable, int]" = OrderedDict()
+
+    def token(self) -> int:
+        return self._seq
+
+    def invalidate(self, key: Hashable):
+        self._seq += 1
+        self._written[key] = self._seq
+        self._written.move_to_end(key)
+        while len(self._written) > self.max_keys:
+            _, self._floor = self._written.popitem(last=False)
+
+    def stale(self, key: Hashable, token: int) -> bool:
+        return token < self._floor or self._written.get(key, 0) > token
+
+    def __len__(self) -> int:
+        return len(self._written)
+
+
+class Cache:
+    """
+    Cache interface used by the favorites routes.
+
+    Readers take generation(key) before loading from the database and pass it
+    to set(); a write that invalidated the key in between makes set() a no-op,
+    so a slow reader cannot put a pre-write list back into the cache.
+    """
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, generation: Optional[int] = None):
+        raise NotImplementedError
+
+    def invalidate(self, key: str):
+        raise NotImplementedError
+
+    def generation(self, key: str) -> int:
+        return 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class NullCache(Cache):
+    """Caching disabled: every read goes to the database"""
+
+    def get(self, key: str) -> Optional[Any]:
+        return None
+
+    def set(self, key: str, value: Any, generation: Optional[int] = None):
+        pass
+
+    def invalidate(self, key: str):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "none"}
+
+
+class LRUCache(Cache):
+    """In-process LRU with a TTL and entry/byte budgets"""
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (value, size, expires_at)
+        # Invalidations of as many keys as the cache holds entries
+        self._writes = WriteLog(max_entries)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, size, expires_at = entry
+            if expires_at <= self._clock():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, generation: Optional[int] = None):
+        size = len(json.dumps(value, separators=(",", ":")))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if generation is not None and self._writes.stale(key, generation):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, self._clock() + self.ttl_seconds)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._writes.invalidate(key)
+            if key in self._entries:
+                self._remove(key)
+
+    def generation(self, key: str) -> int:
+        with self._lock:
+            return self._writes.token()
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "bytes": self._bytes
+            }
+
+
+class LocalRemoteClient:
+    """
+    In-process stand-in for a Redis client (get / set with ex / delete), for
+    tests and single-machine setups without a cache server
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._data: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(name)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= self._clock():
+                del self._data[name]
+                return None
+            return value
+
+    def set(self, name: str, value: bytes, ex: Optional[float] = None):
+        with self._lock:
+            self._data[name] = (value, self._clock() + ex if ex else None)
+
+    def delete(self, *names: str):
+        with self._lock:
+            for name in names:
+                self._data.pop(name, None)
+
+
+class RemoteCache(Cache):
+    """
+    Out-of-process cache over a Redis-compatible client. Expiry and eviction
+    are left to the server; invalidation is a DEL, so the generation guard
+    only covers readers in this process.
+    """
+
+    def __init__(self, client, ttl_seconds: float = 60.0, max_tracked_writes: int = 10000):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self._writes = WriteLog(max_tracked_writes)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self.client.get(key)
+        with self._lock:
+            if raw is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key: str, value: Any, generation: Optional[int] = None):
+        if generation is not None:
+            with self._lock:
+                if self._writes.stale(key, generation):
+                    return
+        self.client.set(key, json.dumps(value, separators=(",", ":")).encode(), ex=self.ttl_seconds)
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._writes.invalidate(key)
+        self.client.delete(key)
+
+    def generation(self, key: str) -> int:
+        with self._lock:
+            return self._writes.token()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"backend": "redis", "hits": self.hits, "misses": self.misses}
+
+
+def build_cache(settings: Settings) -> Cache:
+    if settings.cache_backend == "memory":
+        return LRUCache(
+            max_entries=settings.cache_max_entries,
+            max_bytes=settings.cache_max_bytes,
+            ttl_seconds=settings.cache_ttl_seconds
+        )
+    if settings.cache_backend == "redis":
+        # Optional dependency, only needed when the redis backend is selected
+        import redis
+
+        return RemoteCache(
+            redis.Redis.from_url(settings.cache_redis_url), settings.cache_ttl_seconds, settings.cache_max_entries
+        )
+    return NullCache()
+
+
+# Process-wide cache for apps assembled by hand; create_app builds one per app
+favorites_cache = build_cache(get_settings())
+
+
+def get_favorites_cache(request: Request) -> Cache:
+    return getattr(request.app.state, "favorites_cache", favorites_cache)
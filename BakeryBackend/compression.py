@@ -0,0 +1,266 @@
+"""
+Response compression (BAKERY_COMPRESSION_*).
+
+CompressionMiddleware is plain ASGI, like the middleware in middleware.py.
+It picks the encoding the client prefers (by Accept-Encoding q-value, with
+the configured order breaking ties) out of zstd, br and gzip. gzip comes
+from the standard library; br and zstd are offered only when the brotli /
+zstandard packages are installed.
+
+Bodies smaller than minimum_size are sent as they are: compressing a short
+JSON object costs more CPU than the bytes it saves. Streaming responses
+(the exports) are compressed chunk by chunk and flushed after every chunk,
+so rows still reach the client as they are produced.
+
+A compressed body is a different representation, so its strong ETag is
+sent weakened (W/"..."). If-None-Match uses weak comparison, so either form
+still revalidates to a 304. With a CompressedBodyCache, bodies that carry
+an ETag are compressed once per (path, ETag, encoding): a hot list page is
+then compressed on its first request only.
+"""
+
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from BakeryBackend.config import COMPRESSION_ENCODINGS
+from BakeryBackend.metrics import compressed_responses
+
+try:
+    import brotli
+except ModuleNotFoundError:  # optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ModuleNotFoundError:  # optional dependency
+    zstandard = None
+
+ENCODINGS = COMPRESSION_ENCODINGS
+
+DEFAULT_LEVELS = {"gzip": 6, "br": 4, "zstd": 3}
+
+# Content types worth compressing; images and the like are already compressed
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+# Event streams are long-lived and mostly idle: a compressor per connection
+# would cost far more memory than their small frames save
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+
+
+class GzipEncoder:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip container
+
+    def encode(self, data: bytes, final: bool) -> bytes:
+        out = self._compressor.compress(data)
+        return out + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class BrotliEncoder:
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def encode(self, data: bytes, final: bool) -> bytes:
+        out = self._compressor.process(data)
+        return out + (self._compressor.finish() if final else self._compressor.flush())
+
+
+class ZstdEncoder:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def encode(self, data: bytes, final: bool) -> bytes:
+        out = self._compressor.compress(data)
+        return out + self._compressor.flush(
+            zstandard.COMPRESSOBJ_FLUSH_FINISH if final else zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        )
+
+
+ENCODERS = {"gzip": GzipEncoder}
+if brotli is not None:
+    ENCODERS["br"] = BrotliEncoder
+if zstandard is not None:
+    ENCODERS["zstd"] = ZstdEncoder
+
+
+def available_encodings(encodings: Iterable[str]) -> Tuple[str, ...]:
+    """The configured encodings whose codec is installed, in preference order"""
+    return tuple(encoding for encoding in encodings if encoding in ENCODERS)
+
+
+@lru_cache(maxsize=256)
+def negotiate(accept_encoding: str, offered: Tuple[str, ...]) -> Optional[str]:
+    """
+    Pick the offered encoding with the highest q-value in Accept-Encoding;
+    ties go to the earlier entry of offered. None when nothing acceptable is offered
+    """
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in offered:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class CompressedBodyCache:
+    """LRU of compressed bodies keyed by (path, ETag, encoding), with entry/byte budgets"""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> Optional[bytes]:
+        body = self._entries.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def set(self, key: tuple, body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._bytes -= len(self._entries.pop(key))
+        self._entries[key] = body
+        self._bytes += len(body)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self._bytes}
+
+
+class CompressionMiddleware:
+    """Compress response bodies in the best encoding the client accepts"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        encodings: Iterable[str] = ENCODINGS,
+        minimum_size: int = 500,
+        levels: Optional[Dict[str, int]] = None,
+        cache: Optional[CompressedBodyCache] = None
+    ):
+        self.app = app
+        self.encodings = available_encodings(encodings)
+        self.minimum_size = minimum_size
+        self.levels = {**DEFAULT_LEVELS, **(levels or {})}
+        self.cache = cache
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = next(
+            (value.decode("latin-1") for key, value in scope["headers"] if key == b"accept-encoding"), None
+        )
+        encoding = negotiate(accept_encoding, self.encodings) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        encoder = None
+
+        async def send_compressed(message: Message):
+            nonlocal start_message, encoder
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether to compress
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                if start_message is not None:
+                    await send(start_message)
+                    start_message = None
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start_message is None:
+                # Later chunks of a response already being sent
+                if encoder is not None:
+                    message = {
+                        "type": "http.response.body",
+                        "body": encoder.encode(body, final=not more_body),
+                        "more_body": more_body
+                    }
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            headers = MutableHeaders(scope=start)
+            if not self.should_compress(headers, body, more_body):
+                await send(start)
+                await send(message)
+                return
+
+            etag = headers.get("etag")
+            if more_body:
+                encoder = ENCODERS[encoding](self.levels[encoding])
+                body = encoder.encode(body, final=False)
+                del headers["content-length"]
+                compressed_responses.inc(encoding=encoding, source="stream")
+            else:
+                body = self.compress_body(scope["path"], etag, encoding, body)
+                headers["content-length"] = str(len(body))
+            headers["content-encoding"] = encoding
+            headers.add_vary_header("Accept-Encoding")
+            if etag and not etag.startswith("W/"):
+                headers["etag"] = "W/" + etag
+            await send(start)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+    def should_compress(self, headers: Headers, body: bytes, more_body: bool) -> bool:
+        if "content-encoding" in headers or "no-transform" in headers.get("cache-control", ""):
+            return False
+        content_type = headers.get("content-type", "")
+        if not content_type.startswith(COMPRESSIBLE_TYPES) or content_type.startswith(UNCOMPRESSED_TYPES):
+            return False
+        if more_body:
+            # Streaming: only the declared length, if any, says how big it will get
+            content_length = headers.get("content-length")
+            return content_length is None or int(content_length) >= self.minimum_size
+        return len(body) >= self.minimum_size
+
+    def compress_body(self, path: str, etag: Optional[str], encoding: str, body: bytes) -> bytes:
+        key = (path, etag, encoding)
+        if self.cache is not None and etag:
+            compressed = self.cache.get(key)
+            if compressed is not None:
+                compressed_responses.inc(encoding=encoding, source="cache")
+                return compressed
+        compressed = ENCODERS[encoding](self.levels[encoding]).encode(body, final=True)
+        compressed_responses.inc(encoding=encoding, source="compressed")
+        if self.cache is not None and etag:
+            self.cache.set(key, compressed)
+        return compressed
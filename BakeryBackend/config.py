@@ -0,0 +1,221 @@
+"""
+Runtime configuration for Bakery Backend, read from BAKERY_* environment variables
+"""
+
+import os
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from typing import Mapping, Optional, Tuple
+
+from starlette.requests import Request
+
+# Always place favorites.db in the BakeryBackend directory
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATABASE_URL = f"sqlite:///{os.path.join(BASE_DIR, 'favorites.db')}"
+
+DB_MODES = ("sync", "async")
+CACHE_BACKENDS = ("none", "memory", "redis")
+COMPRESSION_ENCODINGS = ("zstd", "br", "gzip")
+
+# Async drivers used when BAKERY_ASYNC_DATABASE_URL is not set
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Swap a sync database URL's driver for its asyncio counterpart"""
+    scheme, sep, rest = url.partition("://")
+    dialect = scheme.split("+", 1)[0]
+    if dialect not in ASYNC_DRIVERS:
+        raise ValueError(f"No default async driver for database URL scheme '{scheme}'")
+    return f"{ASYNC_DRIVERS[dialect]}{sep}{rest}"
+
+
+def _parse_env_value(raw: str, annotation):
+    """Convert an environment variable string to a Settings field's type"""
+    if annotation is bool:
+        return raw.strip().lower() in ("1", "true", "yes", "on")
+    if annotation is int:
+        return int(raw)
+    if annotation is float:
+        return float(raw)
+    return raw
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Each field is read from the BAKERY_<FIELD_NAME> environment variable"""
+
+    database_url: str = DEFAULT_DATABASE_URL
+    # "sync" serves the favorites routes from blocking sessions on the threadpool,
+    # "async" from an AsyncSession on the event loop
+    db_mode: str = "sync"
+    async_database_url: Optional[str] = None
+
+    # Hash-sharded storage (see sharding.py): with db_shards > 1, favorites are
+    # spread by user_id over the SQLite files db_shard_url_template names with
+    # {shard}, and database_url is not used. Sync mode only, without a replica or
+    # group commit. Changing db_shards needs `python -m BakeryBackend rebalance`
+    db_shards: int = 1
+    db_shard_url_template: str = "sqlite:///./favorites-shard{shard}.db"
+
+    # Connection pool (ignored for in-memory SQLite, which uses a single connection)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_pre_ping: bool = False
+    db_pool_recycle: int = -1
+
+    # Connect-time PRAGMAs applied to every SQLite connection
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+
+    # Create tables and indexes when the app starts. `python -m BakeryBackend serve`
+    # does this once before forking and turns it off in its workers
+    db_create_schema: bool = True
+
+    # Worker processes for `serve`; 0 sizes them to the CPUs this process may use
+    server_workers: int = 0
+    # Seconds a stopping worker gets to finish in-flight requests
+    server_graceful_timeout: float = 30.0
+
+    # Read replica for the read-only favorites endpoints. Replicas may trail the
+    # primary by up to replica_max_lag_seconds: for that long after a user or
+    # item is written, its reads stay on the primary (tracked per process)
+    replica_database_url: Optional[str] = None
+    replica_max_lag_seconds: float = 2.0
+
+    # Commit favorite adds/deletes in batches from a background writer, every
+    # group_commit_max_ops writes or group_commit_max_delay_ms (see group_commit.py)
+    group_commit: bool = False
+    group_commit_max_ops: int = 256
+    group_commit_max_delay_ms: float = 5.0
+
+    # Admission control (see admission.py). At most admission_max_in_flight
+    # requests are served at once; up to admission_max_queue more wait, each for
+    # at most admission_max_queue_wait_seconds, and the rest get 503 with
+    # Retry-After. 0 disables the cap
+    admission_max_in_flight: int = 0
+    admission_max_queue: int = 100
+    admission_max_queue_wait_seconds: float = 1.0
+    admission_retry_after_seconds: int = 1
+
+    # Token buckets for mutating /favorites requests, per user_id and per client
+    # IP: *_rate tokens per second with bursts of up to *_burst. A rate of 0
+    # disables that limit; an empty bucket answers 429
+    rate_limit_user_rate: float = 0.0
+    rate_limit_user_burst: int = 20
+    rate_limit_ip_rate: float = 0.0
+    rate_limit_ip_burst: int = 100
+
+    # Seconds /health waits for SELECT 1 before reporting the database unavailable
+    health_db_timeout_seconds: float = 1.0
+
+    # Fraction of requests whose start/completion lines are logged
+    request_log_sample_rate: float = 1.0
+
+    # Log lines per error type per second from the exception handlers; the
+    # rest are counted and reported with the next line. 0 disables the limit
+    error_log_max_per_second: float = 10.0
+
+    # Page size for the user/item favorites listings
+    page_default_limit: int = 100
+    page_max_limit: int = 1000
+    # Cache-Control sent with the listings' ETags; clients revalidate with If-None-Match
+    list_cache_control: str = "private, no-cache"
+
+    # Compress responses of at least compression_minimum_size bytes with the
+    # first of compression_encodings the client accepts (br and zstd need the
+    # brotli / zstandard packages and are skipped without them; empty disables
+    # compression). compression_cache_entries > 0 keeps compressed bodies of
+    # ETag-carrying responses so hot list pages are compressed once
+    compression_encodings: str = "zstd,br,gzip"
+    compression_minimum_size: int = 500
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+    compression_zstd_level: int = 3
+    compression_cache_entries: int = 0
+    compression_cache_max_bytes: int = 16 * 1024 * 1024
+
+    # Encode list pages straight from row tuples instead of re-validating
+    # each row against the Favorite schema (see responses.py)
+    fast_json_lists: bool = False
+
+    # In-process per-user membership index for favorite checks. Off by default:
+    # it only sees writes made by its own process
+    membership_index: bool = False
+    membership_max_users: int = 100000
+    membership_max_bytes: int = 64 * 1024 * 1024
+
+    # Server-sent events feed at GET /favorites/{user_id}/stream. Off by default:
+    # like the membership index it only sees writes made by its own process.
+    # Subscribers more than event_stream_queue_size events behind are dropped;
+    # the last event_stream_ring_size events can be resumed with Last-Event-ID
+    event_stream: bool = False
+    event_stream_queue_size: int = 64
+    event_stream_ring_size: int = 1024
+    event_stream_heartbeat_seconds: float = 15.0
+
+    # Coalesce concurrent identical list requests (user and item favorites) into
+    # one database read (see singleflight.py). single_flight_window_ms > 0 also
+    # shares a finished read with identical requests arriving that soon after
+    single_flight: bool = False
+    single_flight_window_ms: float = 0.0
+
+    # Per-user favorites list cache. Off by default: with several workers an
+    # in-process cache only sees its own worker's invalidations
+    cache_backend: str = "none"
+    cache_ttl_seconds: float = 60.0
+    cache_max_entries: int = 10000
+    cache_max_bytes: int = 64 * 1024 * 1024
+    cache_redis_url: str = "redis://localhost:6379/0"
+
+    def __post_init__(self):
+        if self.db_mode not in DB_MODES:
+            raise ValueError(f"BAKERY_DB_MODE must be one of {DB_MODES}, got '{self.db_mode}'")
+        if self.cache_backend not in CACHE_BACKENDS:
+            raise ValueError(
+                f"BAKERY_CACHE_BACKEND must be one of {CACHE_BACKENDS}, got '{self.cache_backend}'"
+            )
+        unknown = set(self.compression_encoding_list) - set(COMPRESSION_ENCODINGS)
+        if unknown:
+            raise ValueError(
+                f"BAKERY_COMPRESSION_ENCODINGS may only list {COMPRESSION_ENCODINGS}, got {sorted(unknown)}"
+            )
+        if self.db_shards > 1:
+            if "{shard}" not in self.db_shard_url_template:
+                raise ValueError("BAKERY_DB_SHARD_URL_TEMPLATE must contain {shard}")
+            if self.db_mode != "sync" or self.replica_database_url or self.group_commit:
+                raise ValueError(
+                    "BAKERY_DB_SHARDS > 1 requires BAKERY_DB_MODE=sync, no replica and no group commit"
+                )
+        if self.db_mode == "async" and self.async_database_url is None:
+            object.__setattr__(self, "async_database_url", to_async_url(self.database_url))
+
+    @property
+    def compression_encoding_list(self) -> Tuple[str, ...]:
+        return tuple(name.strip() for name in self.compression_encodings.split(",") if name.strip())
+
+    @classmethod
+    def from_env(cls, environ: Optional[Mapping[str, str]] = None) -> "Settings":
+        environ = os.environ if environ is None else environ
+        values = {}
+        for field in fields(cls):
+            raw = environ.get(f"BAKERY_{field.name.upper()}")
+            if raw is not None:
+                values[field.name] = _parse_env_value(raw, field.type)
+        return cls(**values)
+
+
+@lru_cache
+def get_settings() -> Settings:
+    return Settings.from_env()
+
+
+def get_app_settings(request: Request) -> Settings:
+    """Dependency returning the settings of the app serving the request (create_app's), else the process settings"""
+    return getattr(request.app.state, "settings", None) or get_settings()
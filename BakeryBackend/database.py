@@ -1,19 +1,327 @@
-from sqlalchemy import create_engine
+import asyncio
+import json
+import math
+import time
+from typing import Optional
+from fastapi import Depends, Request
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import os
+from sqlalchemy.pool import NullPool, QueuePool, AsyncAdaptedQueuePool
+from BakeryBackend.config import Settings, get_settings
+from BakeryBackend.metrics import (
+    db_pool_checkout_wait,
+    db_pool_connections,
+    db_queries,
+    db_query_duration
+)
+
+
+class _CheckoutTimingMixin:
+    """Record how long each checkout waits on the pool"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_wait.observe(time.perf_counter() - start)
+
+
+class TimedQueuePool(_CheckoutTimingMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    return _is_sqlite(url) and make_url(url).database in (None, "", ":memory:")
+
+
+def engine_options(url: str, settings: Settings, is_async: bool = False) -> dict:
+    """Keyword arguments for create_engine/create_async_engine from settings"""
+    options = {}
+    if _is_sqlite(url):
+        options["connect_args"] = {"check_same_thread": False}
+    if _is_memory_sqlite(url):
+        # SQLite picks a single-connection pool for in-memory databases
+        return options
+    options.update(
+        poolclass=TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        pool_recycle=settings.db_pool_recycle,
+    )
+    return options
+
+
+def health_engine_options(url: str, settings: Settings) -> dict:
+    """
+    Keyword arguments for the engine /health pings through. It has no pool, so a
+    probe never waits behind busy request connections, and the driver enforces
+    health_db_timeout_seconds on connecting and on the statement, so a hung
+    database fails the probe instead of holding its thread
+    """
+    timeout = settings.health_db_timeout_seconds
+    parsed = make_url(url)
+    connect_args = {}
+    if parsed.get_backend_name() == "sqlite":
+        connect_args = {"check_same_thread": False, "timeout": timeout}
+    elif parsed.get_backend_name() == "postgresql":
+        if parsed.get_driver_name() == "asyncpg":
+            connect_args = {"timeout": timeout, "command_timeout": timeout}
+        else:
+            # libpq rounds connect_timeout to whole seconds, with a minimum of 2
+            connect_args = {
+                "connect_timeout": max(2, math.ceil(timeout)),
+                "options": f"-c statement_timeout={max(1, int(timeout * 1000))}"
+            }
+    return {"poolclass": NullPool, "connect_args": connect_args}
+
+
+def install_sqlite_pragmas(sync_engine, settings: Settings):
+    """Apply journal/sync/busy-timeout/mmap PRAGMAs to every new SQLite connection"""
+    pragmas = (
+        f"PRAGMA journal_mode={settings.sqlite_journal_mode}",
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}",
+        f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}",
+    )
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def instrument_engine(sync_engine):
+    """Count and time every statement executed on an engine"""
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _record_query(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info["query_start_time"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+        db_queries.inc(operation=operation)
+        db_query_duration.observe(duration, operation=operation)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _discard_query_timer(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start_time"):
+            conn.info["query_start_time"].pop()
 
-# Always place favorites.db in the BakeryBackend directory
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-SQLALCHEMY_DATABASE_URL = f"sqlite:///{os.path.join(BASE_DIR, 'favorites.db')}"
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False,)
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+
+def _build_engine(url: str, settings: Settings):
+    """Pooled, instrumented engine for url, with the SQLite PRAGMAs when it is SQLite"""
+    built = create_engine(url, **engine_options(url, settings))
+    if _is_sqlite(url):
+        install_sqlite_pragmas(built, settings)
+    instrument_engine(built)
+    return built
+
+
+def _queue_pool_stats(pool, name: str) -> Optional[dict]:
+    """Occupancy of one pool, also exported as the db_pool_connections gauges"""
+    if not isinstance(pool, QueuePool):
+        return None
+    stats = dict(
+        size=pool.size(),
+        checked_out=pool.checkedout(),
+        overflow=pool.overflow(),
+        checked_in=pool.checkedin(),
+    )
+    for state, value in stats.items():
+        db_pool_connections.set(value, pool=name, state=state)
+    return stats
+
+
+def _ping(connection_source):
+    with connection_source.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+def _ping_all(health_engines):
+    for health_engine in health_engines:
+        _ping(health_engine)
+
+
+class Database:
+    """
+    The engines and session factories one Settings describes: the primary, the
+    optional read replica (see replica.py), the shard files when storage is
+    sharded (see sharding.py) and the async engine in async mode. Engines
+    connect lazily, so building one does not touch the database
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.engine = _build_engine(settings.database_url, settings)
+        self.SessionLocal = sessionmaker(bind=self.engine, autocommit=False, autoflush=False)
+        self.health_engine = create_engine(settings.database_url, **health_engine_options(settings.database_url, settings))
+
+        self.replica_engine = None
+        self.ReplicaSessionLocal = None
+        if settings.replica_database_url:
+            self.replica_engine = _build_engine(settings.replica_database_url, settings)
+            self.ReplicaSessionLocal = sessionmaker(bind=self.replica_engine, autocommit=False, autoflush=False)
+
+        self.shards = None
+        self.shard_health_engines = []
+        if settings.db_shards > 1:
+            from BakeryBackend.sharding import ShardSet, shard_urls
+
+            urls = shard_urls(settings.db_shard_url_template, settings.db_shards)
+            self.shards = ShardSet([_build_engine(url, settings) for url in urls])
+            self.shard_health_engines = [create_engine(url, **health_engine_options(url, settings)) for url in urls]
+
+        # Async engine only exists in async mode, so sync deployments don't need an async driver
+        self.async_engine = None
+        self.AsyncSessionLocal = None
+        self.async_health_engine = None
+        if settings.db_mode == "async":
+            from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+            url = settings.async_database_url
+            self.async_engine = create_async_engine(url, **engine_options(url, settings, is_async=True))
+            if _is_sqlite(url):
+                install_sqlite_pragmas(self.async_engine.sync_engine, settings)
+            instrument_engine(self.async_engine.sync_engine)
+            self.AsyncSessionLocal = async_sessionmaker(bind=self.async_engine, autoflush=False, expire_on_commit=False)
+            self.async_health_engine = create_async_engine(url, **health_engine_options(url, settings))
+
+    def pool_stats(self) -> dict:
+        """
+        Current occupancy of the primary pool plus the checkout wait histogram,
+        and of the replica and shard pools when those exist
+        """
+        stats = {"checkout_wait_seconds": db_pool_checkout_wait.snapshot()}
+        stats.update(_queue_pool_stats((self.async_engine or self.engine).pool, "primary") or {})
+        if self.replica_engine is not None:
+            stats["replica"] = _queue_pool_stats(self.replica_engine.pool, "replica")
+        if self.shards is not None:
+            stats["shards"] = [
+                _queue_pool_stats(shard_engine.pool, f"shard{shard}")
+                for shard, shard_engine in enumerate(self.shards.engines)
+            ]
+        return stats
+
+    async def ping(self, timeout: float) -> bool:
+        """
+        Cheap liveness check: SELECT 1 must complete within timeout seconds. The
+        health engines enforce the same timeout in the driver, so the worker thread
+        of a probe that timed out here is not left blocked on the database
+        """
+        try:
+            if self.async_health_engine is not None:
+                async def _async_ping():
+                    async with self.async_health_engine.connect() as conn:
+                        await conn.execute(text("SELECT 1"))
+                await asyncio.wait_for(_async_ping(), timeout)
+            elif self.shards is not None:
+                await asyncio.wait_for(run_in_threadpool(_ping_all, self.shard_health_engines), timeout)
+            else:
+                await asyncio.wait_for(run_in_threadpool(_ping, self.health_engine), timeout)
+            return True
+        except Exception:
+            return False
+
+    def dispose(self, close: bool = True):
+        """Drop pooled connections; close=False in a forked child leaves the parent's alone"""
+        self.engine.dispose(close=close)
+        if self.replica_engine is not None:
+            self.replica_engine.dispose(close=close)
+        if self.shards is not None:
+            for shard_engine in self.shards.engines:
+                shard_engine.dispose(close=close)
+
+
+# The process-wide database from the environment. create_app(settings) builds
+# its own; apps assembled by hand (tests, benchmarks) fall back to this one
+database = Database(get_settings())
+engine = database.engine
+SessionLocal = database.SessionLocal
+ReplicaSessionLocal = database.ReplicaSessionLocal
+shards = database.shards
+
+
+def app_database(request: Request) -> Database:
+    """The database of the app serving the request"""
+    return getattr(request.app.state, "database", database)
+
+def get_shards(request: Request):
+    """Dependency returning the ShardSet, or None when storage is not sharded"""
+    return app_database(request).shards
+
+async def request_user_id(request: Request, shards=Depends(get_shards)) -> Optional[int]:
+    """
+    The user a request is about when storage is sharded: the user_id path or
+    query parameter, else a JSON body's top-level user_id (FastAPI has already
+    read the body, so this does not wait for it)
+    """
+    if shards is None:
+        return None
+    value = request.path_params.get("user_id") or request.query_params.get("user_id")
+    if value is None and request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            payload = json.loads(await request.body() or b"null")
+        except ValueError:
+            payload = None
+        value = payload.get("user_id") if isinstance(payload, dict) else None
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    return int(value) if isinstance(value, str) and value.isdigit() else None
+
+def get_db(request: Request, user_id: Optional[int] = Depends(request_user_id), shards=Depends(get_shards)):
+    """
+    Session on the database, or in sharded mode on the request's user's shard.
+    Sharded requests without a user get shard 0; endpoints spanning users go
+    through `shards` instead
+    """
+    if shards is None:
+        db = app_database(request).SessionLocal()
+    else:
+        db = shards.session(shards.shard_for(user_id) if user_id is not None else 0)
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_replica_db(request: Request):
+    """Session on the read replica, or None when BAKERY_REPLICA_DATABASE_URL is not set"""
+    ReplicaSession = app_database(request).ReplicaSessionLocal
+    if ReplicaSession is None:
+        yield None
+        return
+    db = ReplicaSession()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db(request: Request):
+    AsyncSession = app_database(request).AsyncSessionLocal
+    if AsyncSession is None:
+        raise RuntimeError("get_async_db requires BAKERY_DB_MODE=async")
+    async with AsyncSession() as db:
+        yield db
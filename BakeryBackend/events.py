@@ -0,0 +1,187 @@
+"""
+In-process change feed behind GET /favorites/{user_id}/stream (BAKERY_EVENT_STREAM).
+
+Write endpoints publish an event for every favorite they add or delete,
+after their commit. The EventHub encodes each event as a server-sent
+events frame once and fans it out to the subscribers of that user. Every
+subscriber has a bounded queue; one that falls queue_size frames behind is
+dropped (its stream ends) rather than letting its backlog grow without bound,
+and the client reconnects.
+
+Events also go into a ring buffer holding the last ring_size events, so a
+client reconnecting with Last-Event-ID gets what it missed. Event IDs carry
+the hub's epoch (its start time). When the client's ID is from an earlier
+process or has already left the ring, the stream starts with a "reset" event
+instead, telling the client to reload the list.
+
+Publishers run on threadpool threads as well as on the event loop, so
+frames reach a subscriber through its loop's call_soon_threadsafe. Like the
+membership index, the hub only sees writes made by its own process.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Iterable, Optional, Set, Tuple
+
+from starlette.requests import Request
+
+from BakeryBackend.config import Settings, get_settings
+from BakeryBackend.metrics import event_stream_dropped, event_stream_subscribers
+from BakeryBackend.responses import dumps_json
+
+ADDED = "favorite_added"
+DELETED = "favorite_deleted"
+
+# Sent first on every stream: client reconnect delay in milliseconds
+RETRY_FRAME = b"retry: 3000\n\n"
+HEARTBEAT_FRAME = b": heartbeat\n\n"
+RESET_FRAME = b"event: reset\ndata: {}\n\n"
+
+
+class Subscriber:
+    """One open stream: a bounded queue of frames, filled from any thread"""
+
+    __slots__ = ("user_id", "queue_size", "dropped", "_frames", "_wakeup", "_loop")
+
+    def __init__(self, user_id: int, queue_size: int, loop: asyncio.AbstractEventLoop):
+        self.user_id = user_id
+        self.queue_size = queue_size
+        self.dropped = False
+        self._frames: Deque[bytes] = deque()
+        self._wakeup = asyncio.Event()
+        self._loop = loop
+
+    def deliver(self, frame: bytes) -> bool:
+        """Queue a frame from any thread; False once the subscriber's loop is gone"""
+        try:
+            self._loop.call_soon_threadsafe(self._put, frame)
+        except RuntimeError:  # loop closed
+            return False
+        return True
+
+    def _put(self, frame: bytes):
+        if self.dropped:
+            return
+        if len(self._frames) >= self.queue_size:
+            self.dropped = True
+            self._frames.clear()
+            event_stream_dropped.inc()
+        else:
+            self._frames.append(frame)
+        self._wakeup.set()
+
+    async def next_frame(self, timeout: float) -> Optional[bytes]:
+        """The next queued frame; None after timeout seconds without one or once dropped"""
+        if not self._frames and not self.dropped:
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self._frames.popleft() if self._frames else None
+
+
+class EventHub:
+    """Fan-out of favorite change events to per-user subscribers, with a resume buffer"""
+
+    def __init__(self, ring_size: int = 1024, queue_size: int = 64, clock=time.time):
+        self.epoch = int(clock() * 1000)
+        self.queue_size = queue_size
+        self._ring: Deque[Tuple[int, int, bytes]] = deque(maxlen=ring_size)  # (seq, user_id, frame)
+        self._seq = 0
+        self._subscribers: Dict[int, Set[Subscriber]] = {}
+        self._lock = threading.Lock()
+
+    def publish(self, event: str, user_id: int, favorites: Iterable[dict]):
+        """Publish one event per favorite dict (favorite_id, item_id, ...) of user_id's list"""
+        for favorite in favorites:
+            with self._lock:
+                self._seq += 1
+                frame = b"id: %d-%d\nevent: %s\ndata: %s\n\n" % (
+                    self.epoch, self._seq, event.encode(), dumps_json({"user_id": user_id, **favorite})
+                )
+                self._ring.append((self._seq, user_id, frame))
+                subscribers = list(self._subscribers.get(user_id, ()))
+            for subscriber in subscribers:
+                if not subscriber.deliver(frame):
+                    self.unsubscribe(subscriber)
+
+    def subscribe(self, user_id: int, last_event_id: Optional[str] = None) -> Subscriber:
+        """
+        Register a subscriber on the running loop. With last_event_id, events for
+        user_id after it are queued first, or a reset frame when they are not all
+        in the ring any more
+        """
+        subscriber = Subscriber(user_id, self.queue_size, asyncio.get_running_loop())
+        with self._lock:
+            if last_event_id is not None:
+                last_seq = self._resume_seq(last_event_id)
+                if last_seq is None:
+                    subscriber._frames.append(RESET_FRAME)
+                else:
+                    missed = [frame for seq, owner, frame in self._ring if seq > last_seq and owner == user_id]
+                    # More than a full queue behind: cheaper for the client to reload
+                    subscriber._frames.extend(missed if len(missed) <= self.queue_size else [RESET_FRAME])
+            self._subscribers.setdefault(user_id, set()).add(subscriber)
+        event_stream_subscribers.inc()
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(subscriber.user_id)
+            if subscribers is None or subscriber not in subscribers:
+                return
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[subscriber.user_id]
+        event_stream_subscribers.dec()
+
+    def _resume_seq(self, last_event_id: str) -> Optional[int]:
+        """Sequence number to resume after, or None when the client must reset (call under the lock)"""
+        epoch, _, seq = last_event_id.strip().partition("-")
+        if epoch != str(self.epoch) or not seq.isdigit():
+            return None
+        seq = int(seq)
+        oldest = self._ring[0][0] if self._ring else self._seq + 1
+        if seq > self._seq or seq < oldest - 1:
+            return None
+        return seq
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "subscribers": sum(len(s) for s in self._subscribers.values()),
+                "users": len(self._subscribers),
+                "buffered_events": len(self._ring),
+                "last_event": self._seq
+            }
+
+
+async def event_frames(hub: EventHub, subscriber: Subscriber, heartbeat_seconds: float) -> AsyncIterator[bytes]:
+    """Body of a stream response; unsubscribes when the client goes away or is dropped"""
+    try:
+        yield RETRY_FRAME
+        while True:
+            frame = await subscriber.next_frame(heartbeat_seconds)
+            if subscriber.dropped:
+                return
+            yield HEARTBEAT_FRAME if frame is None else frame
+    finally:
+        hub.unsubscribe(subscriber)
+
+
+def build_event_hub(settings: Settings) -> Optional[EventHub]:
+    if not settings.event_stream:
+        return None
+    return EventHub(settings.event_stream_ring_size, settings.event_stream_queue_size)
+
+
+# Process-wide hub for apps assembled by hand; create_app builds one per app
+event_hub: Optional[EventHub] = build_event_hub(get_settings())
+
+
+def get_event_hub(request: Request) -> Optional[EventHub]:
+    """Dependency returning the event hub, or None when the event stream is disabled"""
+    return getattr(request.app.state, "event_hub", event_hub)
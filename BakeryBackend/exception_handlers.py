@@ -3,14 +3,16 @@ Global Exception Handlers for Bakery Backend
 """
 
 import logging
-from datetime import datetime
-from typing import Dict, Any
-from fastapi import Request, HTTPException
+import time
+from typing import Dict, Any, Optional, Tuple
+from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from pydantic import ValidationError as PydanticValidationError
 
+from .config import Settings, get_settings
+from .responses import FastJSONResponse
 from .exceptions import (
     BakeryBaseException,
     DatabaseError,
@@ -25,6 +27,69 @@ from .exceptions import (
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Second-resolution prefix of the last timestamp built, reused within that second
+_timestamp_prefix: Tuple[int, str] = (-1, "")
+
+
+def utc_timestamp() -> str:
+    """Current UTC time in datetime.isoformat() form, without building a datetime"""
+    global _timestamp_prefix
+    now = time.time()
+    second = int(now)
+    cached_second, prefix = _timestamp_prefix
+    if second != cached_second:
+        prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+        _timestamp_prefix = (second, prefix)
+    micros = int((now - second) * 1_000_000)
+    return f"{prefix}.{micros:06d}" if micros else prefix
+
+
+class LogRateLimiter:
+    """Allow at most max_per_second log lines per key, counting what was suppressed"""
+
+    def __init__(self, max_per_second: float, clock=time.monotonic):
+        self.max_per_second = max_per_second
+        self.clock = clock
+        self._windows: Dict[str, list] = {}
+
+    def allow(self, key: str) -> Tuple[bool, int]:
+        """Whether to log now, and how many lines for key were dropped since the last one"""
+        if self.max_per_second <= 0:
+            return True, 0
+        window = int(self.clock())
+        state = self._windows.get(key)
+        if state is None or state[0] != window:
+            suppressed = state[2] if state is not None else 0
+            self._windows[key] = [window, 1, 0]
+            return True, suppressed
+        if state[1] < self.max_per_second:
+            state[1] += 1
+            suppressed, state[2] = state[2], 0
+            return True, suppressed
+        state[2] += 1
+        return False, 0
+
+
+def build_log_limiter(settings: Settings) -> LogRateLimiter:
+    return LogRateLimiter(settings.error_log_max_per_second)
+
+
+# Process-wide limiter for apps assembled by hand; create_app builds one per app
+log_limiter = build_log_limiter(get_settings())
+
+
+def log_error(request: Request, level: int, label: str, message: Any, exc_info: bool = False):
+    """Log an error line lazily, subject to the app's per-label rate limit"""
+    if not logger.isEnabledFor(level):
+        return
+    allowed, suppressed = getattr(request.app.state, "log_limiter", log_limiter).allow(label)
+    if not allowed:
+        return
+    if suppressed:
+        logger.log(level, "%s: %s (%d similar suppressed)", label, message, suppressed, exc_info=exc_info)
+    else:
+        logger.log(level, "%s: %s", label, message, exc_info=exc_info)
+
 
 def create_error_response(
     status_code: int,
@@ -36,30 +101,67 @@ def create_error_response(
     """
     Create a standardized error response
     """
-    error_response = {
-        "error": {
-            "type": error_type,
-            "message": message,
-            "timestamp": datetime.utcnow().isoformat(),
-            "status_code": status_code
-        }
+    error = {
+        "type": error_type,
+        "message": message,
+        "timestamp": utc_timestamp(),
+        "status_code": status_code
     }
     
     if details:
-        error_response["error"]["details"] = details
+        error["details"] = details
         
     if request_id:
-        error_response["error"]["request_id"] = request_id
+        error["request_id"] = request_id
+    
+    return FastJSONResponse(
+        status_code=status_code,
+        content={"error": error}
+    )
+
+
+# Response status, error type and log level for each BakeryBaseException subclass
+BAKERY_ERRORS: Dict[type, Tuple[int, str, int]] = {
+    DatabaseError: (500, "DatabaseError", logging.ERROR),
+    ValidationError: (400, "ValidationError", logging.WARNING),
+    UnauthorizedError: (401, "UnauthorizedError", logging.WARNING),
+    NotFoundError: (404, "NotFoundError", logging.INFO),
+    ConflictError: (409, "ConflictError", logging.WARNING),
+    BusinessLogicError: (400, "BusinessLogicError", logging.WARNING),
+}
+
+# BAKERY_ERRORS entries resolved per concrete exception class, subclasses included
+_resolved_errors: Dict[type, Optional[Tuple[int, str, int]]] = {}
+
+
+def _bakery_error_entry(exc_type: type) -> Optional[Tuple[int, str, int]]:
+    entry = _resolved_errors.get(exc_type, False)
+    if entry is False:
+        entry = next((BAKERY_ERRORS[cls] for cls in exc_type.__mro__ if cls in BAKERY_ERRORS), None)
+        _resolved_errors[exc_type] = entry
+    return entry
+
+
+async def bakery_exception_handler(request: Request, exc: BakeryBaseException) -> JSONResponse:
+    """Handle every BakeryBaseException subclass listed in BAKERY_ERRORS"""
+    entry = _bakery_error_entry(type(exc))
+    if entry is None:
+        return await general_exception_handler(request, exc)
+    status_code, error_type, level = entry
+    log_error(request, level, error_type, exc.message)
     
-    return JSONResponse(
+    return create_error_response(
         status_code=status_code,
-        content=error_response
+        error_type=error_type,
+        message=exc.message,
+        details=exc.details,
+        request_id=getattr(request.state, 'request_id', None)
     )
 
 
 async def http_exception_handler(request: Request, exc: HTTPException) -> JSONResponse:
     """Handle FastAPI HTTPException"""
-    logger.warning(f"HTTP Exception: {exc.status_code} - {exc.detail}")
+    log_error(request, logging.WARNING, "HTTPException", exc.detail)
     
     return create_error_response(
         status_code=exc.status_code,
@@ -71,7 +173,7 @@ async def http_exception_handler(request: Request, exc: HTTPException) -> JSONRe
 
 async def validation_exception_handler(request: Request, exc: RequestValidationError) -> JSONResponse:
     """Handle FastAPI validation errors"""
-    logger.warning(f"Validation Error: {exc.errors()}")
+    log_error(request, logging.WARNING, "RequestValidationError", exc.errors())
     
     # Format validation errors for better readability
     formatted_errors = []
@@ -93,7 +195,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 
 async def database_exception_handler(request: Request, exc: SQLAlchemyError) -> JSONResponse:
     """Handle SQLAlchemy database errors"""
-    logger.error(f"Database Error: {str(exc)}")
+    log_error(request, logging.ERROR, "SQLAlchemyError", exc)
     
     error_message = "Database operation failed"
     status_code = 500
@@ -112,87 +214,9 @@ async def database_exception_handler(request: Request, exc: SQLAlchemyError) ->
     )
 
 
-async def custom_database_error_handler(request: Request, exc: DatabaseError) -> JSONResponse:
-    """Handle custom DatabaseError"""
-    logger.error(f"Custom Database Error: {exc.message}")
-    
-    return create_error_response(
-        status_code=500,
-        error_type="DatabaseError",
-        message=exc.message,
-        details=exc.details,
-        request_id=getattr(request.state, 'request_id', None)
-    )
-
-
-async def custom_validation_error_handler(request: Request, exc: ValidationError) -> JSONResponse:
-    """Handle custom ValidationError"""
-    logger.warning(f"Custom Validation Error: {exc.message}")
-    
-    return create_error_response(
-        status_code=400,
-        error_type="ValidationError",
-        message=exc.message,
-        details=exc.details,
-        request_id=getattr(request.state, 'request_id', None)
-    )
-
-
-async def unauthorized_error_handler(request: Request, exc: UnauthorizedError) -> JSONResponse:
-    """Handle UnauthorizedError"""
-    logger.warning(f"Unauthorized Error: {exc.message}")
-    
-    return create_error_response(
-        status_code=401,
-        error_type="UnauthorizedError",
-        message=exc.message,
-        details=exc.details,
-        request_id=getattr(request.state, 'request_id', None)
-    )
-
-
-async def not_found_error_handler(request: Request, exc: NotFoundError) -> JSONResponse:
-    """Handle NotFoundError"""
-    logger.info(f"Not Found Error: {exc.message}")
-    
-    return create_error_response(
-        status_code=404,
-        error_type="NotFoundError",
-        message=exc.message,
-        details=exc.details,
-        request_id=getattr(request.state, 'request_id', None)
-    )
-
-
-async def conflict_error_handler(request: Request, exc: ConflictError) -> JSONResponse:
-    """Handle ConflictError"""
-    logger.warning(f"Conflict Error: {exc.message}")
-    
-    return create_error_response(
-        status_code=409,
-        error_type="ConflictError",
-        message=exc.message,
-        details=exc.details,
-        request_id=getattr(request.state, 'request_id', None)
-    )
-
-
-async def business_logic_error_handler(request: Request, exc: BusinessLogicError) -> JSONResponse:
-    """Handle BusinessLogicError"""
-    logger.warning(f"Business Logic Error: {exc.message}")
-    
-    return create_error_response(
-        status_code=400,
-        error_type="BusinessLogicError",
-        message=exc.message,
-        details=exc.details,
-        request_id=getattr(request.state, 'request_id', None)
-    )
-
-
 async def general_exception_handler(request: Request, exc: Exception) -> JSONResponse:
     """Handle all other exceptions"""
-    logger.error(f"Unhandled Exception: {str(exc)}", exc_info=True)
+    log_error(request, logging.ERROR, "Unhandled Exception", exc, exc_info=True)
     
     return create_error_response(
         status_code=500,
@@ -205,7 +229,7 @@ async def general_exception_handler(request: Request, exc: Exception) -> JSONRes
 
 async def pydantic_validation_error_handler(request: Request, exc: PydanticValidationError) -> JSONResponse:
     """Handle Pydantic validation errors"""
-    logger.warning(f"Pydantic Validation Error: {exc.errors()}")
+    log_error(request, logging.WARNING, "Pydantic Validation Error", exc.errors())
     
     formatted_errors = []
     for error in exc.errors():
@@ -221,4 +245,20 @@ async def pydantic_validation_error_handler(request: Request, exc: PydanticValid
         message="Data validation failed",
         details={"validation_errors": formatted_errors},
         request_id=getattr(request.state, 'request_id', None)
-    )
\ No newline at end of file
+    )
+
+
+# Handler for each exception type; Starlette picks the closest match in the exception's MRO
+EXCEPTION_HANDLERS = {
+    Exception: general_exception_handler,
+    RequestValidationError: validation_exception_handler,
+    SQLAlchemyError: database_exception_handler,
+    BakeryBaseException: bakery_exception_handler,
+    PydanticValidationError: pydantic_validation_error_handler,
+}
+
+
+def register_exception_handlers(app: FastAPI):
+    """Install EXCEPTION_HANDLERS on an app"""
+    for exc_class, handler in EXCEPTION_HANDLERS.items():
+        app.add_exception_handler(exc_class, handler)
@@ -0,0 +1,240 @@
+"""
+Group commit for favorite adds and deletes (BAKERY_GROUP_COMMIT).
+
+Each add/delete normally commits its own transaction, and on SQLite commits
+serialize, so write throughput is capped by commit latency. In group-commit
+mode handlers submit their write to a GroupCommitter instead. A background
+thread applies queued writes in arrival order inside one transaction,
+committing every group_commit_max_ops writes or group_commit_max_delay_ms
+after the first one, whichever comes first. Each caller's future resolves
+only after its batch has committed.
+
+Writes are applied one by one in queue order, so a batch behaves like the
+same requests committed serially: a duplicate add (even of a favorite added
+earlier in the same batch) fails with ConflictError, and deleting a missing
+or someone else's favorite fails with NotFoundError/UnauthorizedError,
+without affecting the rest of the batch. If the commit itself fails, every
+write in the batch fails with DatabaseError. A write whose future was
+cancelled before its batch started (an async caller that disconnected or
+timed out) is dropped.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from sqlalchemy import delete, select
+
+from starlette.requests import Request
+
+from BakeryBackend.config import Settings, get_settings
+from BakeryBackend.database import SessionLocal
+from BakeryBackend.exceptions import BakeryBaseException, ConflictError, DatabaseError, NotFoundError, UnauthorizedError
+from BakeryBackend.metrics import group_commit_batch_size
+from BakeryBackend.models import Favorite as FavoriteModel
+from BakeryBackend.popularity import UPSERT_INSERTS, increment_item_counts
+from BakeryBackend.versions import bump_versions
+
+
+@dataclass(frozen=True)
+class AddFavorite:
+    """Resolves to the new favorite's id"""
+    user_id: int
+    item_id: int
+    item_name: str
+
+
+@dataclass(frozen=True)
+class DeleteFavorite:
+    """Resolves to the deleted favorite's (item_id, item_name)"""
+    favorite_id: int
+    user_id: int
+
+
+Write = Union[AddFavorite, DeleteFavorite]
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def _apply_add(db, op: AddFavorite, deltas: Dict[int, int], users: Set[int]) -> int:
+    # ON CONFLICT DO NOTHING keeps a duplicate from aborting the shared transaction
+    stmt = UPSERT_INSERTS[db.get_bind().dialect.name](FavoriteModel).values(
+        user_id=op.user_id, item_id=op.item_id, item_name=op.item_name
+    )
+    favorite_id = db.execute(
+        stmt.on_conflict_do_nothing(index_elements=["user_id", "item_id"]).returning(FavoriteModel.id)
+    ).scalar_one_or_none()
+    if favorite_id is None:
+        existing_id = db.scalar(
+            select(FavoriteModel.id).where(
+                FavoriteModel.user_id == op.user_id,
+                FavoriteModel.item_id == op.item_id
+            )
+        )
+        raise ConflictError(
+            message="Favorite already exists for this user and item",
+            details={"user_id": op.user_id, "item_id": op.item_id, "existing_favorite_id": existing_id}
+        )
+    deltas[op.item_id] = deltas.get(op.item_id, 0) + 1
+    users.add(op.user_id)
+    return favorite_id
+
+
+def _apply_delete(db, op: DeleteFavorite, deltas: Dict[int, int], users: Set[int]) -> Tuple[int, str]:
+    row = db.execute(
+        select(FavoriteModel.user_id, FavoriteModel.item_id, FavoriteModel.item_name)
+        .where(FavoriteModel.id == op.favorite_id)
+    ).first()
+    if row is None:
+        raise NotFoundError(
+            message="Favorite not found",
+            details={"favorite_id": op.favorite_id}
+        )
+    owner_id, item_id, item_name = row
+    if owner_id != op.user_id:
+        raise UnauthorizedError(
+            message="Not authorized to delete this favorite",
+            details={
+                "favorite_id": op.favorite_id,
+                "requested_by_user": op.user_id,
+                "favorite_belongs_to_user": owner_id
+            }
+        )
+    db.execute(delete(FavoriteModel).where(FavoriteModel.id == op.favorite_id))
+    deltas[item_id] = deltas.get(item_id, 0) - 1
+    users.add(op.user_id)
+    return item_id, item_name
+
+
+class GroupCommitter:
+    """Queue favorite writes and commit them in batches from one background thread"""
+
+    def __init__(self, session_factory=SessionLocal, max_ops: int = 256, max_delay_ms: float = 5.0):
+        self.session_factory = session_factory
+        self.max_ops = max_ops
+        self.max_delay = max_delay_ms / 1000
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def submit(self, op: Write) -> Future:
+        """Queue a write; the future resolves once its batch is committed"""
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("GroupCommitter is closed")
+            # Started lazily so a preloaded master process never owns the thread
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+                self._thread.start()
+            self._queue.put((op, future))
+        return future
+
+    def close(self):
+        """Commit everything already queued, then stop the background thread"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            entry = self._queue.get()
+            if entry is _STOP:
+                break
+            batch = [entry]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_ops:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    stopping = True
+                    break
+                batch.append(entry)
+            try:
+                self.flush(batch)
+            except Exception as e:
+                # Keep the thread alive for later writes; fail whatever this batch left unresolved
+                logger.exception("Group commit batch of %d writes failed", len(batch))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(DatabaseError(
+                            message="Failed to commit batched favorite writes",
+                            details={"batch_size": len(batch), "error": str(e)}
+                        ))
+
+    def flush(self, batch: List[Tuple[Write, Future]]):
+        """Apply a batch of writes in one transaction and resolve their futures"""
+        # Marks the futures running so they can no longer be cancelled, and drops cancelled ones
+        batch = [(op, future) for op, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        outcomes = []
+        deltas: Dict[int, int] = {}
+        users: Set[int] = set()
+        db = self.session_factory()
+        try:
+            for op, future in batch:
+                try:
+                    if isinstance(op, AddFavorite):
+                        outcomes.append((future, _apply_add(db, op, deltas, users), None))
+                    else:
+                        outcomes.append((future, _apply_delete(db, op, deltas, users), None))
+                except BakeryBaseException as e:
+                    outcomes.append((future, None, e))
+            increment_item_counts(db, deltas)
+            bump_versions(db, user_ids=users, item_ids=deltas)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            for _, future in batch:
+                future.set_exception(DatabaseError(
+                    message="Failed to commit batched favorite writes",
+                    details={"batch_size": len(batch), "db_error": str(e)}
+                ))
+            return
+        finally:
+            db.close()
+
+        group_commit_batch_size.observe(len(batch))
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+def build_group_committer(settings: Settings, session_factory=SessionLocal) -> Optional[GroupCommitter]:
+    if not settings.group_commit:
+        return None
+    return GroupCommitter(
+        session_factory,
+        max_ops=settings.group_commit_max_ops,
+        max_delay_ms=settings.group_commit_max_delay_ms
+    )
+
+
+# Process-wide committer for apps assembled by hand; create_app builds one per app
+group_committer: Optional[GroupCommitter] = build_group_committer(get_settings())
+
+
+def get_group_committer(request: Request) -> Optional[GroupCommitter]:
+    """Dependency returning the group committer, or None when each write commits on its own"""
+    return getattr(request.app.state, "group_committer", group_committer)
@@ -1,59 +1,153 @@
-from fastapi import FastAPI
-from fastapi.exceptions import RequestValidationError
-from sqlalchemy.exc import SQLAlchemyError
-from pydantic import ValidationError as PydanticValidationError
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi import APIRouter, FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy.engine import Engine
 
+from BakeryBackend.config import Settings, get_settings
 from BakeryBackend.routers import favorites
-from BakeryBackend.database import Base, engine
-from BakeryBackend.middleware import RequestMiddleware
-from BakeryBackend.exceptions import (
-    DatabaseError,
-    ValidationError,
-    UnauthorizedError,
-    NotFoundError,
-    ConflictError,
-    BusinessLogicError
-)
-from BakeryBackend.exception_handlers import (
-    http_exception_handler,
-    validation_exception_handler,
-    database_exception_handler,
-    custom_database_error_handler,
-    custom_validation_error_handler,
-    unauthorized_error_handler,
-    not_found_error_handler,
-    conflict_error_handler,
-    business_logic_error_handler,
-    general_exception_handler,
-    pydantic_validation_error_handler
-)
-
-# Create all database tables
-Base.metadata.create_all(bind=engine)
-
-# Initialize FastAPI app
-app = FastAPI(title="Bakery Backend with Favorites")
-
-# Add middleware
-app.add_middleware(RequestMiddleware)
-
-# Register exception handlers
-app.add_exception_handler(Exception, general_exception_handler)
-app.add_exception_handler(RequestValidationError, validation_exception_handler)
-app.add_exception_handler(SQLAlchemyError, database_exception_handler)
-app.add_exception_handler(DatabaseError, custom_database_error_handler)
-app.add_exception_handler(ValidationError, custom_validation_error_handler)
-app.add_exception_handler(UnauthorizedError, unauthorized_error_handler)
-app.add_exception_handler(NotFoundError, not_found_error_handler)
-app.add_exception_handler(ConflictError, conflict_error_handler)
-app.add_exception_handler(BusinessLogicError, business_logic_error_handler)
-app.add_exception_handler(PydanticValidationError, pydantic_validation_error_handler)
-
-# Include routers
-app.include_router(favorites.router)
-
-
-@app.get("/")
+from BakeryBackend.database import Base, Database, database
+from BakeryBackend.metrics import render_prometheus
+from BakeryBackend.cache import build_cache
+from BakeryBackend.membership import build_membership_index
+from BakeryBackend.events import build_event_hub
+from BakeryBackend.singleflight import build_single_flight
+from BakeryBackend.group_commit import build_group_committer
+from BakeryBackend.replica import build_recent_writes
+from BakeryBackend.models import create_missing_indexes, remove_duplicate_favorites
+from BakeryBackend.popularity import create_item_counts_table, recount_items
+from BakeryBackend.versions import bump_params, bump_versions_statement
+from BakeryBackend.middleware import RequestMiddleware, MetricsMiddleware
+from BakeryBackend.compression import CompressedBodyCache, CompressionMiddleware
+from BakeryBackend.admission import AdmissionMiddleware, TokenBuckets
+from BakeryBackend.exception_handlers import build_log_limiter, register_exception_handlers
+
+router = APIRouter()
+
+
+def setup_database(bind: Engine):
+    """
+    Create all database tables; the counters table first so it is backfilled from existing favorites.
+    Duplicate favorites stored before the unique (user_id, item_id) index existed are removed first,
+    and the counters and list versions of the users and items they touched are brought up to date
+    """
+    duplicates = remove_duplicate_favorites(bind)
+    create_item_counts_table(bind)
+    Base.metadata.create_all(bind=bind)
+    create_missing_indexes(bind)
+    if duplicates:
+        with bind.begin() as conn:
+            recount_items(conn, {item_id for _, item_id in duplicates})
+            conn.execute(bump_versions_statement(conn.dialect.name), bump_params(
+                user_ids=[user_id for user_id, _ in duplicates], item_ids=[item_id for _, item_id in duplicates]
+            ))
+
+
+def setup_storage(db: Optional[Database] = None):
+    """
+    setup_database on the database (default: the environment's), or on every
+    shard file when storage is sharded
+    """
+    db = db or database
+    if db.shards is None:
+        setup_database(db.engine)
+        return
+    from BakeryBackend.sharding import create_shard_schema, shard_first_id
+    for shard, shard_engine in enumerate(db.shards.engines):
+        create_shard_schema(shard_engine, shard_first_id(shard))
+        setup_database(shard_engine)
+
+
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """
+    Build the application from settings (default: the environment's). The app
+    gets its own database engines, cache, membership index, event hub, request
+    coalescer, group committer, replica write tracker and error log rate
+    limiter, kept on app.state
+    where the endpoints' dependencies find them, so several apps with
+    different settings can live in one process.
+
+    Nothing here touches the database; schema setup runs at startup when
+    settings.db_create_schema is set (`serve` does it once in the master
+    process instead, before forking workers)
+    """
+    settings = settings or get_settings()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        if settings.db_create_schema:
+            await run_in_threadpool(setup_storage, app.state.database)
+        yield
+        # Commit writes still queued for a group commit before the worker exits.
+        # The committer cannot be reopened, so a fresh one serves the app if it
+        # is started again
+        committer = app.state.group_committer
+        if committer is not None:
+            await run_in_threadpool(committer.close)
+            app.state.group_committer = build_group_committer(settings, app.state.database.SessionLocal)
+
+    # Initialize FastAPI app
+    app = FastAPI(title="Bakery Backend with Favorites", lifespan=lifespan)
+    app.state.settings = settings
+    app.state.database = Database(settings)
+    app.state.favorites_cache = build_cache(settings)
+    app.state.membership_index = build_membership_index(settings)
+    app.state.event_hub = build_event_hub(settings)
+    app.state.single_flight = build_single_flight(settings)
+    app.state.group_committer = build_group_committer(settings, app.state.database.SessionLocal)
+    app.state.recent_writes = build_recent_writes(settings, app.state.database)
+    app.state.log_limiter = build_log_limiter(settings)
+
+    # Add middleware, innermost first: compression, then admission control
+    # (after the request ID is assigned, so shed responses carry it), then
+    # logging and metrics, which also see shed requests
+    if settings.compression_encoding_list:
+        app.add_middleware(
+            CompressionMiddleware,
+            encodings=settings.compression_encoding_list,
+            minimum_size=settings.compression_minimum_size,
+            levels={
+                "gzip": settings.compression_gzip_level,
+                "br": settings.compression_brotli_quality,
+                "zstd": settings.compression_zstd_level
+            },
+            cache=CompressedBodyCache(
+                settings.compression_cache_entries, settings.compression_cache_max_bytes
+            ) if settings.compression_cache_entries > 0 else None
+        )
+    if settings.admission_max_in_flight > 0 or settings.rate_limit_user_rate > 0 or settings.rate_limit_ip_rate > 0:
+        app.add_middleware(
+            AdmissionMiddleware,
+            max_in_flight=settings.admission_max_in_flight,
+            max_queue=settings.admission_max_queue,
+            max_queue_wait_seconds=settings.admission_max_queue_wait_seconds,
+            retry_after_seconds=settings.admission_retry_after_seconds,
+            user_buckets=TokenBuckets(
+                settings.rate_limit_user_rate, settings.rate_limit_user_burst
+            ) if settings.rate_limit_user_rate > 0 else None,
+            ip_buckets=TokenBuckets(
+                settings.rate_limit_ip_rate, settings.rate_limit_ip_burst
+            ) if settings.rate_limit_ip_rate > 0 else None
+        )
+    app.add_middleware(RequestMiddleware, log_sample_rate=settings.request_log_sample_rate)
+    app.add_middleware(MetricsMiddleware)
+
+    # Register exception handlers
+    register_exception_handlers(app)
+
+    # Include routers
+    app.include_router(router)
+    if settings.db_mode == "async":
+        from BakeryBackend.routers import favorites_async
+        app.include_router(favorites_async.build_router(favorites.router))
+    else:
+        app.include_router(favorites.router)
+    return app
+
+
+@router.get("/")
 async def root():
     """Health check endpoint"""
     return {
@@ -63,12 +157,33 @@ async def root():
     }
 
 
-@app.get("/health")
-async def health_check():
-    """Detailed health check endpoint"""
-    return {
-        "status": "healthy",
-        "timestamp": "2025-01-01T00:00:00Z",
-        "version": "1.0.0",
-        "database": "connected"
-    }
\ No newline at end of file
+@router.get("/health")
+async def health_check(request: Request):
+    """Detailed health check endpoint; 503 when the database does not answer in time"""
+    state = request.app.state
+    database_ok = await state.database.ping(state.settings.health_db_timeout_seconds)
+    return JSONResponse(
+        status_code=200 if database_ok else 503,
+        content={
+            "status": "healthy" if database_ok else "degraded",
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "version": "1.0.0",
+            "database": "connected" if database_ok else "unavailable",
+            "database_pool": state.database.pool_stats(),
+            "cache": state.favorites_cache.stats(),
+            "membership_index": state.membership_index.stats() if state.membership_index else None,
+            "event_stream": state.event_hub.stats() if state.event_hub else None,
+            "single_flight": state.single_flight.stats() if state.single_flight else None
+        }
+    )
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics(request: Request):
+    """Prometheus metrics"""
+    request.app.state.database.pool_stats()  # refresh the pool gauges
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+# Module-level app for `uvicorn BakeryBackend.main:app` and the tests
+app = create_app()
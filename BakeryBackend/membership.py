@@ -0,0 +1,216 @@
+"""
+Optional in-process index of which items each user has favorited.
+
+Each warmed user is stored as two parallel sorted array('I') columns
+(item_ids and the matching favorite ids), about 8 bytes per favorite, and
+answered with a binary search. Users are loaded lazily from the favorites
+table and evicted least-recently-used once the user or byte budget is
+exceeded. Writes made through this process update the index after commit;
+writes made by other processes are not seen, so enable it only where this
+process owns all writes for its users.
+"""
+
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from starlette.requests import Request
+
+from BakeryBackend.config import Settings, get_settings
+
+# Rough fixed cost of one warmed user (entry object, two arrays, dict slot)
+USER_OVERHEAD_BYTES = 256
+
+
+class UserFavorites:
+    """
+    Sorted item_id -> favorite_id columns for one user. Writers build new
+    columns and swap them in with one assignment, so a reader on another
+    thread always sees a matching pair without taking a lock
+    """
+
+    __slots__ = ("columns",)
+
+    def __init__(self, rows: Iterable[Tuple[int, int]]):
+        item_ids, favorite_ids = array("I"), array("I")
+        for item_id, favorite_id in sorted(rows):
+            item_ids.append(item_id)
+            favorite_ids.append(favorite_id)
+        self.columns: Tuple[array, array] = (item_ids, favorite_ids)
+
+    @property
+    def item_ids(self) -> array:
+        return self.columns[0]
+
+    @property
+    def favorite_ids(self) -> array:
+        return self.columns[1]
+
+    def favorite_id(self, item_id: int) -> Optional[int]:
+        item_ids, favorite_ids = self.columns
+        index = bisect_left(item_ids, item_id)
+        if index < len(item_ids) and item_ids[index] == item_id:
+            return favorite_ids[index]
+        return None
+
+    def add(self, item_id: int, favorite_id: int):
+        item_ids, favorite_ids = (array("I", column) for column in self.columns)
+        index = bisect_left(item_ids, item_id)
+        if index < len(item_ids) and item_ids[index] == item_id:
+            favorite_ids[index] = favorite_id
+        else:
+            item_ids.insert(index, item_id)
+            favorite_ids.insert(index, favorite_id)
+        self.columns = (item_ids, favorite_ids)
+
+    def remove(self, item_id: int):
+        item_ids, favorite_ids = self.columns
+        index = bisect_left(item_ids, item_id)
+        if index < len(item_ids) and item_ids[index] == item_id:
+            self.columns = (
+                item_ids[:index] + item_ids[index + 1:],
+                favorite_ids[:index] + favorite_ids[index + 1:]
+            )
+
+    def nbytes(self) -> int:
+        item_ids, favorite_ids = self.columns
+        return USER_OVERHEAD_BYTES + (len(item_ids) + len(favorite_ids)) * item_ids.itemsize
+
+
+class MembershipIndex:
+    def __init__(self, max_users: int = 100000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_users = max_users
+        self.max_bytes = max_bytes
+        self._users: "OrderedDict[int, UserFavorites]" = OrderedDict()
+        # Per-user write generations and warm loads in flight; a user is only
+        # tracked while it has a load in flight
+        self._generations: Dict[int, int] = {}
+        self._loading: Dict[int, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id: int) -> Optional[UserFavorites]:
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._users.move_to_end(user_id)
+            self.hits += 1
+            return entry
+
+    def generation(self, user_id: int) -> int:
+        """
+        Start warming a user: take its generation before reading its rows. Every
+        call must be followed by load(), or by abandon() if the read fails
+        """
+        with self._lock:
+            self._loading[user_id] = self._loading.get(user_id, 0) + 1
+            return self._generations.get(user_id, 0)
+
+    def load(self, user_id: int, rows: Iterable[Tuple[int, int]], generation: int) -> Optional[UserFavorites]:
+        """
+        Build a user's entry from (item_id, favorite_id) rows read after
+        generation(user_id) was taken. The entry is kept only if no write for
+        the user happened in between; either way it answers the current request.
+        Returns None when the ids do not fit the index's 32-bit columns.
+        """
+        try:
+            entry = UserFavorites(rows)
+        except OverflowError:
+            entry = None
+        with self._lock:
+            if entry is not None and generation == self._generations.get(user_id, 0):
+                self._store(user_id, entry)
+            self._finish_load(user_id)
+        return entry
+
+    def abandon(self, user_id: int):
+        """End a warm started with generation() whose read failed"""
+        with self._lock:
+            self._finish_load(user_id)
+
+    def added(self, user_id: int, item_id: int, favorite_id: int):
+        self._apply(user_id, lambda entry: entry.add(item_id, favorite_id))
+
+    def removed(self, user_id: int, item_id: int):
+        self._apply(user_id, lambda entry: entry.remove(item_id))
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._bump(user_id)
+            self._drop(user_id)
+
+    def _bump(self, user_id: int):
+        # Only a load in flight can hold a stale read
+        if user_id in self._loading:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+    def _finish_load(self, user_id: int):
+        pending = self._loading.get(user_id, 0) - 1
+        if pending > 0:
+            self._loading[user_id] = pending
+        else:
+            self._loading.pop(user_id, None)
+            self._generations.pop(user_id, None)
+
+    def _apply(self, user_id: int, change):
+        with self._lock:
+            self._bump(user_id)
+            entry = self._users.get(user_id)
+            if entry is None:
+                return
+            self._bytes -= entry.nbytes()
+            try:
+                change(entry)
+            except OverflowError:
+                del self._users[user_id]
+                return
+            self._bytes += entry.nbytes()
+            self._evict()
+
+    def _store(self, user_id: int, entry: UserFavorites):
+        self._drop(user_id)
+        self._users[user_id] = entry
+        self._bytes += entry.nbytes()
+        self._evict()
+
+    def _drop(self, user_id: int):
+        entry = self._users.pop(user_id, None)
+        if entry is not None:
+            self._bytes -= entry.nbytes()
+
+    def _evict(self):
+        while self._users and (len(self._users) > self.max_users or self._bytes > self.max_bytes):
+            _, entry = self._users.popitem(last=False)
+            self._bytes -= entry.nbytes()
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "users": len(self._users),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+def build_membership_index(settings: Settings) -> Optional[MembershipIndex]:
+    if not settings.membership_index:
+        return None
+    return MembershipIndex(settings.membership_max_users, settings.membership_max_bytes)
+
+
+# Process-wide index for apps assembled by hand; create_app builds one per app
+membership_index: Optional[MembershipIndex] = build_membership_index(get_settings())
+
+
+def get_membership_index(request: Request) -> Optional[MembershipIndex]:
+    return getattr(request.app.state, "membership_index", membership_index)
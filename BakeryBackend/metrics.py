@@ -0,0 +1,211 @@
+"""
+In-process metrics for Bakery Backend, rendered in the Prometheus text format
+"""
+
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+# Default latency buckets in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REGISTRY: List["_Metric"] = []
+
+
+def format_bound(bound: float) -> str:
+    """Bucket upper bound as a Prometheus "le" label value"""
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [
+        '%s="%s"' % (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in zip(labelnames, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{%s}" % ",".join(pairs) if pairs else ""
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, per label set"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in items]
+
+
+class Gauge(Counter):
+    """Value that can go up and down, per label set"""
+
+    type_name = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Thread-safe cumulative histogram of observed values, per label set"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> [bucket counts..., sum, max]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0, 0.0]
+            series[index] += 1
+            series[-2] += value
+            if value > series[-1]:
+                series[-1] = value
+
+    def snapshot(self, **labels) -> Dict[str, object]:
+        with self._lock:
+            series = list(self._series.get(self._key(labels)) or [0] * (len(self.buckets) + 1) + [0.0, 0.0])
+        counts, total, maximum = series[:-2], series[-2], series[-1]
+        cumulative, running = {}, 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            running += count
+            cumulative[format_bound(bound)] = running
+        return {"count": running, "sum": total, "max": maximum, "buckets": cumulative}
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            keys = sorted(self._series)
+        lines = []
+        for key in keys:
+            snapshot = self.snapshot(**dict(zip(self.labelnames, key)))
+            for bound, count in snapshot["buckets"].items():
+                labels = _format_labels(self.labelnames, key, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {snapshot['sum']}")
+            lines.append(f"{self.name}_count{labels} {snapshot['count']}")
+        return lines
+
+
+def render_prometheus() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# HTTP (recorded by MetricsMiddleware)
+http_requests = Counter(
+    "bakery_http_requests_total", "HTTP requests by route, method and status code",
+    ("route", "method", "status")
+)
+http_request_duration = Histogram(
+    "bakery_http_request_duration_seconds", "HTTP request latency by route and method",
+    ("route", "method")
+)
+http_requests_in_flight = Gauge(
+    "bakery_http_requests_in_flight", "HTTP requests currently being served"
+)
+
+# Database (recorded by engine events and the pool)
+db_queries = Counter(
+    "bakery_db_queries_total", "SQL statements executed by operation", ("operation",)
+)
+db_query_duration = Histogram(
+    "bakery_db_query_duration_seconds", "SQL statement execution time by operation", ("operation",)
+)
+db_pool_checkout_wait = Histogram(
+    "bakery_db_pool_checkout_wait_seconds",
+    "Time spent waiting to check a connection out of the database pool"
+)
+db_pool_connections = Gauge(
+    "bakery_db_pool_connections", "Database pool connections by pool and state", ("pool", "state")
+)
+db_read_sessions = Counter(
+    "bakery_db_read_sessions_total", "Sessions handed to read-only endpoints by target database", ("target",)
+)
+group_commit_batch_size = Histogram(
+    "bakery_group_commit_batch_size", "Favorite writes committed per group-commit transaction",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+)
+compressed_responses = Counter(
+    "bakery_compressed_responses_total",
+    "Responses compressed by encoding and source (compressed, cache or stream)", ("encoding", "source")
+)
+event_stream_subscribers = Gauge(
+    "bakery_event_stream_subscribers", "Open GET /favorites/{user_id}/stream connections"
+)
+event_stream_dropped = Counter(
+    "bakery_event_stream_dropped_total", "Event stream subscribers dropped for falling behind"
+)
+single_flight_requests = Counter(
+    "bakery_single_flight_requests_total",
+    "List reads run (leader) or shared from a coalesced read (follower)", ("role",)
+)
+
+# Admission control
+admission_decisions = Counter(
+    "bakery_admission_decisions_total",
+    "Requests admitted, admitted after queueing, shed (503) or rate limited (429) by admission control",
+    ("decision",)
+)
+admission_queue_depth = Gauge(
+    "bakery_admission_queue_depth", "Requests waiting for an admission slot"
+)
+admission_queue_wait = Histogram(
+    "bakery_admission_queue_wait_seconds", "Time requests spent waiting for an admission slot"
+)
@@ -4,58 +4,118 @@ Middleware for Bakery Backend
 
 import uuid
 import time
+import random
 import logging
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from typing import Callable
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from BakeryBackend.metrics import http_requests, http_request_duration, http_requests_in_flight
 
 logger = logging.getLogger(__name__)
 
 
-class RequestMiddleware(BaseHTTPMiddleware):
+def _request_url(scope: Scope) -> str:
+    """Rebuild the request URL from the ASGI scope (only called when it is logged)"""
+    host = next((value.decode("latin-1") for key, value in scope["headers"] if key == b"host"), None)
+    if host is None and scope.get("server"):
+        host = "%s:%s" % scope["server"]
+    url = "%s://%s%s" % (scope.get("scheme", "http"), host or "", scope.get("root_path", "") + scope["path"])
+    if scope.get("query_string"):
+        url += "?" + scope["query_string"].decode("latin-1")
+    return url
+
+
+class RequestMiddleware:
     """
-    Middleware to add request ID and log requests
+    Middleware to add request ID and log requests.
+
+    Written as plain ASGI rather than BaseHTTPMiddleware, so requests are not
+    routed through an extra task and memory stream and streaming responses
+    pass straight through. log_sample_rate is the fraction of requests whose
+    start/completion lines are logged; failures are always logged.
     """
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        # Generate unique request ID
+
+    def __init__(self, app: ASGIApp, log_sample_rate: float = 1.0):
+        self.app = app
+        self.log_sample_rate = log_sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Generate unique request ID, exposed as request.state.request_id
         request_id = str(uuid.uuid4())
-        request.state.request_id = request_id
-        
-        # Add request ID to response headers
-        start_time = time.time()
-        
-        # Log incoming request
-        logger.info(
-            f"Request started - ID: {request_id} | "
-            f"Method: {request.method} | "
-            f"URL: {request.url} | "
-            f"Client: {request.client.host if request.client else 'unknown'}"
+        scope.setdefault("state", {})["request_id"] = request_id
+
+        start_time = time.perf_counter()
+        log_request = (
+            logger.isEnabledFor(logging.INFO)
+            and (self.log_sample_rate >= 1.0 or random.random() < self.log_sample_rate)
         )
-        
-        try:
-            response = await call_next(request)
-            
-            # Calculate request duration
-            duration = time.time() - start_time
-            
-            # Add request ID to response headers
-            response.headers["X-Request-ID"] = request_id
-            
-            # Log response
+        if log_request:
+            client = scope.get("client")
             logger.info(
-                f"Request completed - ID: {request_id} | "
-                f"Status: {response.status_code} | "
-                f"Duration: {duration:.3f}s"
+                "Request started - ID: %s | Method: %s | URL: %s | Client: %s",
+                request_id, scope["method"], _request_url(scope), client[0] if client else "unknown"
             )
-            
-            return response
-            
+
+        status_code = None
+
+        async def send_with_request_id(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # Add request ID to response headers
+                MutableHeaders(scope=message)["X-Request-ID"] = request_id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
         except Exception as exc:
-            duration = time.time() - start_time
             logger.error(
-                f"Request failed - ID: {request_id} | "
-                f"Duration: {duration:.3f}s | "
-                f"Error: {str(exc)}"
+                "Request failed - ID: %s | Duration: %.3fs | Error: %s",
+                request_id, time.perf_counter() - start_time, exc
             )
-            raise exc
\ No newline at end of file
+            raise
+
+        if log_request:
+            logger.info(
+                "Request completed - ID: %s | Status: %s | Duration: %.3fs",
+                request_id, status_code, time.perf_counter() - start_time
+            )
+
+
+class MetricsMiddleware:
+    """
+    Record per-route request counts, status codes, latency and in-flight
+    requests. Routes are labelled by their path template (e.g.
+    /favorites/{user_id}) so label cardinality stays bounded.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        start_time = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - start_time
+            http_requests_in_flight.dec()
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            http_requests.inc(route=route_path, method=scope["method"], status=status_code)
+            http_request_duration.observe(duration, route=route_path, method=scope["method"])
@@ -1,10 +1,64 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, Index, delete, func, inspect, select
 from BakeryBackend.database import Base
 
 class Favorite(Base):
     __tablename__ = "favorites"
+    __table_args__ = (
+        # One favorite per (user, item); also serves lookups by user_id + item_id
+        Index("uq_favorites_user_item", "user_id", "item_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, index=True)
     item_id = Column(Integer, index=True)
     item_name = Column(String, nullable=False)
+
+
+def remove_duplicate_favorites(bind) -> list:
+    """
+    Delete all but the first (lowest id) favorite of each (user_id, item_id)
+    pair, so the unique index can be created on a table from before it.
+    Returns the (user_id, item_id) pairs that had duplicates; a table that
+    already has the index is not scanned
+    """
+    inspector = inspect(bind)
+    if not inspector.has_table(Favorite.__tablename__):
+        return []
+    if any(index["name"] == "uq_favorites_user_item" for index in inspector.get_indexes(Favorite.__tablename__)):
+        return []
+    with bind.begin() as conn:
+        pairs = conn.execute(
+            select(Favorite.user_id, Favorite.item_id)
+            .group_by(Favorite.user_id, Favorite.item_id)
+            .having(func.count() > 1)
+        ).all()
+        if pairs:
+            first_ids = select(func.min(Favorite.id)).group_by(Favorite.user_id, Favorite.item_id)
+            conn.execute(delete(Favorite).where(Favorite.id.not_in(first_ids)))
+    return [tuple(pair) for pair in pairs]
+
+
+def create_missing_indexes(bind):
+    """Create indexes added after an existing favorites table was created"""
+    for index in Favorite.__table__.indexes:
+        index.create(bind=bind, checkfirst=True)
+
+
+class ItemFavoriteCount(Base):
+    """Number of favorites per item, maintained in the same transaction as favorites writes"""
+    __tablename__ = "item_favorite_counts"
+    __table_args__ = (
+        Index("ix_item_favorite_counts_count", "favorite_count", "item_id"),
+    )
+
+    item_id = Column(Integer, primary_key=True)
+    favorite_count = Column(Integer, nullable=False, default=0)
+
+
+class FavoriteListVersion(Base):
+    """Version of a user's or item's favorites list, bumped in the same transaction as every write to it"""
+    __tablename__ = "favorite_list_versions"
+
+    scope = Column(String(8), primary_key=True)  # "user" or "item"
+    owner_id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
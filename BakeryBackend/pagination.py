@@ -0,0 +1,56 @@
+"""
+Keyset pagination helpers for favorites listings.
+
+Pages are ordered by favorites.id and continue with "id > last_id", so each
+page is an index range scan regardless of how deep the client has paged.
+The cursor handed to clients is an opaque token wrapping that last id.
+"""
+
+import base64
+import json
+from typing import Optional, Tuple
+
+from BakeryBackend.config import Settings
+from BakeryBackend.exceptions import ValidationError
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(last_id: int) -> str:
+    raw = json.dumps({"after_id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        after_id = json.loads(base64.urlsafe_b64decode(padded))["after_id"]
+        if not isinstance(after_id, int) or after_id < 0:
+            raise ValueError(after_id)
+        return after_id
+    except (ValueError, KeyError, TypeError):
+        raise ValidationError(
+            message="Invalid pagination cursor",
+            details={"cursor": cursor}
+        )
+
+
+def resolve_page(limit: Optional[int], cursor: Optional[str], settings: Settings) -> Tuple[int, int]:
+    """Validate page parameters against the app's page limits, returning (limit, after_id)"""
+    if limit is None:
+        limit = settings.page_default_limit
+    if limit <= 0 or limit > settings.page_max_limit:
+        raise ValidationError(
+            message="Invalid page limit provided",
+            details={"limit": limit, "requirement": f"must be between 1 and {settings.page_max_limit}"}
+        )
+    after_id = decode_cursor(cursor) if cursor else 0
+    return limit, after_id
+
+
+def split_page(rows: list, limit: int) -> Tuple[list, Optional[str]]:
+    """Trim a limit + 1 fetch to one page and build the cursor for the next"""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1]["id"])
+    return rows, None
@@ -0,0 +1,81 @@
+"""
+Per-item favorite counters backing the popularity endpoints.
+
+Counts live in item_favorite_counts and are adjusted by the same
+transaction that inserts or deletes favorites, so reading a count or the
+top-N items never scans the favorites table.
+"""
+
+from typing import Dict, Iterable
+
+from sqlalchemy import delete, func, inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from BakeryBackend.models import Favorite as FavoriteModel, ItemFavoriteCount
+
+UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def increment_counts_statement(dialect_name: str):
+    """INSERT ... ON CONFLICT DO UPDATE adding each row's favorite_count to the stored one"""
+    if dialect_name not in UPSERT_INSERTS:
+        raise NotImplementedError(f"Popularity counters do not support the '{dialect_name}' dialect")
+    stmt = UPSERT_INSERTS[dialect_name](ItemFavoriteCount)
+    return stmt.on_conflict_do_update(
+        index_elements=[ItemFavoriteCount.item_id],
+        set_={"favorite_count": ItemFavoriteCount.favorite_count + stmt.excluded.favorite_count}
+    )
+
+
+def increment_params(deltas: Dict[int, int]) -> list:
+    return [{"item_id": item_id, "favorite_count": delta} for item_id, delta in deltas.items() if delta]
+
+
+def decrement_statement(item_id: int):
+    return (
+        update(ItemFavoriteCount)
+        .where(ItemFavoriteCount.item_id == item_id)
+        .values(favorite_count=ItemFavoriteCount.favorite_count - 1)
+    )
+
+
+def increment_item_counts(db, deltas: Dict[int, int]):
+    """Add deltas (item_id -> change) to the counters inside db's transaction"""
+    params = increment_params(deltas)
+    if params:
+        db.execute(increment_counts_statement(db.get_bind().dialect.name), params)
+
+
+def decrement_item_count(db, item_id: int):
+    db.execute(decrement_statement(item_id))
+
+
+def create_item_counts_table(bind):
+    """Create item_favorite_counts, backfilling it when favorites already has rows"""
+    inspector = inspect(bind)
+    if inspector.has_table(ItemFavoriteCount.__tablename__):
+        return
+    ItemFavoriteCount.__table__.create(bind=bind)
+    if not inspector.has_table(FavoriteModel.__tablename__):
+        return
+    with bind.begin() as conn:
+        conn.execute(
+            ItemFavoriteCount.__table__.insert().from_select(
+                ["item_id", "favorite_count"],
+                select(FavoriteModel.item_id, func.count()).group_by(FavoriteModel.item_id)
+            )
+        )
+
+
+def recount_items(conn, item_ids: Iterable[int]):
+    """Recompute the counters of these items from the favorites table"""
+    item_ids = list(item_ids)
+    conn.execute(delete(ItemFavoriteCount).where(ItemFavoriteCount.item_id.in_(item_ids)))
+    conn.execute(
+        ItemFavoriteCount.__table__.insert().from_select(
+            ["item_id", "favorite_count"],
+            select(FavoriteModel.item_id, func.count())
+            .where(FavoriteModel.item_id.in_(item_ids))
+            .group_by(FavoriteModel.item_id)
+        )
+    )
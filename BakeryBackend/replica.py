@@ -0,0 +1,189 @@
+"""
+Read routing between the primary database and an optional read replica.
+
+Read-only endpoints take their session from get_read_db, which hands out a
+replica session unless the request should see a write made within the last
+replica_max_lag_seconds. Those reads go to the primary so a client always
+sees its own writes, even while the replica is still catching up. Writes
+always use get_db (the primary) and record what they touched with
+RequestWrites.mark.
+
+A write pins reads two ways. The process remembers the users and items it
+wrote (RecentWrites), which pins anyone's reads of them, but only in this
+process. The response also carries the write time in the bakery_last_write
+cookie and the X-Last-Write header. A client that sends either back has its
+reads pinned in every worker process, which is what keeps read-your-writes
+under `serve --workers N`, where its next read may land on another worker.
+
+SQLiteReplicator copies one SQLite file onto another after a delay, which is
+enough to exercise replica lag locally with two database files.
+"""
+
+import math
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+from fastapi import Depends, Request, Response
+from sqlalchemy.orm import Session
+
+from BakeryBackend.config import Settings, get_settings
+from BakeryBackend.database import Database, database, get_db, get_replica_db
+from BakeryBackend.metrics import db_read_sessions
+
+# Path or query parameters whose recent writes pin a request to the primary
+PINNED_PARAMS = ("user_id", "item_id")
+
+# Where a write's time (Unix seconds) travels back and forth with the client
+LAST_WRITE_COOKIE = "bakery_last_write"
+LAST_WRITE_HEADER = "X-Last-Write"
+
+
+class RecentWrites:
+    """Which users and items were written recently, so their reads can skip the replica"""
+
+    def __init__(self, window_seconds: float, clock=time.monotonic, wall_clock=time.time):
+        self.window_seconds = window_seconds
+        self.clock = clock
+        # Comparable across processes, for the times clients send back
+        self.wall_clock = wall_clock
+        self._pinned_until: Dict[Tuple[str, int], float] = {}
+        self._next_prune = clock() + window_seconds
+
+    def mark(self, user_ids: Iterable[int] = (), item_ids: Iterable[int] = ()):
+        """Record a committed write touching these users and items"""
+        now = self.clock()
+        until = now + self.window_seconds
+        for user_id in user_ids:
+            self._pinned_until[("user_id", user_id)] = until
+        for item_id in item_ids:
+            self._pinned_until[("item_id", item_id)] = until
+        if now >= self._next_prune:
+            self._prune(now)
+
+    def pinned(self, field: str, value: int) -> bool:
+        until = self._pinned_until.get((field, value))
+        return until is not None and until > self.clock()
+
+    def pinned_request(self, params: Mapping[str, str]) -> bool:
+        """Whether any user_id/item_id among a request's path or query parameters was written within the window"""
+        for field in PINNED_PARAMS:
+            raw = params.get(field)
+            if raw is None:
+                continue
+            try:
+                value = int(raw)
+            except ValueError:
+                continue
+            if self.pinned(field, value):
+                return True
+        return False
+
+    def _prune(self, now: float):
+        self._next_prune = now + self.window_seconds
+        for key, until in list(self._pinned_until.items()):
+            if until <= now:
+                self._pinned_until.pop(key, None)
+
+    def __len__(self):
+        return len(self._pinned_until)
+
+
+class RequestWrites:
+    """
+    One request's view of RecentWrites: mark() also stamps the response with
+    the write time, and pinned() honours the time the client sent back
+    """
+
+    __slots__ = ("tracker", "request", "response")
+
+    def __init__(self, tracker: RecentWrites, request: Request, response: Response):
+        self.tracker = tracker
+        self.request = request
+        self.response = response
+
+    def mark(self, user_ids: Iterable[int] = (), item_ids: Iterable[int] = ()):
+        """Record a committed write touching these users and items"""
+        self.tracker.mark(user_ids, item_ids)
+        stamp = f"{self.tracker.wall_clock():.3f}"
+        self.response.headers[LAST_WRITE_HEADER] = stamp
+        self.response.set_cookie(
+            LAST_WRITE_COOKIE, stamp, max_age=math.ceil(self.tracker.window_seconds) + 1,
+            httponly=True, samesite="lax"
+        )
+
+    def pinned(self) -> bool:
+        """Whether this request must read from the primary to see a recent write"""
+        request = self.request
+        if self.tracker.pinned_request({**request.query_params, **request.path_params}):
+            return True
+        raw = request.headers.get(LAST_WRITE_HEADER) or request.cookies.get(LAST_WRITE_COOKIE)
+        try:
+            written_at = float(raw)
+        except (TypeError, ValueError):
+            return False
+        return self.tracker.wall_clock() - written_at < self.tracker.window_seconds
+
+
+def build_recent_writes(settings: Settings, db: Database) -> Optional[RecentWrites]:
+    if db.ReplicaSessionLocal is None:
+        return None
+    return RecentWrites(settings.replica_max_lag_seconds)
+
+
+# Process-wide tracker for apps assembled by hand; create_app builds one per app
+recent_writes: Optional[RecentWrites] = build_recent_writes(get_settings(), database)
+
+
+def get_recent_writes(request: Request, response: Response) -> Optional[RequestWrites]:
+    """Dependency returning the request's write tracker, or None when there is no replica"""
+    tracker = getattr(request.app.state, "recent_writes", recent_writes)
+    return None if tracker is None else RequestWrites(tracker, request, response)
+
+
+def get_read_db(
+    primary: Session = Depends(get_db),
+    replica: Optional[Session] = Depends(get_replica_db),
+    writes: Optional[RequestWrites] = Depends(get_recent_writes)
+) -> Session:
+    """Session for read-only endpoints: the replica unless the request should see a recent write"""
+    if replica is None or (writes is not None and writes.pinned()):
+        db_read_sessions.inc(target="primary")
+        return primary
+    db_read_sessions.inc(target="replica")
+    return replica
+
+
+class SQLiteReplicator:
+    """Copy a primary SQLite file onto a replica file, delay_seconds behind, for local testing"""
+
+    def __init__(self, primary_path: str, replica_path: str, delay_seconds: float = 1.0):
+        self.primary_path = primary_path
+        self.replica_path = replica_path
+        self.delay_seconds = delay_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sync(self):
+        """Copy the primary's committed state onto the replica now"""
+        source = sqlite3.connect(self.primary_path)
+        target = sqlite3.connect(self.replica_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sqlite-replicator", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.delay_seconds):
+            self.sync()
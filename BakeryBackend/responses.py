@@ -0,0 +1,43 @@
+"""
+Fast JSON responses for the favorites list endpoints (BAKERY_FAST_JSON_LISTS).
+
+List handlers normally return plain dicts that FastAPI re-validates against
+List[Favorite] and then serializes, which is per-row Python work that grows
+with the page size. Rows read from the database already have the schema's
+shape, so the fast path skips that step and encodes them directly with
+orjson (listed in requirements.txt). The standard library is the fallback
+for installs without it; both emit the same bytes as FastAPI's default
+encoding for these rows (compact separators, non-ASCII left unescaped).
+"""
+
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ModuleNotFoundError:  # installs without requirements.txt fall back to json
+    orjson = None
+
+
+def dumps_json(content: Any) -> bytes:
+    """Encode content as compact UTF-8 JSON"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            pass  # e.g. integers beyond 64 bits, which json handles
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse whose content is encoded as-is, without response_model validation"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
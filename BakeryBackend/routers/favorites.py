@@ -1,10 +1,49 @@
-from fastapi import APIRouter, Depends
+import csv
+import heapq
+import io
+import json
+from contextlib import ExitStack
+from fastapi import APIRouter, Depends, Header, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError as PydanticValidationError
+from sqlalchemy import delete, insert, or_, select, true, tuple_
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError
-from typing import List
-from BakeryBackend.database import get_db
-from BakeryBackend.models import Favorite as FavoriteModel
-from BakeryBackend.schemas import Favorite
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from typing import List, Dict, Any, Optional
+from BakeryBackend.config import Settings, get_app_settings
+from BakeryBackend.database import get_db, get_shards
+from BakeryBackend.sharding import ShardSet
+from BakeryBackend.cache import Cache, get_favorites_cache, user_favorites_key
+from BakeryBackend.membership import MembershipIndex, UserFavorites, get_membership_index
+from BakeryBackend.pagination import NEXT_CURSOR_HEADER, resolve_page, split_page
+from BakeryBackend.models import Favorite as FavoriteModel, ItemFavoriteCount
+from BakeryBackend.popularity import increment_item_counts, decrement_item_count
+from BakeryBackend.replica import RequestWrites, get_read_db, get_recent_writes
+from BakeryBackend.events import ADDED, DELETED, EventHub, event_frames, get_event_hub
+from BakeryBackend.singleflight import SingleFlight, get_single_flight
+from BakeryBackend.group_commit import AddFavorite, DeleteFavorite, GroupCommitter, get_group_committer
+from BakeryBackend.versions import (
+    USER_SCOPE,
+    ITEM_SCOPE,
+    bump_versions,
+    list_version,
+    list_etag,
+    etag_matches,
+    cache_headers,
+    not_modified
+)
+from BakeryBackend.responses import FastJSONResponse, dumps_json
+from BakeryBackend.schemas import (
+    Favorite,
+    FavoriteBulkRequest,
+    FavoriteBulkResult,
+    FavoriteBulkResponse,
+    ItemPopularity,
+    FavoriteCheckRequest,
+    FavoriteCheckResponse,
+    FavoriteBulkDeleteRequest,
+    FavoriteBulkDeleteResponse
+)
 from BakeryBackend.exceptions import (
     ValidationError,
     NotFoundError,
@@ -15,23 +54,121 @@ from BakeryBackend.exceptions import (
 
 router = APIRouter(prefix="/favorites", tags=["Favorites"])
 
+# Upper bound on items accepted by a single bulk request
+BULK_MAX_ITEMS = 10000
+
+# Upper bound on item_ids accepted by one batch favorite check
+CHECK_MAX_ITEMS = 500
+
+# Upper bound on favorite_ids plus item_ids in one bulk delete
+DELETE_MAX_ITEMS = 1000
+
+# Rows fetched per round trip while streaming an export
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+EXPORT_COLUMNS = ("id", "user_id", "item_id", "item_name")
+
+# (user_id, item_id) pairs per duplicate probe; keeps each IN (...) well
+# below SQLite's bound parameter limit
+BULK_PROBE_CHUNK = 400
+
+ID_LABELS = {"user_id": "user ID", "item_id": "item ID", "favorite_id": "favorite ID"}
+
+
+def require_positive_id(field: str, value: int):
+    """Raise ValidationError unless an ID parameter is a positive integer"""
+    if value <= 0:
+        raise ValidationError(
+            message=f"Invalid {ID_LABELS[field]} provided",
+            details={field: value, "requirement": "must be positive integer"}
+        )
+
+
+def user_membership(
+    index: Optional[MembershipIndex],
+    db: Session,
+    user_id: int
+) -> Optional[UserFavorites]:
+    """A user's entry in the membership index, warming it from the database on a miss"""
+    if index is None:
+        return None
+    entry = index.get(user_id)
+    if entry is None:
+        generation = index.generation(user_id)
+        try:
+            rows = db.execute(
+                select(FavoriteModel.item_id, FavoriteModel.id).where(FavoriteModel.user_id == user_id)
+            ).all()
+        except BaseException:
+            index.abandon(user_id)
+            raise
+        entry = index.load(user_id, rows, generation)
+    return entry
+
+
+# Column-only select for list pages: rows come back as tuples, with no ORM
+# objects or identity map to build
+LIST_COLUMNS = (FavoriteModel.id, FavoriteModel.user_id, FavoriteModel.item_id, FavoriteModel.item_name)
+
+def favorite_rows(rows) -> List[Dict[str, Any]]:
+    """Plain dicts for (id, user_id, item_id, item_name) tuples, as cached and returned by list endpoints"""
+    return [
+        {"id": id_, "user_id": user_id, "item_id": item_id, "item_name": item_name}
+        for id_, user_id, item_id, item_name in rows
+    ]
+
+
+def encode_page(favorites: List[Dict[str, Any]], settings: Settings) -> Optional[bytes]:
+    """A page's JSON body when list pages skip response_model, so coalesced requests share one encoding"""
+    return dumps_json(favorites) if settings.fast_json_lists else None
+
+
+def list_page(
+    response: Response,
+    favorites: List[Dict[str, Any]],
+    next_cursor: Optional[str],
+    etag: str,
+    settings: Settings,
+    body: Optional[bytes] = None
+):
+    """
+    Return value for a list endpoint, setting the next-page cursor and caching
+    headers. With settings.fast_json_lists the page is returned as
+    FastJSONResponse instead of going through response_model
+    """
+    headers = cache_headers(etag, settings)
+    if next_cursor:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    if settings.fast_json_lists:
+        if body is not None:
+            return Response(content=body, media_type="application/json", headers=headers)
+        return FastJSONResponse(favorites, headers=headers)
+    response.headers.update(headers)
+    return favorites
+
+
+def coalesced(flights: Optional[SingleFlight], key: tuple, load):
+    """load() run through the request coalescer, or directly when it is disabled"""
+    return load() if flights is None else flights.do(key, load)
+
 
 @router.post("/", response_model=Favorite)
-def add_favorite(favorite: Favorite, db: Session = Depends(get_db)):
+def add_favorite(
+    favorite: Favorite,
+    db: Session = Depends(get_db),
+    cache: Cache = Depends(get_favorites_cache),
+    membership: Optional[MembershipIndex] = Depends(get_membership_index),
+    writes: Optional[RequestWrites] = Depends(get_recent_writes),
+    events: Optional[EventHub] = Depends(get_event_hub),
+    flights: Optional[SingleFlight] = Depends(get_single_flight),
+    committer: Optional[GroupCommitter] = Depends(get_group_committer)
+):
     """Add a new favorite item for a user"""
     try:
         # Input validation
-        if favorite.user_id <= 0:
-            raise ValidationError(
-                message="Invalid user ID provided",
-                details={"user_id": favorite.user_id, "requirement": "must be positive integer"}
-            )
-        
-        if favorite.item_id <= 0:
-            raise ValidationError(
-                message="Invalid item ID provided", 
-                details={"item_id": favorite.item_id, "requirement": "must be positive integer"}
-            )
+        require_positive_id("user_id", favorite.user_id)
+        require_positive_id("item_id", favorite.item_id)
         
         if not favorite.item_name or len(favorite.item_name.strip()) == 0:
             raise ValidationError(
@@ -39,32 +176,72 @@ def add_favorite(favorite: Favorite, db: Session = Depends(get_db)):
                 details={"item_name": favorite.item_name}
             )
 
-        # Duplicate detection
-        existing = db.query(FavoriteModel).filter(
-            FavoriteModel.user_id == favorite.user_id,
-            FavoriteModel.item_id == favorite.item_id
-        ).first()
-        
-        if existing:
+        # A duplicate of a favorite already in the membership index is answered
+        # without touching the database (cold users are not warmed here)
+        warm = membership.get(favorite.user_id) if membership is not None else None
+        known_id = warm.favorite_id(favorite.item_id) if warm is not None else None
+        if known_id is not None:
             raise ConflictError(
                 message="Favorite already exists for this user and item",
                 details={
                     "user_id": favorite.user_id,
                     "item_id": favorite.item_id,
-                    "existing_favorite_id": existing.id
+                    "existing_favorite_id": known_id
                 }
             )
-        
-        # Create new favorite
-        db_fav = FavoriteModel(
+
+        item_name = favorite.item_name.strip()
+        if committer is not None:
+            # Committed with other queued writes; raises ConflictError for duplicates
+            favorite_id = committer.submit(
+                AddFavorite(favorite.user_id, favorite.item_id, item_name)
+            ).result()
+        else:
+            # Single INSERT; the unique (user_id, item_id) index rejects duplicates,
+            # so the happy path needs no read before or after the write
+            try:
+                favorite_id = db.execute(
+                    insert(FavoriteModel)
+                    .values(user_id=favorite.user_id, item_id=favorite.item_id, item_name=item_name)
+                    .returning(FavoriteModel.id)
+                ).scalar_one()
+                increment_item_counts(db, {favorite.item_id: 1})
+                bump_versions(db, user_ids=(favorite.user_id,), item_ids=(favorite.item_id,))
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                existing_id = db.scalar(
+                    select(FavoriteModel.id).where(
+                        FavoriteModel.user_id == favorite.user_id,
+                        FavoriteModel.item_id == favorite.item_id
+                    )
+                )
+                raise ConflictError(
+                    message="Favorite already exists for this user and item",
+                    details={
+                        "user_id": favorite.user_id,
+                        "item_id": favorite.item_id,
+                        "existing_favorite_id": existing_id
+                    }
+                )
+        cache.invalidate(user_favorites_key(favorite.user_id))
+        if membership is not None:
+            membership.added(favorite.user_id, favorite.item_id, favorite_id)
+        if writes is not None:
+            writes.mark(user_ids=(favorite.user_id,), item_ids=(favorite.item_id,))
+        if flights is not None:
+            flights.forget(user_ids=(favorite.user_id,), item_ids=(favorite.item_id,))
+        if events is not None:
+            events.publish(ADDED, favorite.user_id, [
+                {"favorite_id": favorite_id, "item_id": favorite.item_id, "item_name": item_name}
+            ])
+
+        return FavoriteModel(
+            id=favorite_id,
             user_id=favorite.user_id,
             item_id=favorite.item_id,
-            item_name=favorite.item_name.strip()
+            item_name=item_name
         )
-        db.add(db_fav)
-        db.commit()
-        db.refresh(db_fav)
-        return db_fav
         
     except SQLAlchemyError as e:
         db.rollback()
@@ -78,22 +255,353 @@ def add_favorite(favorite: Favorite, db: Session = Depends(get_db)):
         )
 
 
+def _bulk_item_errors(raw: Dict[str, Any]):
+    """Validate one bulk payload item, returning (favorite, errors)"""
+    try:
+        favorite = Favorite.model_validate(raw)
+    except PydanticValidationError as e:
+        return None, [
+            {
+                "field": " -> ".join(str(loc) for loc in error["loc"]),
+                "message": error["msg"],
+                "type": error["type"]
+            }
+            for error in e.errors()
+        ]
+
+    errors = []
+    if favorite.user_id <= 0:
+        errors.append({"field": "user_id", "message": "Invalid user ID provided", "type": "value_error"})
+    if favorite.item_id <= 0:
+        errors.append({"field": "item_id", "message": "Invalid item ID provided", "type": "value_error"})
+    return favorite, errors
+
+
+def _insert_bulk(db: Session, candidates: List[tuple]) -> List[tuple]:
+    """
+    Insert the new (result, favorite) candidates in one transaction on db, filling
+    in each result's status and favorite_id; returns the (result, row) pairs inserted
+    """
+    # Set-based duplicate detection against rows already stored
+    pairs = list({(fav.user_id, fav.item_id) for _, fav in candidates})
+    existing: Dict[tuple, int] = {}
+    for start in range(0, len(pairs), BULK_PROBE_CHUNK):
+        chunk = pairs[start:start + BULK_PROBE_CHUNK]
+        rows = db.execute(
+            select(FavoriteModel.user_id, FavoriteModel.item_id, FavoriteModel.id)
+            .where(tuple_(FavoriteModel.user_id, FavoriteModel.item_id).in_(chunk))
+        )
+        for user_id, item_id, favorite_id in rows:
+            existing[(user_id, item_id)] = favorite_id
+
+    # Rows that are new and not repeated earlier in the same batch
+    to_insert = []
+    first_in_batch: Dict[tuple, FavoriteBulkResult] = {}
+    repeated = []
+    for result, favorite in candidates:
+        key = (favorite.user_id, favorite.item_id)
+        if key in existing:
+            result.status = "conflict"
+            result.favorite_id = existing[key]
+            continue
+        if key in first_in_batch:
+            result.status = "conflict"
+            repeated.append((result, first_in_batch[key]))
+            continue
+        first_in_batch[key] = result
+        to_insert.append((result, {
+            "user_id": favorite.user_id,
+            "item_id": favorite.item_id,
+            "item_name": favorite.item_name.strip()
+        }))
+
+    if to_insert:
+        new_ids = db.scalars(
+            insert(FavoriteModel).returning(FavoriteModel.id, sort_by_parameter_order=True),
+            [row for _, row in to_insert]
+        ).all()
+        for (result, _), favorite_id in zip(to_insert, new_ids):
+            result.favorite_id = favorite_id
+        for result, first in repeated:
+            result.favorite_id = first.favorite_id
+        item_deltas: Dict[int, int] = {}
+        for _, row in to_insert:
+            item_deltas[row["item_id"]] = item_deltas.get(row["item_id"], 0) + 1
+        increment_item_counts(db, item_deltas)
+        bump_versions(db, user_ids={row["user_id"] for _, row in to_insert}, item_ids=item_deltas)
+    db.commit()
+    return to_insert
+
+
+@router.post("/bulk", response_model=FavoriteBulkResponse)
+def add_favorites_bulk(
+    payload: FavoriteBulkRequest,
+    db: Session = Depends(get_db),
+    cache: Cache = Depends(get_favorites_cache),
+    membership: Optional[MembershipIndex] = Depends(get_membership_index),
+    writes: Optional[RequestWrites] = Depends(get_recent_writes),
+    events: Optional[EventHub] = Depends(get_event_hub),
+    flights: Optional[SingleFlight] = Depends(get_single_flight),
+    shards: Optional[ShardSet] = Depends(get_shards)
+):
+    """Add many favorites in a single transaction (one per shard when storage is sharded)"""
+    if len(payload.favorites) > BULK_MAX_ITEMS:
+        raise ValidationError(
+            message="Too many favorites in bulk request",
+            details={"count": len(payload.favorites), "max_items": BULK_MAX_ITEMS}
+        )
+
+    # Validation pass
+    results: List[FavoriteBulkResult] = []
+    candidates = []
+    for index, raw in enumerate(payload.favorites):
+        favorite, errors = _bulk_item_errors(raw)
+        if errors:
+            results.append(FavoriteBulkResult(
+                index=index,
+                status="invalid",
+                user_id=favorite.user_id if favorite else None,
+                item_id=favorite.item_id if favorite else None,
+                errors=errors
+            ))
+            continue
+        result = FavoriteBulkResult(
+            index=index,
+            status="created",
+            user_id=favorite.user_id,
+            item_id=favorite.item_id
+        )
+        results.append(result)
+        candidates.append((result, favorite))
+
+    try:
+        if shards is None:
+            to_insert, error = _insert_bulk(db, candidates), None
+        else:
+            # One transaction per shard, run in parallel. Shards commit independently:
+            # when one fails, the others' rows stay and get their side effects below
+            by_shard: Dict[int, List[tuple]] = {}
+            for result, favorite in candidates:
+                by_shard.setdefault(shards.shard_for(favorite.user_id), []).append((result, favorite))
+            outcomes = shards.scatter(
+                lambda session, shard: _insert_bulk(session, by_shard[shard]), by_shard, return_exceptions=True
+            )
+            to_insert = [pair for outcome in outcomes if isinstance(outcome, list) for pair in outcome]
+            error = next((outcome for outcome in outcomes if isinstance(outcome, Exception)), None)
+        for user_id in {row["user_id"] for _, row in to_insert}:
+            cache.invalidate(user_favorites_key(user_id))
+            if membership is not None:
+                membership.invalidate(user_id)
+        if writes is not None:
+            writes.mark(
+                user_ids={row["user_id"] for _, row in to_insert},
+                item_ids={row["item_id"] for _, row in to_insert}
+            )
+        if flights is not None:
+            flights.forget(
+                user_ids={row["user_id"] for _, row in to_insert},
+                item_ids={row["item_id"] for _, row in to_insert}
+            )
+        if events is not None:
+            added: Dict[int, List[Dict[str, Any]]] = {}
+            for result, row in to_insert:
+                added.setdefault(row["user_id"], []).append(
+                    {"favorite_id": result.favorite_id, "item_id": row["item_id"], "item_name": row["item_name"]}
+                )
+            for user_id, favorites in added.items():
+                events.publish(ADDED, user_id, favorites)
+        if error is not None:
+            raise error
+
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise DatabaseError(
+            message="Failed to add favorites to database",
+            details={
+                "count": len(candidates),
+                "db_error": str(e)
+            }
+        )
+
+    return FavoriteBulkResponse(
+        created=sum(1 for r in results if r.status == "created"),
+        conflicts=sum(1 for r in results if r.status == "conflict"),
+        invalid=sum(1 for r in results if r.status == "invalid"),
+        results=results
+    )
+
+
+# Upper bound for GET /favorites/popular
+POPULAR_MAX_LIMIT = 100
+
+
+@router.get("/popular", response_model=List[ItemPopularity])
+def get_popular_items(
+    limit: int = 10,
+    db: Session = Depends(get_read_db),
+    shards: Optional[ShardSet] = Depends(get_shards)
+):
+    """Most favorited items, read from the per-item counters"""
+    if limit <= 0 or limit > POPULAR_MAX_LIMIT:
+        raise ValidationError(
+            message="Invalid limit provided",
+            details={"limit": limit, "requirement": f"must be between 1 and {POPULAR_MAX_LIMIT}"}
+        )
+    try:
+        query = (
+            select(ItemFavoriteCount.item_id, ItemFavoriteCount.favorite_count)
+            .where(ItemFavoriteCount.favorite_count > 0)
+            .order_by(ItemFavoriteCount.favorite_count.desc(), ItemFavoriteCount.item_id)
+            .limit(limit)
+        )
+        if shards is None:
+            rows = db.execute(query).all()
+        else:
+            # Candidates are each shard's top items, ranked by their counts summed
+            # over all shards; an item outside every shard's top `limit` is missed
+            candidates = {
+                item_id for rows in shards.scatter(lambda s, _: s.execute(query).all()) for item_id, _ in rows
+            }
+            counts = (
+                select(ItemFavoriteCount.item_id, ItemFavoriteCount.favorite_count)
+                .where(ItemFavoriteCount.item_id.in_(candidates))
+            )
+            totals: Dict[int, int] = {}
+            for rows in shards.scatter(lambda s, _: s.execute(counts).all()):
+                for item_id, count in rows:
+                    totals[item_id] = totals.get(item_id, 0) + count
+            rows = sorted(totals.items(), key=lambda pair: (-pair[1], pair[0]))[:limit]
+        return [{"item_id": item_id, "favorite_count": count} for item_id, count in rows]
+
+    except SQLAlchemyError as e:
+        raise DatabaseError(
+            message="Failed to retrieve popular items from database",
+            details={"limit": limit, "db_error": str(e)}
+        )
+
+
+def _export_batches(db: Session, query):
+    """Batches of query's rows, streamed from the database as they are consumed"""
+    yield from db.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE)).partitions()
+
+
+def _export_chunks(batches, export_format: str):
+    """Encode streamed rows one batch at a time so memory stays flat"""
+    if export_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(EXPORT_COLUMNS)
+        for batch in batches:
+            writer.writerows(batch)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+        return
+
+    for batch in batches:
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, row)), separators=(",", ":")) + "\n"
+            for row in batch
+        )
+
+
+@router.get("/export")
+def export_favorites(
+    user_id: Optional[int] = None,
+    item_id: Optional[int] = None,
+    format: str = "ndjson",
+    db: Session = Depends(get_read_db),
+    shards: Optional[ShardSet] = Depends(get_shards)
+):
+    """Stream favorites as NDJSON or CSV, optionally filtered by user and/or item"""
+    if user_id is not None:
+        require_positive_id("user_id", user_id)
+    if item_id is not None:
+        require_positive_id("item_id", item_id)
+    if format not in EXPORT_FORMATS:
+        raise ValidationError(
+            message="Unsupported export format",
+            details={"format": format, "supported": list(EXPORT_FORMATS)}
+        )
+
+    query = select(*LIST_COLUMNS).order_by(FavoriteModel.id)
+    if user_id is not None:
+        query = query.where(FavoriteModel.user_id == user_id)
+    if item_id is not None:
+        query = query.where(FavoriteModel.item_id == item_id)
+
+    # The session from get_db stays open until the response has been fully sent.
+    # A user's favorites are on its shard; anything else is merged from all shards
+    if shards is None or user_id is not None:
+        batches = _export_batches(db, query)
+    else:
+        batches = shards.stream(query, EXPORT_BATCH_SIZE)
+    return StreamingResponse(
+        _export_chunks(batches, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="favorites.{format}"'}
+    )
+
+
 @router.get("/{user_id}", response_model=List[Favorite])
-def get_favorites(user_id: int, db: Session = Depends(get_db)):
-    """Get all favorite items for a specific user"""
+def get_favorites(
+    user_id: int,
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    cache: Cache = Depends(get_favorites_cache),
+    flights: Optional[SingleFlight] = Depends(get_single_flight),
+    settings: Settings = Depends(get_app_settings),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Get one page of favorite items for a specific user; the next page's cursor is in X-Next-Cursor"""
     try:
         # Input validation
-        if user_id <= 0:
-            raise ValidationError(
-                message="Invalid user ID provided",
-                details={"user_id": user_id, "requirement": "must be positive integer"}
+        require_positive_id("user_id", user_id)
+        page_limit, after_id = resolve_page(limit, cursor, settings)
+
+        # Only the default first page is cached; it is what clients poll
+        cacheable = limit is None and cursor is None
+        key = user_favorites_key(user_id)
+        cached = cache.get(key) if cacheable else None
+        if cached is not None:
+            version = cached["version"]
+        else:
+            generation = cache.generation(key)
+            version = coalesced(
+                flights, (USER_SCOPE, user_id, "version", db.get_bind()),
+                lambda: list_version(db, USER_SCOPE, user_id)
             )
-        
-        # Get favorites from database
-        favorites = db.query(FavoriteModel).filter(FavoriteModel.user_id == user_id).all()
-        
+
+        # Revalidation is answered from the version alone
+        etag = list_etag(USER_SCOPE, user_id, version, page_limit, after_id)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag, settings)
+        if cached is not None:
+            return list_page(response, cached["favorites"], cached["next_cursor"], etag, settings)
+
+        # Get favorites from database; concurrent identical requests share one read
+        def load_page():
+            rows = db.execute(
+                select(*LIST_COLUMNS)
+                .where(FavoriteModel.user_id == user_id, FavoriteModel.id > after_id)
+                .order_by(FavoriteModel.id)
+                .limit(page_limit + 1)
+            ).all()
+            favorites, next_cursor = split_page(favorite_rows(rows), page_limit)
+            if cacheable:
+                cache.set(key, {"favorites": favorites, "next_cursor": next_cursor, "version": version}, generation)
+            return favorites, next_cursor, encode_page(favorites, settings)
+
+        favorites, next_cursor, body = coalesced(
+            flights, (USER_SCOPE, user_id, page_limit, after_id, db.get_bind()), load_page
+        )
+
         # Note: Empty list is valid response, not an error
-        return favorites
+        return list_page(response, favorites, next_cursor, etag, settings, body)
         
     except SQLAlchemyError as e:
         raise DatabaseError(
@@ -105,53 +613,129 @@ def get_favorites(user_id: int, db: Session = Depends(get_db)):
         )
 
 
+@router.get("/{user_id}/stream")
+async def stream_favorite_changes(
+    user_id: int,
+    last_event_id: Optional[str] = Header(None),
+    events: Optional[EventHub] = Depends(get_event_hub),
+    settings: Settings = Depends(get_app_settings)
+):
+    """
+    Server-sent events for changes to a user's favorites (favorite_added /
+    favorite_deleted), with heartbeats. Reconnecting with Last-Event-ID resumes
+    after that event, or starts with a "reset" event when it can no longer be resumed
+    """
+    require_positive_id("user_id", user_id)
+    if events is None:
+        raise NotFoundError(
+            message="Favorites event stream is not enabled",
+            details={"setting": "BAKERY_EVENT_STREAM"}
+        )
+    subscriber = events.subscribe(user_id, last_event_id)
+    return StreamingResponse(
+        event_frames(events, subscriber, settings.event_stream_heartbeat_seconds),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _favorite_owners(db: Session, shards: Optional[ShardSet], favorite_ids: List[int]) -> Dict[int, int]:
+    """
+    Owning user_id of each of favorite_ids that exists. Sharded, db is only the
+    requester's shard and the favorites may be on any shard, so every shard is asked
+    """
+    query = select(FavoriteModel.id, FavoriteModel.user_id).where(FavoriteModel.id.in_(favorite_ids))
+    if shards is None:
+        return dict(db.execute(query).all())
+    return {
+        favorite_id: owner for rows in shards.scatter(lambda s, _: s.execute(query).all())
+        for favorite_id, owner in rows
+    }
+
+
+def _favorite_shard(shards: ShardSet, favorite_id: int) -> Optional[int]:
+    """Index of the shard holding favorite_id, or None when no shard has it"""
+    query = select(FavoriteModel.id).where(FavoriteModel.id == favorite_id)
+    found = shards.scatter(lambda s, _: s.scalar(query))
+    return next((shard for shard, row in enumerate(found) if row is not None), None)
+
+
 @router.delete("/{favorite_id}")
-def delete_favorite(favorite_id: int, user_id: int, db: Session = Depends(get_db)):
+def delete_favorite(
+    favorite_id: int,
+    user_id: int,
+    db: Session = Depends(get_db),
+    cache: Cache = Depends(get_favorites_cache),
+    membership: Optional[MembershipIndex] = Depends(get_membership_index),
+    writes: Optional[RequestWrites] = Depends(get_recent_writes),
+    events: Optional[EventHub] = Depends(get_event_hub),
+    flights: Optional[SingleFlight] = Depends(get_single_flight),
+    committer: Optional[GroupCommitter] = Depends(get_group_committer),
+    shards: Optional[ShardSet] = Depends(get_shards)
+):
     """Delete a specific favorite item"""
     try:
         # Input validation
-        if favorite_id <= 0:
-            raise ValidationError(
-                message="Invalid favorite ID provided",
-                details={"favorite_id": favorite_id, "requirement": "must be positive integer"}
-            )
-        
-        if user_id <= 0:
-            raise ValidationError(
-                message="Invalid user ID provided",
-                details={"user_id": user_id, "requirement": "must be positive integer"}
-            )
-        
-        # Find the favorite
-        fav = db.query(FavoriteModel).filter(FavoriteModel.id == favorite_id).first()
+        require_positive_id("favorite_id", favorite_id)
+        require_positive_id("user_id", user_id)
         
-        if not fav:
-            raise NotFoundError(
-                message="Favorite not found",
-                details={"favorite_id": favorite_id}
-            )
-        
-        # Authorization check
-        if fav.user_id != user_id:
-            raise UnauthorizedError(
-                message="Not authorized to delete this favorite",
-                details={
-                    "favorite_id": favorite_id,
-                    "requested_by_user": user_id,
-                    "favorite_belongs_to_user": fav.user_id
-                }
-            )
-        
-        # Delete the favorite
-        db.delete(fav)
-        db.commit()
+        if committer is not None:
+            # Committed with other queued writes; raises NotFoundError/UnauthorizedError
+            item_id, item_name = committer.submit(DeleteFavorite(favorite_id, user_id)).result()
+        else:
+            with ExitStack() as stack:
+                # Find the favorite
+                fav = db.query(FavoriteModel).filter(FavoriteModel.id == favorite_id).first()
+                owner_db = db
+                if fav is None and shards is not None:
+                    # db is the requester's shard. The favorite may be another user's on
+                    # another shard, or this user's left on another shard by a rebalance
+                    shard = _favorite_shard(shards, favorite_id)
+                    if shard is not None:
+                        owner_db = stack.enter_context(shards.session(shard))
+                        fav = owner_db.get(FavoriteModel, favorite_id)
+                
+                if not fav:
+                    raise NotFoundError(
+                        message="Favorite not found",
+                        details={"favorite_id": favorite_id}
+                    )
+                
+                # Authorization check
+                if fav.user_id != user_id:
+                    raise UnauthorizedError(
+                        message="Not authorized to delete this favorite",
+                        details={
+                            "favorite_id": favorite_id,
+                            "requested_by_user": user_id,
+                            "favorite_belongs_to_user": fav.user_id
+                        }
+                    )
+                
+                # Delete the favorite
+                item_id, item_name = fav.item_id, fav.item_name
+                owner_db.delete(fav)
+                decrement_item_count(owner_db, item_id)
+                bump_versions(owner_db, user_ids=(user_id,), item_ids=(item_id,))
+                owner_db.commit()
+        cache.invalidate(user_favorites_key(user_id))
+        if membership is not None:
+            membership.removed(user_id, item_id)
+        if writes is not None:
+            writes.mark(user_ids=(user_id,), item_ids=(item_id,))
+        if flights is not None:
+            flights.forget(user_ids=(user_id,), item_ids=(item_id,))
+        if events is not None:
+            events.publish(DELETED, user_id, [
+                {"favorite_id": favorite_id, "item_id": item_id, "item_name": item_name}
+            ])
         
         return {
             "message": "Favorite deleted successfully",
             "deleted_favorite": {
                 "id": favorite_id,
                 "user_id": user_id,
-                "item_name": fav.item_name
+                "item_name": item_name
             }
         }
         
@@ -167,21 +751,196 @@ def delete_favorite(favorite_id: int, user_id: int, db: Session = Depends(get_db
         )
 
 
-@router.get("/item/{item_id}/users", response_model=List[Favorite])
-def get_users_who_favorited_item(item_id: int, db: Session = Depends(get_db)):
-    """Get all users who have favorited a specific item"""
+def _delete_user_favorites(
+    db: Session,
+    user_id: int,
+    condition,
+    cache: Cache,
+    membership: Optional[MembershipIndex],
+    writes: Optional[RequestWrites],
+    events: Optional[EventHub],
+    flights: Optional[SingleFlight]
+) -> List[tuple]:
+    """
+    Delete the user's favorites matching condition with one DELETE ... RETURNING
+    and adjust counters and versions in the same transaction; returns the
+    deleted (id, item_id) rows. user_id = ? in the WHERE clause is what
+    enforces ownership.
+    """
+    rows = db.execute(
+        delete(FavoriteModel)
+        .where(FavoriteModel.user_id == user_id, condition)
+        .returning(FavoriteModel.id, FavoriteModel.item_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if rows:
+        item_deltas: Dict[int, int] = {}
+        for _, item_id in rows:
+            item_deltas[item_id] = item_deltas.get(item_id, 0) - 1
+        increment_item_counts(db, item_deltas)
+        bump_versions(db, user_ids=(user_id,), item_ids=item_deltas)
+    db.commit()
+    if rows:
+        cache.invalidate(user_favorites_key(user_id))
+        if membership is not None:
+            membership.invalidate(user_id)
+        if writes is not None:
+            writes.mark(user_ids=(user_id,), item_ids={item_id for _, item_id in rows})
+        if flights is not None:
+            flights.forget(user_ids=(user_id,), item_ids={item_id for _, item_id in rows})
+        if events is not None:
+            events.publish(DELETED, user_id, [
+                {"favorite_id": favorite_id, "item_id": item_id} for favorite_id, item_id in rows
+            ])
+    return rows
+
+
+@router.delete("/user/{user_id}", response_model=FavoriteBulkDeleteResponse)
+def clear_favorites(
+    user_id: int,
+    db: Session = Depends(get_db),
+    cache: Cache = Depends(get_favorites_cache),
+    membership: Optional[MembershipIndex] = Depends(get_membership_index),
+    writes: Optional[RequestWrites] = Depends(get_recent_writes),
+    events: Optional[EventHub] = Depends(get_event_hub),
+    flights: Optional[SingleFlight] = Depends(get_single_flight)
+):
+    """Delete all of a user's favorites in one statement"""
     try:
-        # Input validation
-        if item_id <= 0:
+        require_positive_id("user_id", user_id)
+        rows = _delete_user_favorites(db, user_id, true(), cache, membership, writes, events, flights)
+        return FavoriteBulkDeleteResponse(
+            user_id=user_id,
+            deleted=len(rows),
+            deleted_favorite_ids=sorted(favorite_id for favorite_id, _ in rows)
+        )
+
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise DatabaseError(
+            message="Failed to delete favorites from database",
+            details={"user_id": user_id, "db_error": str(e)}
+        )
+
+
+@router.post("/user/{user_id}/delete", response_model=FavoriteBulkDeleteResponse)
+def delete_favorites_bulk(
+    user_id: int,
+    payload: FavoriteBulkDeleteRequest,
+    db: Session = Depends(get_db),
+    cache: Cache = Depends(get_favorites_cache),
+    membership: Optional[MembershipIndex] = Depends(get_membership_index),
+    writes: Optional[RequestWrites] = Depends(get_recent_writes),
+    events: Optional[EventHub] = Depends(get_event_hub),
+    flights: Optional[SingleFlight] = Depends(get_single_flight),
+    shards: Optional[ShardSet] = Depends(get_shards)
+):
+    """
+    Delete some of a user's favorites, given by favorite ID and/or item ID, in one
+    statement. IDs that match nothing are reported as not found, and favorite IDs
+    owned by another user as not owned; neither fails the request.
+    """
+    try:
+        require_positive_id("user_id", user_id)
+        favorite_ids = list(dict.fromkeys(payload.favorite_ids))
+        item_ids = list(dict.fromkeys(payload.item_ids))
+        if not favorite_ids and not item_ids:
             raise ValidationError(
-                message="Invalid item ID provided",
-                details={"item_id": item_id, "requirement": "must be positive integer"}
+                message="No favorites to delete",
+                details={"requirement": "provide favorite_ids and/or item_ids"}
             )
+        if len(favorite_ids) + len(item_ids) > DELETE_MAX_ITEMS:
+            raise ValidationError(
+                message="Too many IDs in delete request",
+                details={"count": len(favorite_ids) + len(item_ids), "max_items": DELETE_MAX_ITEMS}
+            )
+        for favorite_id in favorite_ids:
+            require_positive_id("favorite_id", favorite_id)
+        for item_id in item_ids:
+            require_positive_id("item_id", item_id)
+
+        conditions = []
+        if favorite_ids:
+            conditions.append(FavoriteModel.id.in_(favorite_ids))
+        if item_ids:
+            conditions.append(FavoriteModel.item_id.in_(item_ids))
+        rows = _delete_user_favorites(db, user_id, or_(*conditions), cache, membership, writes, events, flights)
+
+        deleted_ids = {favorite_id for favorite_id, _ in rows}
+        deleted_items = {item_id for _, item_id in rows}
+        missed_ids = [favorite_id for favorite_id in favorite_ids if favorite_id not in deleted_ids]
+        # Requested IDs that survived the user-scoped DELETE and still exist are someone else's
+        other_owners = set(_favorite_owners(db, shards, missed_ids)) if missed_ids else set()
+        return FavoriteBulkDeleteResponse(
+            user_id=user_id,
+            deleted=len(rows),
+            deleted_favorite_ids=sorted(deleted_ids),
+            not_found_favorite_ids=[favorite_id for favorite_id in missed_ids if favorite_id not in other_owners],
+            not_found_item_ids=[item_id for item_id in item_ids if item_id not in deleted_items],
+            not_owned_favorite_ids=[favorite_id for favorite_id in missed_ids if favorite_id in other_owners]
+        )
+
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise DatabaseError(
+            message="Failed to delete favorites from database",
+            details={"user_id": user_id, "db_error": str(e)}
+        )
+
+
+@router.get("/item/{item_id}/users", response_model=List[Favorite])
+def get_users_who_favorited_item(
+    item_id: int,
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    flights: Optional[SingleFlight] = Depends(get_single_flight),
+    shards: Optional[ShardSet] = Depends(get_shards),
+    settings: Settings = Depends(get_app_settings),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Get one page of users who have favorited a specific item; the next page's cursor is in X-Next-Cursor"""
+    try:
+        # Input validation
+        require_positive_id("item_id", item_id)
+        page_limit, after_id = resolve_page(limit, cursor, settings)
+
+        # Sharded, the item's favorites are spread over every shard: its version is
+        # the sum of the shards' versions, and its page is merged from theirs by ID
+        source = db.get_bind() if shards is None else shards
+
+        def load_version():
+            if shards is None:
+                return list_version(db, ITEM_SCOPE, item_id)
+            return sum(shards.scatter(lambda s, _: list_version(s, ITEM_SCOPE, item_id)))
+
+        version = coalesced(flights, (ITEM_SCOPE, item_id, "version", source), load_version)
+        etag = list_etag(ITEM_SCOPE, item_id, version, page_limit, after_id)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag, settings)
         
-        # Get all favorites for this item
-        favorites = db.query(FavoriteModel).filter(FavoriteModel.item_id == item_id).all()
+        # Get this page of favorites for the item; concurrent identical requests share one read
+        def load_page():
+            query = (
+                select(*LIST_COLUMNS)
+                .where(FavoriteModel.item_id == item_id, FavoriteModel.id > after_id)
+                .order_by(FavoriteModel.id)
+                .limit(page_limit + 1)
+            )
+            if shards is None:
+                rows = db.execute(query).all()
+            else:
+                pages = shards.scatter(lambda s, _: s.execute(query).all())
+                rows = list(heapq.merge(*pages, key=lambda row: row[0]))[:page_limit + 1]
+            favorites, next_cursor = split_page(favorite_rows(rows), page_limit)
+            return favorites, next_cursor, encode_page(favorites, settings)
+
+        favorites, next_cursor, body = coalesced(
+            flights, (ITEM_SCOPE, item_id, page_limit, after_id, source), load_page
+        )
         
-        return favorites
+        return list_page(response, favorites, next_cursor, etag, settings, body)
         
     except SQLAlchemyError as e:
         raise DatabaseError(
@@ -193,28 +952,53 @@ def get_users_who_favorited_item(item_id: int, db: Session = Depends(get_db)):
         )
 
 
+@router.get("/item/{item_id}/count", response_model=ItemPopularity)
+def get_item_favorite_count(
+    item_id: int,
+    db: Session = Depends(get_read_db),
+    shards: Optional[ShardSet] = Depends(get_shards)
+):
+    """Number of users who have favorited a specific item"""
+    try:
+        require_positive_id("item_id", item_id)
+
+        query = select(ItemFavoriteCount.favorite_count).where(ItemFavoriteCount.item_id == item_id)
+        if shards is None:
+            count = db.scalar(query) or 0
+        else:
+            count = sum(shard_count or 0 for shard_count in shards.scatter(lambda s, _: s.scalar(query)))
+        return {"item_id": item_id, "favorite_count": count}
+
+    except SQLAlchemyError as e:
+        raise DatabaseError(
+            message="Failed to retrieve item favorite count from database",
+            details={"item_id": item_id, "db_error": str(e)}
+        )
+
+
 @router.get("/user/{user_id}/item/{item_id}")
-def check_if_favorited(user_id: int, item_id: int, db: Session = Depends(get_db)):
+def check_if_favorited(
+    user_id: int,
+    item_id: int,
+    db: Session = Depends(get_read_db),
+    membership: Optional[MembershipIndex] = Depends(get_membership_index)
+):
     """Check if a specific item is favorited by a specific user"""
     try:
         # Input validation
-        if user_id <= 0:
-            raise ValidationError(
-                message="Invalid user ID provided",
-                details={"user_id": user_id, "requirement": "must be positive integer"}
-            )
-        
-        if item_id <= 0:
-            raise ValidationError(
-                message="Invalid item ID provided",
-                details={"item_id": item_id, "requirement": "must be positive integer"}
-            )
+        require_positive_id("user_id", user_id)
+        require_positive_id("item_id", item_id)
         
-        # Check if favorite exists
-        favorite = db.query(FavoriteModel).filter(
-            FavoriteModel.user_id == user_id,
-            FavoriteModel.item_id == item_id
-        ).first()
+        # Check if favorite exists; with the membership index only a hit needs the row
+        entry = user_membership(membership, db, user_id)
+        if entry is not None:
+            favorite_id = entry.favorite_id(item_id)
+            favorite = db.get(FavoriteModel, favorite_id) if favorite_id is not None else None
+        else:
+            favorite = db.query(FavoriteModel).filter(
+                FavoriteModel.user_id == user_id,
+                FavoriteModel.item_id == item_id
+            ).first()
         
         return {
             "user_id": user_id,
@@ -235,4 +1019,48 @@ def check_if_favorited(user_id: int, item_id: int, db: Session = Depends(get_db)
                 "item_id": item_id,
                 "db_error": str(e)
             }
-        )
\ No newline at end of file
+        )
+
+
+@router.post("/user/{user_id}/check", response_model=FavoriteCheckResponse)
+def check_favorited_items(
+    user_id: int,
+    payload: FavoriteCheckRequest,
+    db: Session = Depends(get_read_db),
+    membership: Optional[MembershipIndex] = Depends(get_membership_index)
+):
+    """Check many items at once; answers with one IN (...) query on the (user_id, item_id) index"""
+    try:
+        require_positive_id("user_id", user_id)
+        if len(payload.item_ids) > CHECK_MAX_ITEMS:
+            raise ValidationError(
+                message="Too many item IDs in check request",
+                details={"count": len(payload.item_ids), "max_items": CHECK_MAX_ITEMS}
+            )
+        for item_id in payload.item_ids:
+            require_positive_id("item_id", item_id)
+
+        favorites: Dict[int, Optional[int]] = dict.fromkeys(payload.item_ids)
+        entry = user_membership(membership, db, user_id) if favorites else None
+        if entry is not None:
+            favorites = {item_id: entry.favorite_id(item_id) for item_id in favorites}
+        elif favorites:
+            rows = db.execute(
+                select(FavoriteModel.item_id, FavoriteModel.id).where(
+                    FavoriteModel.user_id == user_id,
+                    FavoriteModel.item_id.in_(list(favorites))
+                )
+            )
+            favorites.update((item_id, favorite_id) for item_id, favorite_id in rows)
+
+        return {"user_id": user_id, "favorites": favorites}
+
+    except SQLAlchemyError as e:
+        raise DatabaseError(
+            message="Failed to check favorite status",
+            details={
+                "user_id": user_id,
+                "item_count": len(payload.item_ids),
+                "db_error": str(e)
+            }
+        )
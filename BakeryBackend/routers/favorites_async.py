@@ -0,0 +1,428 @@
+"""
+Async versions of the core favorites endpoints, used when BAKERY_DB_MODE=async.
+
+Handlers run on the event loop with an AsyncSession instead of occupying a
+threadpool worker for the whole request. Endpoints not defined here are
+served by the sync implementations in favorites.py.
+"""
+
+import asyncio
+from fastapi import APIRouter, Depends, Header, Response
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from typing import List, Optional
+from BakeryBackend.config import Settings, get_app_settings
+from BakeryBackend.database import get_async_db
+from BakeryBackend.models import Favorite as FavoriteModel
+from BakeryBackend.popularity import increment_counts_statement, increment_params, decrement_statement
+from BakeryBackend.schemas import Favorite
+from BakeryBackend.cache import Cache, get_favorites_cache, user_favorites_key
+from BakeryBackend.membership import MembershipIndex, UserFavorites, get_membership_index
+from BakeryBackend.replica import RequestWrites, get_recent_writes
+from BakeryBackend.events import ADDED, DELETED, EventHub, get_event_hub
+from BakeryBackend.singleflight import SingleFlight, get_single_flight
+from BakeryBackend.group_commit import AddFavorite, DeleteFavorite, GroupCommitter, get_group_committer
+from BakeryBackend.versions import (
+    USER_SCOPE,
+    ITEM_SCOPE,
+    bump_versions_statement,
+    bump_params,
+    version_query,
+    list_etag,
+    etag_matches,
+    not_modified
+)
+from BakeryBackend.pagination import resolve_page, split_page
+from BakeryBackend.routers.favorites import (
+    require_positive_id,
+    LIST_COLUMNS,
+    favorite_rows,
+    encode_page,
+    list_page
+)
+from BakeryBackend.exceptions import (
+    ValidationError,
+    NotFoundError,
+    ConflictError,
+    UnauthorizedError,
+    DatabaseError
+)
+
+router = APIRouter(prefix="/favorites", tags=["Favorites"])
+
+
+async def user_membership(
+    index: Optional[MembershipIndex],
+    db: AsyncSession,
+    user_id: int
+) -> Optional[UserFavorites]:
+    """A user's entry in the membership index, warming it from the database on a miss"""
+    if index is None:
+        return None
+    entry = index.get(user_id)
+    if entry is None:
+        generation = index.generation(user_id)
+        try:
+            rows = (await db.execute(
+                select(FavoriteModel.item_id, FavoriteModel.id).where(FavoriteModel.user_id == user_id)
+            )).all()
+        except BaseException:
+            index.abandon(user_id)
+            raise
+        entry = index.load(user_id, rows, generation)
+    return entry
+
+
+async def coalesced(flights: Optional[SingleFlight], key: tuple, load):
+    """await load() through the request coalescer, or directly when it is disabled"""
+    return await load() if flights is None else await flights.do_async(key, load)
+
+
+def build_router(sync_router: APIRouter) -> APIRouter:
+    """Return sync_router's routes with the async endpoints swapped in, keeping route order"""
+    overrides = {(route.path, frozenset(route.methods)): route for route in router.routes}
+    merged = APIRouter()
+    for route in sync_router.routes:
+        merged.routes.append(overrides.get((route.path, frozenset(route.methods)), route))
+    return merged
+
+
+@router.post("/", response_model=Favorite)
+async def add_favorite(
+    favorite: Favorite,
+    db: AsyncSession = Depends(get_async_db),
+    cache: Cache = Depends(get_favorites_cache),
+    membership: Optional[MembershipIndex] = Depends(get_membership_index),
+    writes: Optional[RequestWrites] = Depends(get_recent_writes),
+    events: Optional[EventHub] = Depends(get_event_hub),
+    flights: Optional[SingleFlight] = Depends(get_single_flight),
+    committer: Optional[GroupCommitter] = Depends(get_group_committer)
+):
+    """Add a new favorite item for a user"""
+    try:
+        # Input validation
+        require_positive_id("user_id", favorite.user_id)
+        require_positive_id("item_id", favorite.item_id)
+
+        if not favorite.item_name or len(favorite.item_name.strip()) == 0:
+            raise ValidationError(
+                message="Item name cannot be empty",
+                details={"item_name": favorite.item_name}
+            )
+
+        warm = membership.get(favorite.user_id) if membership is not None else None
+        known_id = warm.favorite_id(favorite.item_id) if warm is not None else None
+        if known_id is not None:
+            raise ConflictError(
+                message="Favorite already exists for this user and item",
+                details={
+                    "user_id": favorite.user_id,
+                    "item_id": favorite.item_id,
+                    "existing_favorite_id": known_id
+                }
+            )
+
+        item_name = favorite.item_name.strip()
+        if committer is not None:
+            favorite_id = await asyncio.wrap_future(
+                committer.submit(AddFavorite(favorite.user_id, favorite.item_id, item_name))
+            )
+        else:
+            try:
+                favorite_id = (await db.execute(
+                    insert(FavoriteModel)
+                    .values(user_id=favorite.user_id, item_id=favorite.item_id, item_name=item_name)
+                    .returning(FavoriteModel.id)
+                )).scalar_one()
+                await db.execute(
+                    increment_counts_statement(db.get_bind().dialect.name),
+                    increment_params({favorite.item_id: 1})
+                )
+                await db.execute(
+                    bump_versions_statement(db.get_bind().dialect.name),
+                    bump_params(user_ids=(favorite.user_id,), item_ids=(favorite.item_id,))
+                )
+                await db.commit()
+            except IntegrityError:
+                await db.rollback()
+                existing_id = await db.scalar(
+                    select(FavoriteModel.id).where(
+                        FavoriteModel.user_id == favorite.user_id,
+                        FavoriteModel.item_id == favorite.item_id
+                    )
+                )
+                raise ConflictError(
+                    message="Favorite already exists for this user and item",
+                    details={
+                        "user_id": favorite.user_id,
+                        "item_id": favorite.item_id,
+                        "existing_favorite_id": existing_id
+                    }
+                )
+        cache.invalidate(user_favorites_key(favorite.user_id))
+        if membership is not None:
+            membership.added(favorite.user_id, favorite.item_id, favorite_id)
+        if writes is not None:
+            writes.mark(user_ids=(favorite.user_id,), item_ids=(favorite.item_id,))
+        if flights is not None:
+            flights.forget(user_ids=(favorite.user_id,), item_ids=(favorite.item_id,))
+        if events is not None:
+            events.publish(ADDED, favorite.user_id, [
+                {"favorite_id": favorite_id, "item_id": favorite.item_id, "item_name": item_name}
+            ])
+
+        return FavoriteModel(
+            id=favorite_id,
+            user_id=favorite.user_id,
+            item_id=favorite.item_id,
+            item_name=item_name
+        )
+
+    except SQLAlchemyError as e:
+        await db.rollback()
+        raise DatabaseError(
+            message="Failed to add favorite item to database",
+            details={
+                "user_id": favorite.user_id,
+                "item_id": favorite.item_id,
+                "db_error": str(e)
+            }
+        )
+
+
+@router.get("/{user_id}", response_model=List[Favorite])
+async def get_favorites(
+    user_id: int,
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    cache: Cache = Depends(get_favorites_cache),
+    flights: Optional[SingleFlight] = Depends(get_single_flight),
+    settings: Settings = Depends(get_app_settings),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Get one page of favorite items for a specific user; the next page's cursor is in X-Next-Cursor"""
+    try:
+        require_positive_id("user_id", user_id)
+        page_limit, after_id = resolve_page(limit, cursor, settings)
+
+        cacheable = limit is None and cursor is None
+        key = user_favorites_key(user_id)
+        cached = cache.get(key) if cacheable else None
+        if cached is not None:
+            version = cached["version"]
+        else:
+            generation = cache.generation(key)
+
+            async def load_version():
+                return await db.scalar(version_query(USER_SCOPE, user_id)) or 0
+            version = await coalesced(flights, (USER_SCOPE, user_id, "version", db.get_bind()), load_version)
+
+        etag = list_etag(USER_SCOPE, user_id, version, page_limit, after_id)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag, settings)
+        if cached is not None:
+            return list_page(response, cached["favorites"], cached["next_cursor"], etag, settings)
+
+        async def load_page():
+            result = await db.execute(
+                select(*LIST_COLUMNS)
+                .where(FavoriteModel.user_id == user_id, FavoriteModel.id > after_id)
+                .order_by(FavoriteModel.id)
+                .limit(page_limit + 1)
+            )
+            favorites, next_cursor = split_page(favorite_rows(result.all()), page_limit)
+            if cacheable:
+                cache.set(key, {"favorites": favorites, "next_cursor": next_cursor, "version": version}, generation)
+            return favorites, next_cursor, encode_page(favorites, settings)
+
+        favorites, next_cursor, body = await coalesced(
+            flights, (USER_SCOPE, user_id, page_limit, after_id, db.get_bind()), load_page
+        )
+        return list_page(response, favorites, next_cursor, etag, settings, body)
+
+    except SQLAlchemyError as e:
+        raise DatabaseError(
+            message="Failed to retrieve favorites from database",
+            details={
+                "user_id": user_id,
+                "db_error": str(e)
+            }
+        )
+
+
+@router.delete("/{favorite_id}")
+async def delete_favorite(
+    favorite_id: int,
+    user_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    cache: Cache = Depends(get_favorites_cache),
+    membership: Optional[MembershipIndex] = Depends(get_membership_index),
+    writes: Optional[RequestWrites] = Depends(get_recent_writes),
+    events: Optional[EventHub] = Depends(get_event_hub),
+    flights: Optional[SingleFlight] = Depends(get_single_flight),
+    committer: Optional[GroupCommitter] = Depends(get_group_committer)
+):
+    """Delete a specific favorite item"""
+    try:
+        require_positive_id("favorite_id", favorite_id)
+        require_positive_id("user_id", user_id)
+
+        if committer is not None:
+            item_id, item_name = await asyncio.wrap_future(
+                committer.submit(DeleteFavorite(favorite_id, user_id))
+            )
+        else:
+            fav = await db.scalar(select(FavoriteModel).where(FavoriteModel.id == favorite_id))
+
+            if not fav:
+                raise NotFoundError(
+                    message="Favorite not found",
+                    details={"favorite_id": favorite_id}
+                )
+
+            if fav.user_id != user_id:
+                raise UnauthorizedError(
+                    message="Not authorized to delete this favorite",
+                    details={
+                        "favorite_id": favorite_id,
+                        "requested_by_user": user_id,
+                        "favorite_belongs_to_user": fav.user_id
+                    }
+                )
+
+            item_id, item_name = fav.item_id, fav.item_name
+            await db.delete(fav)
+            await db.execute(decrement_statement(item_id))
+            await db.execute(
+                bump_versions_statement(db.get_bind().dialect.name),
+                bump_params(user_ids=(user_id,), item_ids=(item_id,))
+            )
+            await db.commit()
+        cache.invalidate(user_favorites_key(user_id))
+        if membership is not None:
+            membership.removed(user_id, item_id)
+        if writes is not None:
+            writes.mark(user_ids=(user_id,), item_ids=(item_id,))
+        if flights is not None:
+            flights.forget(user_ids=(user_id,), item_ids=(item_id,))
+        if events is not None:
+            events.publish(DELETED, user_id, [
+                {"favorite_id": favorite_id, "item_id": item_id, "item_name": item_name}
+            ])
+
+        return {
+            "message": "Favorite deleted successfully",
+            "deleted_favorite": {
+                "id": favorite_id,
+                "user_id": user_id,
+                "item_name": item_name
+            }
+        }
+
+    except SQLAlchemyError as e:
+        await db.rollback()
+        raise DatabaseError(
+            message="Failed to delete favorite from database",
+            details={
+                "favorite_id": favorite_id,
+                "user_id": user_id,
+                "db_error": str(e)
+            }
+        )
+
+
+@router.get("/item/{item_id}/users", response_model=List[Favorite])
+async def get_users_who_favorited_item(
+    item_id: int,
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    flights: Optional[SingleFlight] = Depends(get_single_flight),
+    settings: Settings = Depends(get_app_settings),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Get one page of users who have favorited a specific item; the next page's cursor is in X-Next-Cursor"""
+    try:
+        require_positive_id("item_id", item_id)
+        page_limit, after_id = resolve_page(limit, cursor, settings)
+
+        async def load_version():
+            return await db.scalar(version_query(ITEM_SCOPE, item_id)) or 0
+        version = await coalesced(flights, (ITEM_SCOPE, item_id, "version", db.get_bind()), load_version)
+        etag = list_etag(ITEM_SCOPE, item_id, version, page_limit, after_id)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag, settings)
+
+        async def load_page():
+            result = await db.execute(
+                select(*LIST_COLUMNS)
+                .where(FavoriteModel.item_id == item_id, FavoriteModel.id > after_id)
+                .order_by(FavoriteModel.id)
+                .limit(page_limit + 1)
+            )
+            favorites, next_cursor = split_page(favorite_rows(result.all()), page_limit)
+            return favorites, next_cursor, encode_page(favorites, settings)
+
+        favorites, next_cursor, body = await coalesced(
+            flights, (ITEM_SCOPE, item_id, page_limit, after_id, db.get_bind()), load_page
+        )
+        return list_page(response, favorites, next_cursor, etag, settings, body)
+
+    except SQLAlchemyError as e:
+        raise DatabaseError(
+            message="Failed to retrieve item favorites from database",
+            details={
+                "item_id": item_id,
+                "db_error": str(e)
+            }
+        )
+
+
+@router.get("/user/{user_id}/item/{item_id}")
+async def check_if_favorited(
+    user_id: int,
+    item_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    membership: Optional[MembershipIndex] = Depends(get_membership_index)
+):
+    """Check if a specific item is favorited by a specific user"""
+    try:
+        require_positive_id("user_id", user_id)
+        require_positive_id("item_id", item_id)
+
+        entry = await user_membership(membership, db, user_id)
+        if entry is not None:
+            favorite_id = entry.favorite_id(item_id)
+            favorite = await db.get(FavoriteModel, favorite_id) if favorite_id is not None else None
+        else:
+            favorite = await db.scalar(
+                select(FavoriteModel).where(
+                    FavoriteModel.user_id == user_id,
+                    FavoriteModel.item_id == item_id
+                )
+            )
+
+        return {
+            "user_id": user_id,
+            "item_id": item_id,
+            "is_favorited": favorite is not None,
+            "favorite_id": favorite.id if favorite else None,
+            "favorite_details": {
+                "item_name": favorite.item_name,
+                "created_at": favorite.id  # Assuming you have timestamp in model
+            } if favorite else None
+        }
+
+    except SQLAlchemyError as e:
+        raise DatabaseError(
+            message="Failed to check favorite status",
+            details={
+                "user_id": user_id,
+                "item_id": item_id,
+                "db_error": str(e)
+            }
+        )
@@ -1,14 +1,22 @@
+import dataclasses
+import json
 import pytest
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from fastapi.testclient import TestClient
 from BakeryBackend.main import app
 from BakeryBackend.database import Base, engine, get_db
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from BakeryBackend.models import Favorite as FavoriteModel
+from BakeryBackend.cache import LRUCache, get_favorites_cache
 
 # Use an in-memory SQLite database for testing
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
-test_engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+test_engine = create_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
 
 Base.metadata.create_all(bind=test_engine)
@@ -35,7 +43,7 @@ def test_add_favorite():
     # Try to add duplicate
     response = client.post("/favorites/", json={"user_id": 1, "item_id": 101, "item_name": "Cake"})
     assert response.status_code == 409
-    assert "already exists" in response.json()["detail"]
+    assert "already exists" in response.json()["error"]["message"]
 
 def test_delete_favorite():
     # Add a favorite to delete
@@ -43,8 +51,339 @@ def test_delete_favorite():
     fav_id = response.json()["id"]
     # Unauthorized delete (wrong user)
     response = client.delete(f"/favorites/{fav_id}?user_id=999")
-    assert response.status_code == 403
+    assert response.status_code == 401
     # Authorized delete
     response = client.delete(f"/favorites/{fav_id}?user_id=2")
     assert response.status_code == 200
-    assert response.json()["message"] == "Favorite deleted successfully" 
\ No newline at end of file
+    assert response.json()["message"] == "Favorite deleted successfully" 
+def test_bulk_add_favorites():
+    # Pre-existing row should be reported as a conflict
+    response = client.post("/favorites/", json={"user_id": 3, "item_id": 301, "item_name": "Tart"})
+    existing_id = response.json()["id"]
+
+    response = client.post("/favorites/bulk", json={"favorites": [
+        {"user_id": 3, "item_id": 301, "item_name": "Tart"},
+        {"user_id": 3, "item_id": 302, "item_name": "Scone"},
+        {"user_id": 3, "item_id": 302, "item_name": "Scone"},
+        {"user_id": -1, "item_id": 303, "item_name": "Bun"},
+        {"user_id": 3, "item_name": "Missing item"},
+    ]})
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["created"], data["conflicts"], data["invalid"]) == (1, 2, 2)
+
+    statuses = [r["status"] for r in data["results"]]
+    assert statuses == ["conflict", "created", "conflict", "invalid", "invalid"]
+    assert data["results"][0]["favorite_id"] == existing_id
+    assert data["results"][2]["favorite_id"] == data["results"][1]["favorite_id"]
+
+    response = client.get("/favorites/3")
+    assert sorted(f["item_id"] for f in response.json()) == [301, 302]
+
+
+@pytest.fixture
+def file_db_client(tmp_path):
+    """Client backed by an on-disk database, so each request gets its own connection"""
+    file_engine = create_engine(
+        f"sqlite:///{tmp_path / 'favorites.db'}", connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(bind=file_engine)
+    FileSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=file_engine)
+
+    def override_file_db():
+        db = FileSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_file_db
+    try:
+        yield client, FileSessionLocal
+    finally:
+        app.dependency_overrides[get_db] = override_get_db
+        file_engine.dispose()
+
+
+def test_concurrent_duplicate_adds_create_one_row(file_db_client):
+    file_client, FileSessionLocal = file_db_client
+    payload = {"user_id": 4, "item_id": 401, "item_name": "Eclair"}
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        responses = list(pool.map(lambda _: file_client.post("/favorites/", json=payload), range(16)))
+
+    statuses = sorted(r.status_code for r in responses)
+    assert statuses == [200] + [409] * 15
+
+    created_id = next(r.json()["id"] for r in responses if r.status_code == 200)
+    conflict = next(r.json() for r in responses if r.status_code == 409)
+    assert conflict["error"]["details"]["existing_favorite_id"] == created_id
+
+    db = FileSessionLocal()
+    try:
+        assert db.query(FavoriteModel).filter(FavoriteModel.user_id == 4).count() == 1
+    finally:
+        db.close()
+
+
+def test_favorites_list_is_cached_and_invalidated():
+    cache = LRUCache()
+    app.dependency_overrides[get_favorites_cache] = lambda: cache
+    try:
+        client.post("/favorites/", json={"user_id": 5, "item_id": 501, "item_name": "Muffin"})
+        assert len(client.get("/favorites/5").json()) == 1
+        assert len(client.get("/favorites/5").json()) == 1
+        assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+        response = client.post("/favorites/", json={"user_id": 5, "item_id": 502, "item_name": "Donut"})
+        assert len(client.get("/favorites/5").json()) == 2
+
+        client.delete(f"/favorites/{response.json()['id']}?user_id=5")
+        assert [f["item_id"] for f in client.get("/favorites/5").json()] == [501]
+    finally:
+        app.dependency_overrides.pop(get_favorites_cache, None)
+
+
+def test_item_users_keyset_pagination():
+    client.post("/favorites/bulk", json={"favorites": [
+        {"user_id": u, "item_id": 601, "item_name": "Brownie"} for u in range(10, 15)
+    ]})
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/favorites/item/601/users", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page) <= 2
+        seen.extend(f["user_id"] for f in page)
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == [10, 11, 12, 13, 14]
+
+    assert client.get("/favorites/item/601/users", params={"cursor": "bogus"}).status_code == 400
+    assert client.get("/favorites/10", params={"limit": 0}).status_code == 400
+
+
+def test_export_streams_ndjson_and_csv():
+    client.post("/favorites/bulk", json={"favorites": [
+        {"user_id": 20, "item_id": i, "item_name": f"Cookie {i}"} for i in range(701, 704)
+    ]})
+
+    response = client.get("/favorites/export", params={"user_id": 20})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["item_id"] for r in rows] == [701, 702, 703]
+    assert set(rows[0]) == {"id", "user_id", "item_id", "item_name"}
+
+    response = client.get("/favorites/export", params={"user_id": 20, "item_id": 702, "format": "csv"})
+    lines = response.text.splitlines()
+    assert lines[0] == "id,user_id,item_id,item_name"
+    assert lines[1].endswith(",20,702,Cookie 702")
+    assert len(lines) == 2
+
+    assert client.get("/favorites/export", params={"format": "xml"}).status_code == 400
+
+
+def test_item_counts_and_popular_items():
+    client.post("/favorites/bulk", json={"favorites": [
+        {"user_id": u, "item_id": 801, "item_name": "Baguette"} for u in range(30, 33)
+    ]})
+    response = client.post("/favorites/", json={"user_id": 30, "item_id": 802, "item_name": "Bagel"})
+    client.post("/favorites/", json={"user_id": 31, "item_id": 802, "item_name": "Bagel"})
+    client.delete(f"/favorites/{response.json()['id']}?user_id=30")
+
+    assert client.get("/favorites/item/801/count").json() == {"item_id": 801, "favorite_count": 3}
+    assert client.get("/favorites/item/802/count").json()["favorite_count"] == 1
+    assert client.get("/favorites/item/899/count").json()["favorite_count"] == 0
+
+    popular = client.get("/favorites/popular", params={"limit": 100}).json()
+    counts = {p["item_id"]: p["favorite_count"] for p in popular}
+    assert counts[801] == 3 and counts[802] == 1
+    assert [p["favorite_count"] for p in popular] == sorted(counts.values(), reverse=True)
+    assert client.get("/favorites/popular", params={"limit": 0}).status_code == 400
+
+
+def test_item_counts_table_is_backfilled(tmp_path):
+    from BakeryBackend.popularity import create_item_counts_table
+    from BakeryBackend.models import ItemFavoriteCount
+
+    file_engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    FavoriteModel.__table__.create(bind=file_engine)
+    with file_engine.begin() as conn:
+        conn.execute(FavoriteModel.__table__.insert(), [
+            {"user_id": 1, "item_id": 5, "item_name": "Roll"},
+            {"user_id": 2, "item_id": 5, "item_name": "Roll"},
+        ])
+    create_item_counts_table(file_engine)
+    with file_engine.connect() as conn:
+        assert conn.execute(ItemFavoriteCount.__table__.select()).all() == [(5, 2)]
+    file_engine.dispose()
+
+
+def test_batch_check_favorited_items():
+    response = client.post("/favorites/", json={"user_id": 40, "item_id": 901, "item_name": "Strudel"})
+    fav_id = response.json()["id"]
+
+    response = client.post("/favorites/user/40/check", json={"item_ids": [901, 902, 901]})
+    assert response.status_code == 200
+    assert response.json() == {"user_id": 40, "favorites": {"901": fav_id, "902": None}}
+
+    response = client.post("/favorites/user/40/check", json={"item_ids": [0]})
+    assert response.status_code == 400
+
+
+def test_bulk_delete_and_clear_favorites():
+    ids = [r["favorite_id"] for r in client.post("/favorites/bulk", json={"favorites": [
+        {"user_id": 80, "item_id": i, "item_name": "Cannoli"} for i in (1101, 1102, 1103, 1104)
+    ] + [{"user_id": 81, "item_id": 1101, "item_name": "Cannoli"}]}).json()["results"]]
+    assert client.get("/favorites/80").json()  # cached before the delete
+
+    response = client.post("/favorites/user/80/delete", json={
+        "favorite_ids": [ids[0], ids[4], 999999], "item_ids": [1102, 1199]
+    })
+    assert response.status_code == 200
+    assert response.json() == {
+        "user_id": 80,
+        "deleted": 2,
+        "deleted_favorite_ids": [ids[0], ids[1]],
+        "not_found_favorite_ids": [999999],
+        "not_found_item_ids": [1199],
+        "not_owned_favorite_ids": [ids[4]]
+    }
+    assert [f["item_id"] for f in client.get("/favorites/80").json()] == [1103, 1104]
+    assert client.get("/favorites/item/1101/count").json()["favorite_count"] == 1
+    assert client.post("/favorites/user/80/delete", json={}).status_code == 400
+
+    response = client.delete("/favorites/user/80")
+    assert (response.json()["deleted"], response.json()["deleted_favorite_ids"]) == (2, ids[2:4])
+    assert client.get("/favorites/80").json() == []
+    assert client.delete("/favorites/user/80").json()["deleted"] == 0
+    assert [f["user_id"] for f in client.get("/favorites/item/1101/users").json()] == [81]
+
+
+def test_membership_index_serves_checks_and_duplicates():
+    from BakeryBackend.membership import MembershipIndex, get_membership_index
+
+    index = MembershipIndex()
+    app.dependency_overrides[get_membership_index] = lambda: index
+    try:
+        response = client.post("/favorites/", json={"user_id": 50, "item_id": 1001, "item_name": "Pretzel"})
+        fav_id = response.json()["id"]
+
+        # First check warms user 50; the duplicate add is then answered from memory
+        assert client.get("/favorites/user/50/item/1001").json()["favorite_id"] == fav_id
+        response = client.post("/favorites/", json={"user_id": 50, "item_id": 1001, "item_name": "Pretzel"})
+        assert response.status_code == 409
+        assert response.json()["error"]["details"]["existing_favorite_id"] == fav_id
+
+        response = client.post("/favorites/", json={"user_id": 50, "item_id": 1002, "item_name": "Kouign"})
+        assert client.post("/favorites/user/50/check", json={"item_ids": [1001, 1002, 1003]}).json()["favorites"] == {
+            "1001": fav_id, "1002": response.json()["id"], "1003": None
+        }
+
+        assert client.delete(f"/favorites/{fav_id}?user_id=50").status_code == 200
+        assert client.get("/favorites/user/50/item/1001").json()["is_favorited"] is False
+        assert index.stats()["users"] == 1
+    finally:
+        app.dependency_overrides.pop(get_membership_index, None)
+
+
+def fast_json_lists(monkeypatch):
+    monkeypatch.setattr(app.state, "settings", dataclasses.replace(app.state.settings, fast_json_lists=True))
+
+
+def test_fast_json_lists_match_default_encoding(monkeypatch):
+    client.post("/favorites/bulk", json={"favorites": [
+        {"user_id": 60, "item_id": i, "item_name": name}
+        for i, name in enumerate(["Crème brûlée", 'Pain "au" chocolat', "Mochi 🍡", "Baklava"], start=1101)
+    ]})
+    paths = [("/favorites/60", {}), ("/favorites/60", {"limit": 2}), ("/favorites/item/1101/users", {})]
+    default = [client.get(path, params=params) for path, params in paths]
+    fast_json_lists(monkeypatch)
+    fast = [client.get(path, params=params) for path, params in paths]
+
+    for slow_response, fast_response in zip(default, fast):
+        assert fast_response.content == slow_response.content
+        assert fast_response.headers["content-type"] == slow_response.headers["content-type"]
+        assert fast_response.headers.get("X-Next-Cursor") == slow_response.headers.get("X-Next-Cursor")
+    assert default[1].headers["X-Next-Cursor"]
+
+    from BakeryBackend import responses
+    monkeypatch.setattr(responses, "orjson", None)
+    assert client.get("/favorites/item/1101/users").content == default[2].content
+
+
+@contextmanager
+def count_statements():
+    """Count SQL statements executed on the test engine"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(test_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(test_engine, "before_cursor_execute", record)
+
+
+def test_conditional_get_with_list_etags():
+    response = client.post("/favorites/", json={"user_id": 70, "item_id": 1201, "item_name": "Madeleine"})
+    listing = client.get("/favorites/70")
+    etag = listing.headers["ETag"]
+    assert listing.headers["Cache-Control"] == "private, no-cache"
+
+    # Revalidation is a single version lookup and an empty 304
+    with count_statements() as statements:
+        revalidated = client.get("/favorites/70", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["ETag"] == etag
+    assert len(statements) == 1 and "favorite_list_versions" in statements[0]
+
+    # Pages have their own ETags; writes to the user or item change them
+    assert client.get("/favorites/70", params={"limit": 1}).headers["ETag"] != etag
+    item_etag = client.get("/favorites/item/1201/users").headers["ETag"]
+    assert client.get("/favorites/item/1201/users", headers={"If-None-Match": item_etag}).status_code == 304
+    client.delete(f"/favorites/{response.json()['id']}?user_id=70")
+    assert client.get("/favorites/70", headers={"If-None-Match": etag}).json() == []
+    assert client.get("/favorites/item/1201/users", headers={"If-None-Match": item_etag}).status_code == 200
+
+    # A warm cache entry answers revalidation without touching the database
+    cache = LRUCache()
+    app.dependency_overrides[get_favorites_cache] = lambda: cache
+    try:
+        etag = client.get("/favorites/70").headers["ETag"]
+        with count_statements() as statements:
+            assert client.get("/favorites/70", headers={"If-None-Match": etag}).status_code == 304
+        assert statements == []
+    finally:
+        app.dependency_overrides.pop(get_favorites_cache, None)
+
+
+def test_single_flight_window_shares_reads_until_a_write(monkeypatch):
+    from BakeryBackend.singleflight import SingleFlight, get_single_flight
+
+    flights = SingleFlight(window_seconds=60)
+    app.dependency_overrides[get_single_flight] = lambda: flights
+    fast_json_lists(monkeypatch)
+    try:
+        client.post("/favorites/", json={"user_id": 80, "item_id": 1801, "item_name": "Scone"})
+        first = client.get("/favorites/item/1801/users")
+        with count_statements() as statements:
+            shared = [client.get("/favorites/item/1801/users") for _ in range(3)]
+        assert statements == []
+        assert all(r.content == first.content and r.headers["ETag"] == first.headers["ETag"] for r in shared)
+
+        # A write detaches the item's and the user's entries
+        client.post("/favorites/", json={"user_id": 81, "item_id": 1801, "item_name": "Scone"})
+        assert [f["user_id"] for f in client.get("/favorites/item/1801/users").json()] == [80, 81]
+        assert flights.stats() == {"in_flight": 0, "windowed": 2}
+    finally:
+        app.dependency_overrides.pop(get_single_flight, None)
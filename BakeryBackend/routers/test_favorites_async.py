@@ -0,0 +1,62 @@
+import inspect
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+from BakeryBackend.main import app
+from BakeryBackend.database import Base, get_async_db
+from BakeryBackend.routers import favorites, favorites_async
+
+
+@pytest.fixture
+def async_client(tmp_path):
+    db_path = tmp_path / "favorites.db"
+    Base.metadata.create_all(bind=create_engine(f"sqlite:///{db_path}"))
+    # NullPool: aiosqlite connections must not outlive the TestClient's event loop
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", poolclass=NullPool)
+    AsyncTestingSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with AsyncTestingSessionLocal() as db:
+            yield db
+
+    async_app = FastAPI(exception_handlers=app.exception_handlers)
+    async_app.include_router(favorites_async.build_router(favorites.router))
+    async_app.dependency_overrides[get_async_db] = override_get_async_db
+    with TestClient(async_app) as client:
+        yield client
+
+
+def test_async_router_replaces_core_endpoints_only():
+    merged = favorites_async.build_router(favorites.router)
+    endpoints = {route.endpoint.__name__: route.endpoint for route in merged.routes}
+
+    for name in ("add_favorite", "get_favorites", "delete_favorite",
+                 "get_users_who_favorited_item", "check_if_favorited"):
+        assert inspect.iscoroutinefunction(endpoints[name])
+    assert endpoints["add_favorites_bulk"] is favorites.add_favorites_bulk
+    assert [r.path for r in merged.routes] == [r.path for r in favorites.router.routes]
+
+
+def test_async_favorite_lifecycle(async_client):
+    response = async_client.post("/favorites/", json={"user_id": 1, "item_id": 101, "item_name": "Cake"})
+    assert response.status_code == 200
+    fav_id = response.json()["id"]
+
+    response = async_client.post("/favorites/", json={"user_id": 1, "item_id": 101, "item_name": "Cake"})
+    assert response.status_code == 409
+    assert response.json()["error"]["details"]["existing_favorite_id"] == fav_id
+
+    listing = async_client.get("/favorites/1")
+    assert [f["id"] for f in listing.json()] == [fav_id]
+    assert async_client.get("/favorites/1", headers={"If-None-Match": listing.headers["ETag"]}).status_code == 304
+    assert [f["user_id"] for f in async_client.get("/favorites/item/101/users").json()] == [1]
+    assert async_client.get("/favorites/user/1/item/101").json()["favorite_id"] == fav_id
+
+    assert async_client.delete(f"/favorites/{fav_id}?user_id=999").status_code == 401
+    assert async_client.delete(f"/favorites/{fav_id}?user_id=1").status_code == 200
+    assert async_client.get("/favorites/user/1/item/101").json()["is_favorited"] is False
+    assert async_client.get("/favorites/1", headers={"If-None-Match": listing.headers["ETag"]}).json() == []
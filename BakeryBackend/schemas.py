@@ -1,8 +1,62 @@
 from pydantic import BaseModel, constr
-from typing import Optional
+from typing import Optional, List, Dict, Any
 
 class Favorite(BaseModel):
     id: Optional[int] = None  # Optional, will be filled when returning data
     user_id: int
     item_id: int
     item_name: constr(min_length=1, strip_whitespace=True)
+
+
+class FavoriteBulkRequest(BaseModel):
+    # Items are validated one by one in the handler so a single bad row
+    # is reported as "invalid" instead of rejecting the whole batch
+    favorites: List[Dict[str, Any]]
+
+
+class FavoriteBulkResult(BaseModel):
+    index: int
+    status: str  # "created", "conflict" or "invalid"
+    favorite_id: Optional[int] = None
+    user_id: Optional[int] = None
+    item_id: Optional[int] = None
+    errors: Optional[List[Dict[str, Any]]] = None
+
+
+class FavoriteBulkResponse(BaseModel):
+    created: int
+    conflicts: int
+    invalid: int
+    results: List[FavoriteBulkResult]
+
+
+class ItemPopularity(BaseModel):
+    item_id: int
+    favorite_count: int
+
+
+class FavoriteCheckRequest(BaseModel):
+    item_ids: List[int]
+
+
+class FavoriteCheckResponse(BaseModel):
+    user_id: int
+    # item_id -> favorite_id, or None when the item is not favorited
+    favorites: Dict[int, Optional[int]]
+
+
+class FavoriteBulkDeleteRequest(BaseModel):
+    # A user's favorites to delete, by favorite ID and/or by item ID
+    favorite_ids: List[int] = []
+    item_ids: List[int] = []
+
+
+class FavoriteBulkDeleteResponse(BaseModel):
+    user_id: int
+    deleted: int
+    deleted_favorite_ids: List[int]
+    # Requested favorite IDs that do not exist, and item IDs the user has not favorited
+    not_found_favorite_ids: List[int] = []
+    not_found_item_ids: List[int] = []
+    # Requested favorite IDs that belong to another user (left in place)
+    not_owned_favorite_ids: List[int] = []
@@ -0,0 +1,191 @@
+"""
+Pre-fork launcher behind `python -m BakeryBackend serve` (POSIX only).
+
+The master process runs schema setup once, builds the app (preload: workers
+inherit the imported code and app copy-on-write instead of each importing
+it), binds the listening socket and forks workers that run uvicorn on it.
+
+Signals handled by the master:
+
+    SIGHUP          graceful restart: start a fresh set of workers, then let
+                    the old ones finish their in-flight requests and exit
+    SIGTERM/SIGINT  graceful shutdown
+    SIGTTIN/SIGTTOU add/remove one worker
+
+Workers that exit unexpectedly are replaced. Restarted workers are forked
+from the preloaded master, so code changes need a master restart.
+"""
+
+import dataclasses
+import logging
+import os
+import signal
+import socket
+import time
+from typing import Dict, List, Set
+
+import uvicorn
+
+from BakeryBackend.config import Settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds a stopping worker gets beyond the graceful timeout before SIGKILL
+KILL_GRACE_SECONDS = 5.0
+
+MASTER_SIGNALS = (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGTTIN, signal.SIGTTOU)
+
+
+def default_workers() -> int:
+    """Number of CPUs this process may run on"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class Arbiter:
+    """Fork, watch and replace uvicorn worker processes sharing one listening socket"""
+
+    def __init__(self, app, sock: socket.socket, workers: int, graceful_timeout: float):
+        self.app = app
+        self.sock = sock
+        self.num_workers = workers
+        self.graceful_timeout = graceful_timeout
+        self.workers: Dict[int, float] = {}  # pid -> time started
+        self.retiring: Dict[int, float] = {}  # pid -> time asked to stop
+        self.pending_signals: List[int] = []
+        self.stopping = False
+
+    def spawn_worker(self) -> int:
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = time.monotonic()
+            return pid
+
+        # Worker process: never returns
+        exit_code = 0
+        try:
+            for sig in MASTER_SIGNALS:
+                signal.signal(sig, signal.SIG_DFL)
+            # uvicorn re-raises the signal that stopped it once it has drained;
+            # the worker exits normally instead
+            signal.signal(signal.SIGTERM, lambda *args: None)
+            signal.signal(signal.SIGINT, lambda *args: None)
+
+            # Connections opened by the master (schema setup) must not be shared
+            self.app.state.database.dispose(close=False)
+
+            config = uvicorn.Config(
+                self.app,
+                timeout_graceful_shutdown=int(self.graceful_timeout),
+                lifespan="on"
+            )
+            uvicorn.Server(config).run(sockets=[self.sock])
+        except BaseException:
+            logger.exception("Worker %d crashed", os.getpid())
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def retire(self, pids):
+        now = time.monotonic()
+        for pid in pids:
+            self.workers.pop(pid, None)
+            self.retiring[pid] = now
+            self._kill(pid, signal.SIGTERM)
+
+    def _kill(self, pid: int, sig: int):
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def _handle_signal(self, sig, frame):
+        self.pending_signals.append(sig)
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if self.retiring.pop(pid, None) is not None:
+                continue
+            if self.workers.pop(pid, None) is not None and not self.stopping:
+                logger.warning("Worker %d exited with status %d; replacing it", pid, status)
+                self.spawn_worker()
+
+    def _process_signals(self):
+        while self.pending_signals:
+            sig = self.pending_signals.pop(0)
+            if sig in (signal.SIGTERM, signal.SIGINT):
+                logger.info("Shutting down %d workers", len(self.workers))
+                self.stopping = True
+                self.retire(list(self.workers))
+            elif sig == signal.SIGHUP:
+                logger.info("Graceful restart of %d workers", len(self.workers))
+                old = list(self.workers)
+                for _ in range(self.num_workers):
+                    self.spawn_worker()
+                self.retire(old)
+            elif sig == signal.SIGTTIN:
+                self.num_workers += 1
+                self.spawn_worker()
+            elif sig == signal.SIGTTOU and self.num_workers > 1:
+                self.num_workers -= 1
+                self.retire([max(self.workers)])
+
+    def _kill_stragglers(self):
+        deadline = self.graceful_timeout + KILL_GRACE_SECONDS
+        now = time.monotonic()
+        for pid, asked in list(self.retiring.items()):
+            if now - asked > deadline:
+                logger.warning("Worker %d did not stop in %.0fs; killing it", pid, deadline)
+                self._kill(pid, signal.SIGKILL)
+
+    def run(self):
+        for sig in MASTER_SIGNALS:
+            signal.signal(sig, self._handle_signal)
+        for _ in range(self.num_workers):
+            self.spawn_worker()
+        logger.info("Started %d workers: %s", self.num_workers, sorted(self.workers))
+
+        while not (self.stopping and not self.workers and not self.retiring):
+            self._process_signals()
+            self._reap()
+            self._kill_stragglers()
+            time.sleep(0.1)
+        logger.info("All workers stopped")
+
+
+def serve(settings: Settings, host: str = "127.0.0.1", port: int = 8000, workers: int = 0):
+    """Run schema setup once, preload the app and serve it from forked workers"""
+    from BakeryBackend.main import create_app, setup_storage
+
+    # Workers must not repeat the DDL
+    app = create_app(dataclasses.replace(settings, db_create_schema=False))
+
+    started = time.perf_counter()
+    setup_storage(app.state.database)
+    app.state.database.dispose()
+    logger.info("Schema ready in %.1f ms", (time.perf_counter() - started) * 1000)
+    sock = bind_socket(host, port)
+    logger.info("Listening on %s:%d", host, port)
+    workers = workers or settings.server_workers or default_workers()
+    try:
+        Arbiter(app, sock, workers, settings.server_graceful_timeout).run()
+    finally:
+        sock.close()
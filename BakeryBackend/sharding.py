@@ -0,0 +1,243 @@
+"""
+Hash-sharded storage (BAKERY_DB_SHARDS > 1).
+
+Favorites are spread over several SQLite files by user_id, so writes for
+different users take different write locks. A user's favorites, list
+version and membership all live on one shard: the one shard_for(user_id)
+picks with a jump consistent hash, which is stable across processes.
+When the shard count grows from n to m, only about 1 - n/m of the users
+move.
+
+get_db resolves the shard from the request's user_id, which comes from the
+path, the user_id query parameter or a JSON body's top-level user_id.
+Requests that span users (bulk adds, item listings, counts, popularity,
+exports) use the ShardSet directly: reads are scattered to every shard in
+parallel and gathered, and a bulk add commits once per shard.
+
+Favorite IDs stay unique across shards. Every shard file's favorites table
+is AUTOINCREMENT and draws IDs from its own block of 2**SHARD_ID_BITS
+(shard_first_id). Item listings can then merge shards by ID, and their
+cursors keep working. Each shard counts only its own favorites per item,
+and an item's list version is the sum of its per-shard versions.
+
+Changing the shard count needs `python -m BakeryBackend rebalance`. It
+copies every shard into a new set of files (see rebalance()) and gives
+them ID blocks above every existing ID. Stop writes while it runs, then
+point BAKERY_DB_SHARDS and BAKERY_DB_SHARD_URL_TEMPLATE at the new files.
+"""
+
+import heapq
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from sqlalchemy import MetaData, func, insert, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from BakeryBackend.models import Favorite as FavoriteModel, FavoriteListVersion
+from BakeryBackend.versions import ITEM_SCOPE
+
+logger = logging.getLogger(__name__)
+
+# Size of each shard file's block of favorite IDs
+SHARD_ID_BITS = 40
+
+# Rows copied per INSERT while rebalancing
+REBALANCE_BATCH_SIZE = 10000
+
+_MASK_64 = (1 << 64) - 1
+
+
+def _mix64(value: int) -> int:
+    """splitmix64 finalizer, so neighbouring user IDs land on unrelated shards"""
+    value = (value + 0x9E3779B97F4A7C15) & _MASK_64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK_64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK_64
+    return value ^ (value >> 31)
+
+
+def shard_for(user_id: int, shards: int) -> int:
+    """Shard index of user_id among shards (Lamping & Veach jump consistent hash)"""
+    key = _mix64(user_id & _MASK_64)
+    bucket, candidate = -1, 0
+    while candidate < shards:
+        bucket = candidate
+        key = (key * 2862933555777941757 + 1) & _MASK_64
+        candidate = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+def shard_urls(template: str, shards: int) -> List[str]:
+    return [template.format(shard=shard) for shard in range(shards)]
+
+
+def shard_first_id(shard: int, block_start: int = 0) -> int:
+    """First favorite ID handed out by a shard file whose layout starts its blocks at block_start"""
+    return max(1, block_start + (shard << SHARD_ID_BITS))
+
+
+def create_shard_schema(bind: Engine, first_id: int):
+    """
+    Create the favorites table of a shard file as AUTOINCREMENT and make sure
+    its next ID is at least first_id. The other tables come from setup_database
+    """
+    table = FavoriteModel.__table__.to_metadata(MetaData())
+    table.dialect_options["sqlite"]["autoincrement"] = True
+    table.create(bind=bind, checkfirst=True)
+    with bind.begin() as conn:
+        reserve_ids(conn, first_id)
+
+
+def reserve_ids(conn, first_id: int):
+    """Raise the favorites AUTOINCREMENT counter so the next ID is at least first_id"""
+    seq = conn.scalar(text("SELECT seq FROM sqlite_sequence WHERE name = 'favorites'"))
+    if seq is None:
+        conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('favorites', :seq)"), {"seq": first_id - 1})
+    elif seq < first_id - 1:
+        conn.execute(text("UPDATE sqlite_sequence SET seq = :seq WHERE name = 'favorites'"), {"seq": first_id - 1})
+
+
+class ShardSet:
+    """One engine and session factory per shard, plus a pool for scatter-gather reads"""
+
+    def __init__(self, engines: Sequence[Engine]):
+        self.engines = list(engines)
+        self.sessionmakers = [
+            sessionmaker(bind=engine, autocommit=False, autoflush=False) for engine in self.engines
+        ]
+        # Shared by all requests: a few concurrent scatters per shard
+        self._executor = ThreadPoolExecutor(max_workers=4 * len(self.engines), thread_name_prefix="shard")
+
+    def __len__(self) -> int:
+        return len(self.engines)
+
+    def shard_for(self, user_id: int) -> int:
+        return shard_for(user_id, len(self.engines))
+
+    def session(self, shard: int) -> Session:
+        return self.sessionmakers[shard]()
+
+    def scatter(
+        self,
+        fn: Callable[[Session, int], Any],
+        shards: Optional[Iterable[int]] = None,
+        return_exceptions: bool = False
+    ) -> List[Any]:
+        """
+        fn(session, shard) on each of shards (default: all) in parallel, each in
+        a session of its own; results in the order of shards. With
+        return_exceptions, a failing shard's exception is returned in its place
+        instead of raised, once every shard is done
+        """
+        def run(shard: int):
+            with self.sessionmakers[shard]() as session:
+                return fn(session, shard)
+
+        futures = [self._executor.submit(run, shard) for shard in (range(len(self)) if shards is None else shards)]
+        results = []
+        for future in futures:
+            error = future.exception()
+            if error is not None and not return_exceptions:
+                raise error
+            results.append(error if error is not None else future.result())
+        return results
+
+    def stream(self, query, batch_size: int) -> Iterator[List[Any]]:
+        """Batches of query's rows from every shard merged by their first column (the ID)"""
+        sessions = [session_factory() for session_factory in self.sessionmakers]
+        try:
+            results = [session.execute(query.execution_options(yield_per=batch_size)) for session in sessions]
+            batch = []
+            for row in heapq.merge(*results, key=lambda row: row[0]):
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        finally:
+            for session in sessions:
+                session.close()
+
+    def dispose(self):
+        for engine in self.engines:
+            engine.dispose()
+
+
+def rebalance(source_engines: Sequence[Engine], target_engines: Sequence[Engine], setup_database) -> Dict[str, Any]:
+    """
+    Copy every favorite from the source shards into empty target shards, routed
+    by shard_for(user_id, len(target_engines)), with IDs unchanged. The target
+    files get ID blocks above every copied ID, per-item counters rebuilt from
+    their own rows, the users' list versions, and each item's summed version
+    (on target 0). Returns row counts for a check against the source.
+    """
+    targets = len(target_engines)
+    for engine in target_engines:
+        with engine.connect() as conn:
+            if conn.scalar(text("SELECT count(*) FROM sqlite_master WHERE name = 'favorites'")):
+                raise ValueError(f"Target database {engine.url} already has a favorites table")
+
+    max_id = 0
+    for engine in source_engines:
+        with engine.connect() as conn:
+            max_id = max(max_id, conn.scalar(select(func.max(FavoriteModel.id))) or 0)
+    block_start = ((max_id >> SHARD_ID_BITS) + 1) << SHARD_ID_BITS
+    for shard, engine in enumerate(target_engines):
+        create_shard_schema(engine, shard_first_id(shard, block_start))
+
+    copied = [0] * targets
+    item_versions: Dict[int, int] = {}
+    for engine in source_engines:
+        with engine.connect() as conn:
+            rows = conn.execute(
+                select(FavoriteModel.id, FavoriteModel.user_id, FavoriteModel.item_id, FavoriteModel.item_name)
+                .execution_options(yield_per=REBALANCE_BATCH_SIZE)
+            )
+            for batch in rows.partitions():
+                by_target: Dict[int, List[dict]] = {}
+                for id_, user_id, item_id, item_name in batch:
+                    target = shard_for(user_id, targets)
+                    by_target.setdefault(target, []).append(
+                        {"id": id_, "user_id": user_id, "item_id": item_id, "item_name": item_name}
+                    )
+                for target, values in by_target.items():
+                    with target_engines[target].begin() as target_conn:
+                        target_conn.execute(insert(FavoriteModel), values)
+                    copied[target] += len(values)
+
+            if not conn.dialect.has_table(conn, FavoriteListVersion.__tablename__):
+                continue
+            user_versions: Dict[int, List[dict]] = {}
+            for scope, owner_id, version in conn.execute(
+                select(FavoriteListVersion.scope, FavoriteListVersion.owner_id, FavoriteListVersion.version)
+            ):
+                if scope == ITEM_SCOPE:
+                    item_versions[owner_id] = item_versions.get(owner_id, 0) + version
+                else:
+                    user_versions.setdefault(shard_for(owner_id, targets), []).append(
+                        {"scope": scope, "owner_id": owner_id, "version": version}
+                    )
+            for target, values in user_versions.items():
+                FavoriteListVersion.__table__.create(bind=target_engines[target], checkfirst=True)
+                with target_engines[target].begin() as target_conn:
+                    target_conn.execute(insert(FavoriteListVersion), values)
+
+    for shard, engine in enumerate(target_engines):
+        # Copying explicit IDs moved the counter back down to the highest copied ID
+        with engine.begin() as conn:
+            conn.execute(text("UPDATE sqlite_sequence SET seq = :seq WHERE name = 'favorites'"),
+                         {"seq": shard_first_id(shard, block_start) - 1})
+        setup_database(engine)  # counters are backfilled from the copied favorites
+    if item_versions:
+        with target_engines[0].begin() as conn:
+            conn.execute(insert(FavoriteListVersion), [
+                {"scope": "item", "owner_id": item_id, "version": version}
+                for item_id, version in item_versions.items()
+            ])
+
+    logger.info("Copied %d favorites into %d shards", sum(copied), targets)
+    return {"favorites": sum(copied), "per_shard": copied, "first_ids": [
+        shard_first_id(shard, block_start) for shard in range(targets)
+    ]}
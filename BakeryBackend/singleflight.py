@@ -0,0 +1,172 @@
+"""
+Request coalescing for the favorites listings (BAKERY_SINGLE_FLIGHT).
+
+When many requests ask for the same page at once, e.g. the users of an item
+on promotion, only the first (the leader) runs the queries. Requests that
+arrive while it is running wait for it and get the same result, including the
+encoded body when BAKERY_FAST_JSON_LISTS is on. With window_seconds > 0 a
+finished result is also handed to identical requests arriving for that long
+afterwards.
+
+Keys are tuples starting with (scope, owner_id), as in versions.py. Writes
+call forget() after their commit, like RecentWrites.mark(). This detaches
+the calls for the users and items written, so a request arriving after a
+commit never joins a query that may have started before it. Requests that
+were already waiting still get that query's result. Like the cache, this
+only sees writes made by its own process: with window_seconds > 0, other
+processes' writes can be missed for up to the window.
+
+Sync endpoints run on threadpool threads and async ones on the event loop,
+so results are shared through a concurrent.futures.Future under a lock.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+from starlette.requests import Request
+
+from BakeryBackend.config import Settings, get_settings
+from BakeryBackend.metrics import single_flight_requests
+from BakeryBackend.versions import ITEM_SCOPE, USER_SCOPE
+
+# Finished calls kept for the window are swept once there are this many keys
+PRUNE_THRESHOLD = 1024
+
+
+class _Call:
+    __slots__ = ("future", "expires_at")
+
+    def __init__(self):
+        self.future: Future = Future()
+        self.expires_at: Optional[float] = None  # set once finished with a window
+
+
+class SingleFlight:
+    """Runs one call per key at a time and shares its result with concurrent callers"""
+
+    def __init__(self, window_seconds: float = 0.0, clock: Callable[[], float] = time.monotonic):
+        self.window_seconds = window_seconds
+        self.clock = clock
+        self._calls: Dict[Hashable, _Call] = {}
+        self._owners: Dict[Tuple[str, int], Set[Hashable]] = {}  # (scope, owner_id) -> keys
+        self._lock = threading.Lock()
+
+    def do(self, key: Tuple, fn: Callable[[], Any]) -> Any:
+        """fn()'s result, run here or shared from the in-flight (or windowed) call for key"""
+        while True:
+            call, leader = self._join(key)
+            if leader:
+                single_flight_requests.inc(role="leader")
+                try:
+                    result = fn()
+                except BaseException as e:
+                    self._fail(key, call, e)
+                    raise
+                self._succeed(key, call, result)
+                return result
+            try:
+                result = call.future.result()
+            except CancelledError:
+                continue  # the leader went away without a result; run again
+            single_flight_requests.inc(role="follower")
+            return result
+
+    async def do_async(self, key: Tuple, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """do() for coroutine functions, waiting without blocking the event loop"""
+        while True:
+            call, leader = self._join(key)
+            if leader:
+                single_flight_requests.inc(role="leader")
+                try:
+                    result = await fn()
+                except BaseException as e:
+                    self._fail(key, call, e)
+                    raise
+                self._succeed(key, call, result)
+                return result
+            try:
+                # Shielded so that a waiter being cancelled does not cancel the shared call
+                result = await asyncio.shield(asyncio.wrap_future(call.future))
+            except asyncio.CancelledError:
+                if not call.future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                continue
+            single_flight_requests.inc(role="follower")
+            return result
+
+    def forget(self, user_ids: Iterable[int] = (), item_ids: Iterable[int] = ()):
+        """Detach the calls for these users and items; call after committing a write to them"""
+        owners = [(USER_SCOPE, user_id) for user_id in user_ids] + [(ITEM_SCOPE, item_id) for item_id in item_ids]
+        with self._lock:
+            for owner in owners:
+                for key in self._owners.pop(owner, ()):
+                    del self._calls[key]
+
+    def _join(self, key: Tuple) -> Tuple[_Call, bool]:
+        """The call to wait for, or a new one and True when the caller must run it"""
+        now = self.clock()
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None and (call.expires_at is None or call.expires_at > now):
+                return call, False
+            if call is None and len(self._calls) >= PRUNE_THRESHOLD:
+                self._prune(now)
+            call = _Call()
+            if key not in self._calls:
+                self._owners.setdefault(key[:2], set()).add(key)
+            self._calls[key] = call
+            return call, True
+
+    def _succeed(self, key: Tuple, call: _Call, result: Any):
+        with self._lock:
+            if self._calls.get(key) is call:
+                if self.window_seconds > 0:
+                    call.expires_at = self.clock() + self.window_seconds
+                else:
+                    self._remove(key)
+        call.future.set_result(result)
+
+    def _fail(self, key: Tuple, call: _Call, error: BaseException):
+        with self._lock:
+            if self._calls.get(key) is call:
+                self._remove(key)
+        if isinstance(error, Exception):
+            call.future.set_exception(error)
+        else:
+            call.future.cancel()  # cancelled or interrupted: waiters run it themselves
+
+    def _remove(self, key: Tuple):
+        """Drop key (call under the lock)"""
+        del self._calls[key]
+        keys = self._owners[key[:2]]
+        keys.discard(key)
+        if not keys:
+            del self._owners[key[:2]]
+
+    def _prune(self, now: float):
+        """Drop finished calls whose window has passed (call under the lock)"""
+        for key in [key for key, call in self._calls.items() if call.expires_at is not None and call.expires_at <= now]:
+            self._remove(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            finished = sum(1 for call in self._calls.values() if call.expires_at is not None)
+            return {"in_flight": len(self._calls) - finished, "windowed": finished}
+
+
+def build_single_flight(settings: Settings) -> Optional[SingleFlight]:
+    if not settings.single_flight:
+        return None
+    return SingleFlight(settings.single_flight_window_ms / 1000)
+
+
+# Process-wide coalescer for apps assembled by hand; create_app builds one per app
+single_flight: Optional[SingleFlight] = build_single_flight(get_settings())
+
+
+def get_single_flight(request: Request) -> Optional[SingleFlight]:
+    """Dependency returning the request coalescer, or None when single flight is disabled"""
+    return getattr(request.app.state, "single_flight", single_flight)
@@ -0,0 +1,105 @@
+import asyncio
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+try:
+    import httpx2 as httpx
+except ModuleNotFoundError:
+    import httpx
+
+from BakeryBackend.admission import AdmissionMiddleware, TokenBuckets
+from BakeryBackend.metrics import admission_decisions
+
+
+def build_app(**middleware_options) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware, **middleware_options)
+
+    @app.get("/slow")
+    async def slow():
+        await asyncio.sleep(0.2)
+        return {"ok": True}
+
+    @app.get("/health")
+    async def health():
+        return {"ok": True}
+
+    @app.post("/favorites/")
+    async def add(request: Request):
+        return await request.json()
+
+    @app.post("/favorites/user/{user_id}/check")
+    async def check(user_id: int):
+        return {"user_id": user_id}
+
+    return app
+
+
+async def get_concurrently(app: FastAPI, paths):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        async def get(path, delay):
+            await asyncio.sleep(delay)  # keep arrival order deterministic
+            return await client.get(path)
+        return await asyncio.gather(*(get(path, i * 0.01) for i, path in enumerate(paths)))
+
+
+def test_token_buckets_refill():
+    now = [0.0]
+    buckets = TokenBuckets(rate=2.0, burst=2, clock=lambda: now[0], max_keys=2)
+    assert buckets.take("a") == 0 and buckets.take("a") == 0
+    assert buckets.take("a") == 0.5
+    now[0] = 0.5
+    assert buckets.take("a") == 0
+
+    buckets.take("b")
+    now[0] = 10.0
+    buckets.take("c")  # at max_keys: refilled buckets are pruned first
+    assert len(buckets) == 1
+
+
+def test_queued_requests_are_admitted_then_shed():
+    app = build_app(max_in_flight=1, max_queue=1, max_queue_wait_seconds=1.0, retry_after_seconds=3)
+    shed_before = admission_decisions.value(decision="shed")
+    responses = asyncio.run(get_concurrently(app, ["/slow", "/slow", "/slow", "/health"]))
+
+    # One runs, one waits for its slot, the third finds the queue full
+    assert [r.status_code for r in responses] == [200, 200, 503, 200]
+    error = responses[2].json()["error"]
+    assert (error["type"], error["status_code"]) == ("ServiceUnavailable", 503)
+    assert responses[2].headers["Retry-After"] == "3"
+    assert admission_decisions.value(decision="shed") == shed_before + 1
+
+
+def test_queue_wait_limit_sheds():
+    app = build_app(max_in_flight=1, max_queue=10, max_queue_wait_seconds=0.05)
+    responses = asyncio.run(get_concurrently(app, ["/slow", "/slow", "/slow"]))
+    assert [r.status_code for r in responses] == [200, 503, 503]
+
+    # The slot is free again once the first request is done
+    assert asyncio.run(get_concurrently(app, ["/slow"]))[0].status_code == 200
+
+
+def test_rate_limits_writes_per_user_and_ip():
+    now = [0.0]
+    client = TestClient(build_app(
+        user_buckets=TokenBuckets(rate=1.0, burst=2, clock=lambda: now[0]),
+        ip_buckets=TokenBuckets(rate=1.0, burst=4, clock=lambda: now[0])
+    ))
+    favorite = {"user_id": 1, "item_id": 2, "item_name": "Bun"}
+    assert [client.post("/favorites/", json=favorite).status_code for _ in range(3)] == [200, 200, 429]
+
+    response = client.post("/favorites/", json=favorite)
+    assert response.json()["error"]["type"] == "RateLimitError"
+    assert response.json()["error"]["details"] == {"limit": "user", "retry_after_seconds": 1.0}
+    assert response.headers["Retry-After"] == "1"
+
+    # Another user is limited by the shared IP bucket only; reads are never limited
+    response = client.post("/favorites/", json={**favorite, "user_id": 2})
+    assert response.status_code == 429
+    assert response.json()["error"]["details"]["limit"] == "ip"
+    assert client.post("/favorites/user/1/check", json={"item_ids": [1]}).status_code == 200
+
+    now[0] = 2.0
+    response = client.post("/favorites/", json={**favorite, "user_id": 2})
+    assert response.status_code == 200
+    assert response.json()["user_id"] == 2  # the buffered body reached the endpoint
@@ -0,0 +1,57 @@
+from BakeryBackend.cache import LRUCache, LocalRemoteClient, RemoteCache, user_favorites_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_ttl_and_entry_budget():
+    clock = FakeClock()
+    cache = LRUCache(max_entries=2, ttl_seconds=10, clock=clock)
+    cache.set("a", [1])
+    cache.set("b", [2])
+    assert cache.get("a") == [1]  # "a" is now most recently used
+    cache.set("c", [3])
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+
+    clock.now = 11
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"]) == (1, 2, 1)
+
+
+def test_lru_byte_budget():
+    cache = LRUCache(max_bytes=20)
+    cache.set("a", "x" * 10)
+    cache.set("b", "y" * 10)
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] <= 20
+
+
+def test_stale_reader_cannot_repopulate_after_invalidate():
+    for cache in (LRUCache(), RemoteCache(LocalRemoteClient())):
+        generation = cache.generation("k")
+        cache.invalidate("k")  # a write lands while the reader is querying
+        cache.set("k", ["stale"], generation)
+        assert cache.get("k") is None
+        cache.set("k", ["fresh"], cache.generation("k"))
+        assert cache.get("k") == ["fresh"]
+
+
+def test_invalidations_are_remembered_within_a_bound():
+    for cache in (LRUCache(max_entries=3), RemoteCache(LocalRemoteClient(), max_tracked_writes=3)):
+        generation = cache.generation("k")
+        for user_id in range(1000):
+            cache.invalidate(user_favorites_key(user_id))
+        assert len(cache._writes) == 3
+        # Writes since the reader started have been forgotten, so it is refused
+        cache.set("k", ["maybe stale"], generation)
+        assert cache.get("k") is None
+        cache.set("k", ["fresh"], cache.generation("k"))
+        assert cache.get("k") == ["fresh"]
+
@@ -0,0 +1,99 @@
+import asyncio
+import gzip
+import zlib
+
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from BakeryBackend.compression import CompressedBodyCache, CompressionMiddleware, negotiate
+
+BODY = b'{"item_name":"Croissant"}' * 100
+
+
+def build_app(**middleware_options) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, encodings=("gzip",), **middleware_options)
+
+    @app.get("/page")
+    def page():
+        return Response(BODY, media_type="application/json", headers={"ETag": '"user-1-3-100-0"'})
+
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+
+    @app.get("/png")
+    def png():
+        return Response(BODY, media_type="image/png")
+
+    @app.get("/export")
+    def export():
+        return StreamingResponse(iter([b"a,b\n" * 200, b"c,d\n" * 200]), media_type="text/csv")
+
+    return app
+
+
+def test_negotiate():
+    offered = ("zstd", "br", "gzip")
+    assert negotiate("gzip, deflate", offered) == "gzip"
+    assert negotiate("gzip;q=0.5, br", offered) == "br"
+    assert negotiate("gzip, br", offered) == "br"
+    assert negotiate("*;q=0.1, gzip;q=0", ("gzip",)) is None
+    assert negotiate("*", offered) == "zstd"
+    assert negotiate("identity", offered) is None
+
+
+def test_compresses_large_compressible_bodies():
+    client = TestClient(build_app())
+    response = client.get("/page", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.headers["ETag"] == 'W/"user-1-3-100-0"'
+    assert int(response.headers["Content-Length"]) < len(BODY)
+    assert response.content == BODY
+
+    for path in ("/small", "/png"):
+        response = client.get(path, headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in response.headers
+    response = client.get("/page", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["ETag"] == '"user-1-3-100-0"'
+
+
+def test_streaming_responses_are_compressed_per_chunk():
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"spec_version": "2.4"}, "http_version": "1.1", "method": "GET", "scheme": "http", "path": "/export",
+        "raw_path": b"/export", "root_path": "", "query_string": b"", "server": ("test", 80),
+        "headers": [(b"accept-encoding", b"gzip")]
+    }
+    asyncio.run(build_app()(scope, receive, send))
+
+    headers = dict(messages[0]["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    chunks = [message["body"] for message in messages[1:]]
+    # Every chunk is flushed, so the first one decodes before the rest arrive
+    assert zlib.decompressobj(31).decompress(chunks[0]) == b"a,b\n" * 200
+    assert gzip.decompress(b"".join(chunks)) == b"a,b\n" * 200 + b"c,d\n" * 200
+
+
+def test_compressed_body_cache():
+    cache = CompressedBodyCache(max_entries=4)
+    client = TestClient(build_app(cache=cache))
+    bodies = [client.get("/page", headers={"Accept-Encoding": "gzip"}).content for _ in range(3)]
+    assert bodies == [BODY] * 3
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["entries"] == 1
+
+    for i in range(5):
+        cache.set(("/other", f'"{i}"', "gzip"), b"x")
+    assert cache.stats()["entries"] == 4
@@ -0,0 +1,71 @@
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+from BakeryBackend.config import Settings
+from BakeryBackend.database import engine_options, health_engine_options, install_sqlite_pragmas, TimedQueuePool
+from BakeryBackend.metrics import db_pool_checkout_wait
+
+
+def test_settings_from_env():
+    settings = Settings.from_env({
+        "BAKERY_DATABASE_URL": "postgresql://bakery@db/bakery",
+        "BAKERY_DB_MODE": "async",
+        "BAKERY_DB_POOL_SIZE": "20",
+        "BAKERY_DB_POOL_TIMEOUT": "2.5",
+        "BAKERY_DB_POOL_PRE_PING": "true",
+    })
+    assert settings.database_url == "postgresql://bakery@db/bakery"
+    assert settings.async_database_url == "postgresql+asyncpg://bakery@db/bakery"
+    assert settings.db_pool_size == 20
+    assert settings.db_pool_timeout == 2.5
+    assert settings.db_pool_pre_ping is True
+
+
+def test_engine_options_skip_pool_sizing_for_memory_sqlite():
+    settings = Settings(db_pool_size=3)
+    assert "pool_size" not in engine_options("sqlite:///:memory:", settings)
+    options = engine_options("sqlite:///bakery.db", settings)
+    assert options["poolclass"] is TimedQueuePool
+    assert options["pool_size"] == 3
+
+
+def test_sqlite_pragmas_and_checkout_wait_metric(tmp_path):
+    url = f"sqlite:///{tmp_path / 'favorites.db'}"
+    settings = Settings(database_url=url)
+    file_engine = create_engine(url, **engine_options(url, settings))
+    install_sqlite_pragmas(file_engine, settings)
+    before = db_pool_checkout_wait.snapshot()["count"]
+    try:
+        with file_engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA busy_timeout")).scalar() == settings.sqlite_busy_timeout_ms
+    finally:
+        file_engine.dispose()
+    assert db_pool_checkout_wait.snapshot()["count"] == before + 1
+
+
+def test_health_engine_bypasses_the_pool_with_driver_timeouts(tmp_path):
+    settings = Settings(health_db_timeout_seconds=0.5, db_pool_size=1, db_max_overflow=0)
+    postgres = health_engine_options("postgresql://bakery@db/bakery", settings)["connect_args"]
+    assert postgres == {"connect_timeout": 2, "options": "-c statement_timeout=500"}
+    assert health_engine_options("postgresql+asyncpg://bakery@db/bakery", settings)["connect_args"] == {
+        "timeout": 0.5, "command_timeout": 0.5
+    }
+
+    url = f"sqlite:///{tmp_path / 'favorites.db'}"
+    options = health_engine_options(url, settings)
+    assert options["poolclass"] is NullPool and options["connect_args"]["timeout"] == 0.5
+    file_engine = create_engine(url, **engine_options(url, settings))
+    health_engine = create_engine(url, **options)
+    try:
+        # With every pooled connection checked out, the probe still answers at once
+        with file_engine.connect():
+            start = time.perf_counter()
+            with health_engine.connect() as conn:
+                assert conn.execute(text("SELECT 1")).scalar() == 1
+            assert time.perf_counter() - start < 0.5
+    finally:
+        file_engine.dispose()
+        health_engine.dispose()
+
@@ -0,0 +1,172 @@
+import asyncio
+import tracemalloc
+
+import pytest
+try:
+    import httpx2 as httpx
+except ModuleNotFoundError:
+    import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from BakeryBackend.main import app, setup_database
+from BakeryBackend.database import get_db
+from BakeryBackend.events import EventHub, get_event_hub
+
+# Memory an idle stream may hold: its request task, StreamingResponse and hub
+# subscriber (about 27 KiB on CPython 3.11)
+IDLE_SUBSCRIBER_MAX_BYTES = 40 * 1024
+
+
+class StreamConnection:
+    """Drives one GET through the ASGI app, collecting body frames until disconnect()"""
+
+    def __init__(self, path: str, headers=()):
+        self.scope = {
+            "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http",
+            "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+            "server": ("test", 80), "client": ("test", 1234), "headers": list(headers)
+        }
+        self.status = None
+        self.frames = []
+        self.received = asyncio.Event()
+        self._requested = False
+        self._disconnected = asyncio.Event()
+
+    def start(self) -> asyncio.Task:
+        return asyncio.create_task(app(self.scope, self.receive, self.send))
+
+    def disconnect(self):
+        self._disconnected.set()
+
+    async def receive(self):
+        if not self._requested:
+            self._requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await self._disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.status = message["status"]
+        elif message.get("body"):
+            self.frames.append(message["body"])
+            self.received.set()
+
+    async def next_frame(self) -> bytes:
+        while not self.frames:
+            self.received.clear()
+            await asyncio.wait_for(self.received.wait(), 5)
+        return self.frames.pop(0)
+
+
+@pytest.fixture
+def hub():
+    hub = EventHub(ring_size=8, queue_size=4, clock=lambda: 1.0)
+    app.dependency_overrides[get_event_hub] = lambda: hub
+    yield hub
+    app.dependency_overrides.pop(get_event_hub, None)
+
+
+def test_writes_are_streamed_and_resumable(hub, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'events.db'}", connect_args={"check_same_thread": False})
+    setup_database(engine)
+    SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def scenario():
+        stream = StreamConnection("/favorites/7/stream")
+        task = stream.start()
+        assert await stream.next_frame() == b"retry: 3000\n\n"
+        assert stream.status == 200
+
+        # Sync endpoints publish from threadpool threads
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.post("/favorites/", json={"user_id": 7, "item_id": 3, "item_name": "Tart"})
+            fav_id = response.json()["id"]
+            await client.post("/favorites/", json={"user_id": 8, "item_id": 3, "item_name": "Tart"})
+            await client.delete(f"/favorites/{fav_id}?user_id=7")
+
+        added = await stream.next_frame()
+        assert added.startswith(b"id: 1000-1\nevent: favorite_added\n")
+        assert b'"favorite_id":%d,"item_id":3,"item_name":"Tart"' % fav_id in added
+        assert (await stream.next_frame()).startswith(b"id: 1000-3\nevent: favorite_deleted\n")
+        stream.disconnect()
+        await task
+        assert hub.stats()["subscribers"] == 0
+
+        # Resume after the add: only user 7's delete is replayed
+        resumed = StreamConnection("/favorites/7/stream", [(b"last-event-id", b"1000-1")])
+        task = resumed.start()
+        await resumed.next_frame()
+        assert (await resumed.next_frame()).startswith(b"id: 1000-3\n")
+        resumed.disconnect()
+        await task
+
+        # An ID from another process cannot be resumed
+        stale = StreamConnection("/favorites/7/stream", [(b"last-event-id", b"999-1")])
+        task = stale.start()
+        await stale.next_frame()
+        assert (await stale.next_frame()).startswith(b"event: reset\n")
+        stale.disconnect()
+        await task
+
+    # test_favorites installs a get_db override for the whole app; put it back afterwards
+    saved = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        asyncio.run(scenario())
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        if saved is not None:
+            app.dependency_overrides[get_db] = saved
+        engine.dispose()
+
+
+def test_slow_consumer_is_dropped(hub):
+    async def scenario():
+        subscriber = hub.subscribe(1)
+        for i in range(5):
+            hub.publish("favorite_added", 1, [{"favorite_id": i, "item_id": i}])
+        await asyncio.sleep(0)  # let the deliveries run
+        assert subscriber.dropped
+        assert await subscriber.next_frame(1) is None
+        hub.unsubscribe(subscriber)
+
+    asyncio.run(scenario())
+    assert hub.stats() == {"subscribers": 0, "users": 0, "buffered_events": 5, "last_event": 5}
+
+
+def test_memory_per_idle_subscriber(hub):
+    connections = 2000
+
+    async def scenario():
+        streams = [StreamConnection(f"/favorites/{i % 100 + 1}/stream") for i in range(connections)]
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        tasks = [stream.start() for stream in streams]
+        for stream in streams:
+            await stream.next_frame()
+        per_connection = (tracemalloc.get_traced_memory()[0] - before) / connections
+        tracemalloc.stop()
+        assert hub.stats()["subscribers"] == connections
+
+        hub.publish("favorite_added", 1, [{"favorite_id": 1, "item_id": 1}])
+        for stream in streams[::100]:
+            assert b"event: favorite_added" in await stream.next_frame()
+        assert not any(stream.frames for stream in streams[1::100])
+
+        for stream in streams:
+            stream.disconnect()
+        await asyncio.gather(*tasks)
+        return per_connection
+
+    per_connection = asyncio.run(scenario())
+    assert per_connection < IDLE_SUBSCRIBER_MAX_BYTES, f"{per_connection / 1024:.1f} KiB per idle subscriber"
+    assert hub.stats()["subscribers"] == 0
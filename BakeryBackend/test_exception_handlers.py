@@ -0,0 +1,90 @@
+import dataclasses
+import logging
+from datetime import datetime
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from BakeryBackend.config import get_settings
+from BakeryBackend.main import create_app
+from BakeryBackend.exceptions import BakeryBaseException, ConflictError, NotFoundError
+from BakeryBackend.exception_handlers import LogRateLimiter, register_exception_handlers, utc_timestamp
+
+
+class ShelfEmptyError(NotFoundError):
+    pass
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    register_exception_handlers(app)
+
+    @app.get("/conflict")
+    def conflict():
+        raise ConflictError(message="Already there", details={"item_id": 7})
+
+    @app.get("/subclass")
+    def subclass():
+        raise ShelfEmptyError(message="No croissants left")
+
+    @app.get("/base")
+    def base():
+        raise BakeryBaseException("Unmapped")
+
+    return app
+
+
+def test_table_driven_handler_maps_hierarchy():
+    client = TestClient(build_app(), raise_server_exceptions=False)
+
+    error = client.get("/conflict").json()["error"]
+    assert error["type"] == "ConflictError"
+    assert error["status_code"] == 409
+    assert error["details"] == {"item_id": 7}
+    datetime.fromisoformat(error["timestamp"])
+
+    response = client.get("/subclass")
+    assert response.status_code == 404
+    assert response.json()["error"]["type"] == "NotFoundError"
+
+    response = client.get("/base")
+    assert response.status_code == 500
+    assert response.json()["error"]["type"] == "InternalServerError"
+
+
+def test_utc_timestamp_matches_isoformat():
+    before = datetime.utcnow()
+    stamp = datetime.fromisoformat(utc_timestamp())
+    assert before <= stamp <= datetime.utcnow()
+
+
+def test_log_rate_limiter_counts_suppressed_lines():
+    now = [100.0]
+    limiter = LogRateLimiter(max_per_second=2, clock=lambda: now[0])
+
+    assert [limiter.allow("NotFoundError") for _ in range(5)] == [
+        (True, 0), (True, 0), (False, 0), (False, 0), (False, 0)
+    ]
+    assert limiter.allow("ConflictError") == (True, 0)
+
+    now[0] = 101.0
+    assert limiter.allow("NotFoundError") == (True, 3)
+    assert limiter.allow("NotFoundError") == (True, 0)
+
+    assert LogRateLimiter(max_per_second=0).allow("NotFoundError") == (True, 0)
+
+
+def test_handlers_use_the_apps_log_limiter(caplog):
+    app = build_app()
+    app.state.log_limiter = LogRateLimiter(max_per_second=1, clock=lambda: 100.0)
+    client = TestClient(app)
+    with caplog.at_level(logging.WARNING, logger="BakeryBackend.exception_handlers"):
+        for _ in range(3):
+            assert client.get("/conflict").status_code == 409
+    assert [record.getMessage() for record in caplog.records] == ["ConflictError: Already there"]
+
+    settings = dataclasses.replace(get_settings(), error_log_max_per_second=3)
+    configured = create_app(settings)
+    try:
+        assert configured.state.log_limiter.max_per_second == 3
+    finally:
+        configured.state.database.dispose()
@@ -0,0 +1,136 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from BakeryBackend.main import app, setup_database
+from BakeryBackend.database import get_db
+from BakeryBackend.exceptions import ConflictError, DatabaseError, NotFoundError, UnauthorizedError
+from BakeryBackend.group_commit import AddFavorite, DeleteFavorite, GroupCommitter, get_group_committer
+from BakeryBackend.models import Favorite as FavoriteModel, ItemFavoriteCount
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'group.db'}", connect_args={"check_same_thread": False})
+    setup_database(engine)
+    yield sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    engine.dispose()
+
+
+def test_batch_preserves_serial_semantics(session_factory):
+    committer = GroupCommitter(session_factory, max_ops=100, max_delay_ms=1000)
+    ops = [
+        AddFavorite(1, 10, "Tart"),
+        AddFavorite(1, 10, "Tart"),
+        AddFavorite(2, 10, "Tart"),
+        DeleteFavorite(1, user_id=2),
+        DeleteFavorite(1, user_id=1),
+        DeleteFavorite(1, user_id=1),
+    ]
+    batch = [(op, Future()) for op in ops]
+    committer.flush(batch)
+    futures = [future for _, future in batch]
+
+    assert futures[0].result() == 1
+    with pytest.raises(ConflictError) as conflict:
+        futures[1].result()
+    assert conflict.value.details["existing_favorite_id"] == 1
+    assert futures[2].result() == 2
+    with pytest.raises(UnauthorizedError):
+        futures[3].result()
+    assert futures[4].result() == (10, "Tart")
+    with pytest.raises(NotFoundError):
+        futures[5].result()
+
+    with session_factory() as db:
+        assert db.scalars(select(FavoriteModel.user_id)).all() == [2]
+        assert db.get(ItemFavoriteCount, 10).favorite_count == 1
+
+
+def test_concurrent_submits_are_grouped(session_factory):
+    committer = GroupCommitter(session_factory, max_ops=64, max_delay_ms=20)
+    try:
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            ids = list(pool.map(
+                lambda i: committer.submit(AddFavorite(i, 1, "Bun")).result(), range(1, 201)
+            ))
+    finally:
+        committer.close()
+    assert sorted(ids) == list(range(1, 201))
+    with session_factory() as db:
+        assert db.get(ItemFavoriteCount, 1).favorite_count == 200
+    with pytest.raises(RuntimeError):
+        committer.submit(AddFavorite(1, 2, "Bun"))
+
+
+def test_cancelled_waiter_is_dropped_and_later_writes_commit(session_factory):
+    committer = GroupCommitter(session_factory, max_ops=100, max_delay_ms=200)
+    try:
+        # Cancelled while its batch is still collecting, as asyncio.wrap_future does on disconnect
+        cancelled = committer.submit(AddFavorite(1, 10, "Tart"))
+        assert cancelled.cancel()
+        assert committer.submit(AddFavorite(2, 10, "Tart")).result(timeout=5) == 1
+        assert committer.submit(AddFavorite(3, 10, "Tart")).result(timeout=5) == 2
+    finally:
+        committer.close()
+    with session_factory() as db:
+        assert db.scalars(select(FavoriteModel.user_id).order_by(FavoriteModel.id)).all() == [2, 3]
+        assert db.get(ItemFavoriteCount, 10).favorite_count == 2
+
+
+def test_failing_batch_does_not_stop_the_committer(session_factory):
+    calls = []
+
+    def flaky_factory():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("no connection")
+        return session_factory()
+
+    committer = GroupCommitter(flaky_factory, max_delay_ms=1)
+    try:
+        with pytest.raises(DatabaseError):
+            committer.submit(AddFavorite(1, 10, "Tart")).result(timeout=5)
+        assert committer.submit(AddFavorite(1, 10, "Tart")).result(timeout=5) == 1
+    finally:
+        committer.close()
+
+
+def test_endpoints_in_group_commit_mode(session_factory):
+    committer = GroupCommitter(session_factory, max_delay_ms=1)
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    # test_favorites installs a get_db override for the whole app; put it back afterwards
+    saved = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_group_committer] = lambda: committer
+    try:
+        client = TestClient(app)
+        response = client.post("/favorites/", json={"user_id": 5, "item_id": 50, "item_name": "Scone"})
+        assert response.status_code == 200
+        fav_id = response.json()["id"]
+
+        response = client.post("/favorites/", json={"user_id": 5, "item_id": 50, "item_name": "Scone"})
+        assert response.status_code == 409
+        assert response.json()["error"]["details"]["existing_favorite_id"] == fav_id
+
+        assert client.delete(f"/favorites/{fav_id}?user_id=6").status_code == 401
+        response = client.delete(f"/favorites/{fav_id}?user_id=5")
+        assert response.status_code == 200
+        assert response.json()["deleted_favorite"]["item_name"] == "Scone"
+        assert client.get("/favorites/5").json() == []
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_group_committer, None)
+        if saved is not None:
+            app.dependency_overrides[get_db] = saved
+        committer.close()
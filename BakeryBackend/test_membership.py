@@ -0,0 +1,70 @@
+from BakeryBackend.membership import MembershipIndex
+
+
+def test_lookup_add_remove():
+    index = MembershipIndex()
+    entry = index.load(1, [(30, 3), (10, 1), (20, 2)], index.generation(1))
+    assert list(entry.item_ids) == [10, 20, 30]
+    assert entry.favorite_id(20) == 2
+    assert entry.favorite_id(25) is None
+
+    index.added(1, 25, 4)
+    index.removed(1, 10)
+    entry = index.get(1)
+    assert entry.favorite_id(25) == 4
+    assert entry.favorite_id(10) is None
+
+
+def test_write_during_warm_discards_loaded_entry():
+    index = MembershipIndex()
+    generation = index.generation(1)
+    index.added(1, 10, 1)  # committed while rows were being read
+    assert index.load(1, [], generation).favorite_id(10) is None
+    assert index.get(1) is None
+
+
+def test_lru_eviction_by_users_and_bytes():
+    index = MembershipIndex(max_users=2)
+    for user_id in (1, 2):
+        index.load(user_id, [(1, user_id)], 0)
+    index.get(1)
+    index.load(3, [(1, 3)], 0)
+    assert index.get(2) is None
+    assert index.stats()["evictions"] == 1
+
+    small = MembershipIndex(max_bytes=400)
+    small.load(1, [(i, i) for i in range(1, 10)], 0)
+    small.load(2, [(i, i) for i in range(1, 10)], 0)
+    assert small.stats()["users"] == 1
+    assert small.stats()["bytes"] <= 400
+
+
+def test_ids_beyond_32_bits_are_not_indexed():
+    index = MembershipIndex()
+    assert index.load(1, [(1, 2 ** 40)], 0) is None
+    assert index.get(1) is None
+
+
+def test_writes_swap_in_new_columns():
+    index = MembershipIndex()
+    entry = index.load(1, [(10, 1), (30, 3)], index.generation(1))
+    before = entry.columns
+    index.added(1, 20, 2)
+    index.removed(1, 10)
+    # A reader holding the old pair still sees matching columns
+    assert (list(before[0]), list(before[1])) == ([10, 30], [1, 3])
+    assert (list(entry.item_ids), list(entry.favorite_ids)) == ([20, 30], [2, 3])
+
+
+def test_generations_are_kept_only_while_a_load_is_in_flight():
+    index = MembershipIndex()
+    for user_id in range(1, 1001):
+        index.added(user_id, 1, user_id)
+    assert index._generations == {} and index._loading == {}
+
+    generation = index.generation(1)
+    index.invalidate(1)
+    assert index.load(1, [], generation) is not None and index.get(1) is None
+    generation = index.generation(2)
+    index.abandon(2)
+    assert index._generations == {} and index._loading == {}
@@ -0,0 +1,46 @@
+from fastapi.testclient import TestClient
+from BakeryBackend import main
+from BakeryBackend.metrics import Counter, Histogram, REGISTRY
+
+client = TestClient(main.app)
+
+
+def test_prometheus_rendering():
+    counter = Counter("test_events_total", "Events", ("kind",))
+    histogram = Histogram("test_latency_seconds", "Latency", ("kind",), buckets=(0.1, 1.0))
+    try:
+        counter.inc(kind='a"b')
+        histogram.observe(0.5, kind="x")
+        assert counter.render() == [
+            "# HELP test_events_total Events",
+            "# TYPE test_events_total counter",
+            'test_events_total{kind="a\\"b"} 1',
+        ]
+        assert histogram.render()[2:] == [
+            'test_latency_seconds_bucket{kind="x",le="0.1"} 0',
+            'test_latency_seconds_bucket{kind="x",le="1.0"} 1',
+            'test_latency_seconds_bucket{kind="x",le="+Inf"} 1',
+            'test_latency_seconds_sum{kind="x"} 0.5',
+            'test_latency_seconds_count{kind="x"} 1',
+        ]
+    finally:
+        REGISTRY.remove(counter)
+        REGISTRY.remove(histogram)
+
+
+def test_metrics_endpoint_reports_route_templates():
+    client.get("/favorites/user/1/item/-5")
+    body = client.get("/metrics").text
+    assert 'bakery_http_requests_total{route="/favorites/user/{user_id}/item/{item_id}",method="GET",status="400"}' in body
+    assert "bakery_http_requests_in_flight" in body
+    assert "bakery_db_pool_checkout_wait_seconds_count" in body
+
+
+def test_health_reports_unavailable_database(monkeypatch):
+    async def failing_ping(timeout):
+        return False
+
+    monkeypatch.setattr(main.app.state.database, "ping", failing_ping)
+    response = client.get("/health")
+    assert response.status_code == 503
+    assert response.json()["database"] == "unavailable"
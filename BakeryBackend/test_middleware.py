@@ -0,0 +1,42 @@
+import logging
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from BakeryBackend.middleware import RequestMiddleware
+
+
+def build_app(**middleware_options) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(RequestMiddleware, **middleware_options)
+
+    @app.get("/state")
+    def state(request: Request):
+        return {"request_id": request.state.request_id}
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter([b"a", b"b", b"c"]))
+
+    return app
+
+
+def test_request_id_header_and_state():
+    client = TestClient(build_app())
+    response = client.get("/state")
+    assert response.headers["X-Request-ID"] == response.json()["request_id"]
+
+    response = client.get("/stream")
+    assert response.text == "abc"
+    assert response.headers["X-Request-ID"]
+
+
+def test_log_sampling(caplog):
+    with caplog.at_level(logging.INFO, logger="BakeryBackend.middleware"):
+        TestClient(build_app(log_sample_rate=0.0)).get("/state?x=1")
+        assert not caplog.records
+
+        TestClient(build_app()).get("/state?x=1")
+    messages = [record.getMessage() for record in caplog.records]
+    assert "URL: http://testserver/state?x=1" in messages[0]
+    assert "Status: 200" in messages[1]
@@ -0,0 +1,139 @@
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from BakeryBackend.main import app, setup_database
+from BakeryBackend.database import get_db, get_replica_db
+from BakeryBackend.models import Favorite as FavoriteModel
+from BakeryBackend.replica import LAST_WRITE_HEADER, RecentWrites, SQLiteReplicator
+
+
+def session_dependency(engine):
+    SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    def dependency():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+    return dependency
+
+
+def worker_writes(now) -> RecentWrites:
+    """A worker process's write tracker, on the test's clock"""
+    return RecentWrites(window_seconds=2.0, clock=lambda: now[0], wall_clock=lambda: now[0])
+
+
+@pytest.fixture
+def replicated(tmp_path):
+    primary_path, replica_path = str(tmp_path / "primary.db"), str(tmp_path / "replica.db")
+    engines = [
+        create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+        for path in (primary_path, replica_path)
+    ]
+    for engine in engines:
+        setup_database(engine)
+    now = [0.0]
+    # test_favorites installs a get_db override for the whole app; put it back afterwards
+    saved = app.dependency_overrides.get(get_db), app.state.recent_writes
+    app.dependency_overrides[get_db] = session_dependency(engines[0])
+    app.dependency_overrides[get_replica_db] = session_dependency(engines[1])
+    app.state.recent_writes = worker_writes(now)
+    try:
+        yield TestClient(app), engines[0], SQLiteReplicator(primary_path, replica_path), now
+    finally:
+        for dependency in (get_db, get_replica_db):
+            app.dependency_overrides.pop(dependency, None)
+        if saved[0] is not None:
+            app.dependency_overrides[get_db] = saved[0]
+        app.state.recent_writes = saved[1]
+        for engine in engines:
+            engine.dispose()
+
+
+def test_reads_use_replica_except_after_own_writes(replicated):
+    client, primary, replicator, now = replicated
+
+    # The writer's own reads are pinned to the primary while the replica lags
+    fav_id = client.post("/favorites/", json={"user_id": 1, "item_id": 7, "item_name": "Eclair"}).json()["id"]
+    assert [f["id"] for f in client.get("/favorites/1").json()] == [fav_id]
+    assert client.get("/favorites/user/1/item/7").json()["is_favorited"] is True
+    assert [f["user_id"] for f in client.get("/favorites/item/7/users").json()] == [1]
+
+    # A write this process did not make is only visible to other clients once replicated
+    other = TestClient(app)
+    with primary.begin() as conn:
+        conn.execute(insert(FavoriteModel), [{"user_id": 2, "item_id": 8, "item_name": "Scone"}])
+    assert other.get("/favorites/2").json() == []
+    replicator.sync()
+    assert [f["item_id"] for f in other.get("/favorites/2").json()] == [8]
+
+    # Past the lag window user 1 reads from the replica again
+    now[0] = 5.0
+    with primary.begin() as conn:
+        conn.execute(insert(FavoriteModel), [{"user_id": 1, "item_id": 9, "item_name": "Bun"}])
+    assert [f["item_id"] for f in client.get("/favorites/1").json()] == [7]
+
+
+def test_client_carries_its_pin_to_other_workers(replicated):
+    client, primary, replicator, now = replicated
+    response = client.post("/favorites/", json={"user_id": 1, "item_id": 7, "item_name": "Eclair"})
+    stamp = response.headers[LAST_WRITE_HEADER]
+
+    # The next read lands on a worker that did not see the write: the cookie pins it
+    app.state.recent_writes = worker_writes(now)
+    assert [f["item_id"] for f in client.get("/favorites/1").json()] == [7]
+    exported = client.get("/favorites/export", params={"user_id": 1}).text.splitlines()
+    assert [json.loads(line)["item_id"] for line in exported] == [7]
+
+    # Without the cookie, the header does the same; with neither, reads use the replica
+    client.cookies.clear()
+    assert client.get("/favorites/1", headers={LAST_WRITE_HEADER: stamp}).json() != []
+    assert client.get("/favorites/1").json() == []
+
+    # The worker that wrote pins reads of the user, including by query parameter
+    now[0] = 1.0
+    client.post("/favorites/", json={"user_id": 1, "item_id": 8, "item_name": "Scone"})
+    client.cookies.clear()
+    exported = client.get("/favorites/export", params={"user_id": 1}).text.splitlines()
+    assert [json.loads(line)["item_id"] for line in exported] == [7, 8]
+
+    now[0] = 5.0
+    assert client.get("/favorites/export", params={"user_id": 1}).text == ""
+
+
+def test_replicator_applies_writes_after_delay(replicated):
+    client, primary, replicator, now = replicated
+    replicator.delay_seconds = 0.05
+    with primary.begin() as conn:
+        conn.execute(insert(FavoriteModel), [{"user_id": 3, "item_id": 4, "item_name": "Strudel"}])
+    assert client.get("/favorites/3").json() == []
+
+    replicator.start()
+    try:
+        deadline = time.monotonic() + 5
+        while not client.get("/favorites/3").json():
+            assert time.monotonic() < deadline, "write never reached the replica"
+            time.sleep(0.02)
+    finally:
+        replicator.stop()
+
+
+def test_recent_writes_expire():
+    now = [0.0]
+    writes = RecentWrites(window_seconds=1.0, clock=lambda: now[0])
+    writes.mark(user_ids=[1], item_ids=[10])
+    assert writes.pinned_request({"user_id": "1"})
+    assert writes.pinned_request({"item_id": "10", "user_id": "2"})
+    assert writes.pinned_request({"user_id": "1", "format": "ndjson"})
+    assert not writes.pinned_request({"user_id": "2"})
+
+    now[0] = 1.5
+    assert not writes.pinned_request({"user_id": "1"})
+    writes.mark(user_ids=[2])
+    assert len(writes) == 1
@@ -0,0 +1,147 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, inspect, text
+
+from BakeryBackend.config import Settings
+from BakeryBackend.main import create_app, setup_database
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_env(**overrides):
+    env = dict(os.environ, PYTHONPATH=ROOT, BAKERY_REQUEST_LOG_SAMPLE_RATE="0")
+    env.update(overrides)
+    return env
+
+
+def test_import_does_not_touch_database(tmp_path):
+    missing = tmp_path / "no-such-dir" / "favorites.db"
+    subprocess.run(
+        [sys.executable, "-c", "import BakeryBackend.main"],
+        env=run_env(BAKERY_DATABASE_URL=f"sqlite:///{missing}"),
+        check=True
+    )
+    assert not missing.parent.exists()
+
+
+def test_create_app_and_setup_database(tmp_path):
+    app = create_app(Settings(db_create_schema=False))
+    with TestClient(app) as client:
+        assert client.get("/").status_code == 200
+    assert app.state.settings.db_create_schema is False
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    setup_database(engine)
+    assert {"favorites", "item_favorite_counts"} <= set(inspect(engine).get_table_names())
+
+
+def test_apps_use_the_database_and_resources_of_their_settings(tmp_path):
+    urls = [f"sqlite:///{tmp_path / name}" for name in ("a.db", "b.db")]
+    apps = [
+        create_app(Settings(database_url=urls[0], group_commit=True, page_default_limit=1)),
+        create_app(Settings(database_url=urls[1], fast_json_lists=True))
+    ]
+    assert apps[0].state.favorites_cache is not apps[1].state.favorites_cache
+    for round_ in range(2):
+        # Started twice: the group committer closed by the first shutdown is replaced
+        for app in apps:
+            with TestClient(app) as client:
+                response = client.post("/favorites/", json={"user_id": 1, "item_id": 10 + round_, "item_name": "Bun"})
+                assert response.status_code == 200
+    assert apps[0].state.group_committer is not None
+
+    with TestClient(apps[0]) as client:
+        page = client.get("/favorites/1")
+        assert [f["item_id"] for f in page.json()] == [10] and page.headers["X-Next-Cursor"]
+    for url in urls:
+        engine = create_engine(url)
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT item_id FROM favorites ORDER BY id")).scalars().all() == [10, 11]
+        engine.dispose()
+    for app in apps:
+        app.state.database.dispose()
+
+
+def test_setup_database_removes_legacy_duplicates(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        # The favorites table as created before the unique (user_id, item_id) index
+        conn.execute(text(
+            "CREATE TABLE favorites (id INTEGER PRIMARY KEY, user_id INTEGER, item_id INTEGER, item_name VARCHAR NOT NULL)"
+        ))
+        conn.execute(text("INSERT INTO favorites (user_id, item_id, item_name) VALUES (:u, :i, 'Cake')"), [
+            {"u": 1, "i": 7}, {"u": 1, "i": 7}, {"u": 2, "i": 7}, {"u": 1, "i": 7}, {"u": 2, "i": 8}
+        ])
+        # Counters from an earlier start that failed on the unique index
+        conn.execute(text("CREATE TABLE item_favorite_counts (item_id INTEGER PRIMARY KEY, favorite_count INTEGER NOT NULL)"))
+        conn.execute(text("INSERT INTO item_favorite_counts VALUES (7, 4), (8, 1)"))
+
+    setup_database(engine)
+    setup_database(engine)  # a second start finds nothing to do
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT id, user_id, item_id FROM favorites ORDER BY id")).all() == [
+            (1, 1, 7), (3, 2, 7), (5, 2, 8)
+        ]
+        assert dict(conn.execute(text("SELECT item_id, favorite_count FROM item_favorite_counts")).all()) == {7: 2, 8: 1}
+        assert set(conn.execute(text("SELECT scope, owner_id, version FROM favorite_list_versions")).all()) == {
+            ("user", 1, 1), ("item", 7, 1)
+        }
+    assert "uq_favorites_user_item" in {index["name"] for index in inspect(engine).get_indexes("favorites")}
+    engine.dispose()
+
+
+def child_pids(pid: int):
+    with open(f"/proc/{pid}/task/{pid}/children") as children:
+        return set(children.read().split())
+
+
+def wait_for_health(port: int, timeout: float = 20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1) as conn:
+                conn.sendall(b"GET /health HTTP/1.0\r\n\r\n")
+                if conn.recv(64).startswith(b"HTTP/1.1 200"):
+                    return
+        except OSError:
+            pass
+        time.sleep(0.1)
+    raise AssertionError("server did not become healthy")
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/task"), reason="needs Linux /proc")
+def test_serve_restarts_and_stops_workers(tmp_path):
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+
+    master = subprocess.Popen(
+        [sys.executable, "-m", "BakeryBackend", "serve", "--port", str(port), "--workers", "2"],
+        env=run_env(BAKERY_DATABASE_URL=f"sqlite:///{tmp_path / 'serve.db'}"),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_for_health(port)
+        first = child_pids(master.pid)
+        assert len(first) == 2
+
+        master.send_signal(signal.SIGHUP)
+        deadline = time.monotonic() + 20
+        while child_pids(master.pid) & first or len(child_pids(master.pid)) != 2:
+            assert time.monotonic() < deadline, "workers were not replaced"
+            time.sleep(0.1)
+        wait_for_health(port)
+
+        master.send_signal(signal.SIGTERM)
+        assert master.wait(timeout=30) == 0
+    finally:
+        if master.poll() is None:
+            master.kill()
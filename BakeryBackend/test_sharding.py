@@ -0,0 +1,182 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, select
+
+from BakeryBackend.database import get_db, get_shards
+from BakeryBackend.main import app, setup_database
+from BakeryBackend.models import Favorite as FavoriteModel, ItemFavoriteCount
+from BakeryBackend.sharding import (
+    SHARD_ID_BITS, ShardSet, create_shard_schema, rebalance, shard_first_id, shard_for
+)
+
+
+def make_shards(tmp_path, name: str, count: int) -> ShardSet:
+    engines = [
+        create_engine(f"sqlite:///{tmp_path / f'{name}{shard}.db'}", connect_args={"check_same_thread": False})
+        for shard in range(count)
+    ]
+    for shard, engine in enumerate(engines):
+        create_shard_schema(engine, shard_first_id(shard))
+        setup_database(engine)
+    return ShardSet(engines)
+
+
+def stored(shards: ShardSet):
+    """(id, user_id, item_id) rows of every shard, per shard"""
+    query = select(FavoriteModel.id, FavoriteModel.user_id, FavoriteModel.item_id)
+    return shards.scatter(lambda session, _: session.execute(query).all())
+
+
+@pytest.fixture
+def sharded_client(tmp_path):
+    shards = make_shards(tmp_path, "shard", 3)
+    # test_favorites installs a get_db override for the whole app; use the real, shard-aware one
+    saved = app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides[get_shards] = lambda: shards
+    try:
+        yield TestClient(app), shards
+    finally:
+        app.dependency_overrides.pop(get_shards, None)
+        if saved is not None:
+            app.dependency_overrides[get_db] = saved
+        shards.dispose()
+
+
+def test_shard_for_is_stable_balanced_and_moves_little():
+    # Pinned: changing the hash would strand every stored favorite
+    assert [shard_for(user_id, 4) for user_id in range(1, 9)] == [3, 0, 1, 3, 3, 0, 1, 0]
+    assert [shard_for(user_id, 8) for user_id in (1, 42, 10**6, 2**40)] == [3, 0, 3, 5]
+    assert all(shard_for(user_id, 1) == 0 for user_id in range(1, 100))
+
+    before = [shard_for(user_id, 4) for user_id in range(1, 20001)]
+    assert min(before.count(shard) for shard in range(4)) > 4500
+    after = [shard_for(user_id, 5) for user_id in range(1, 20001)]
+    moved = [(old, new) for old, new in zip(before, after) if old != new]
+    # Growing 4 -> 5 moves about a fifth of the users, all of them to the new shard
+    assert 0.17 < len(moved) / len(before) < 0.23
+    assert {new for _, new in moved} == {4}
+
+
+def test_sharded_writes_and_scatter_gather_reads(sharded_client):
+    client, shards = sharded_client
+    for user_id in range(1, 7):
+        response = client.post("/favorites/", json={"user_id": user_id, "item_id": 5, "item_name": "Eclair"})
+        assert response.status_code == 200
+    response = client.post("/favorites/bulk", json={"favorites": [
+        {"user_id": user_id, "item_id": 5, "item_name": "Eclair"} for user_id in range(7, 13)
+    ] + [{"user_id": 1, "item_id": 6, "item_name": "Flan"}]})
+    assert response.json()["created"] == 7
+
+    # Each favorite is on its user's shard, with an ID from that shard's block
+    per_shard = stored(shards)
+    for shard, rows in enumerate(per_shard):
+        assert rows and all(shard_for(user_id, 3) == shard for _, user_id, _ in rows)
+        assert all(id_ >> SHARD_ID_BITS == shard for id_, _, _ in rows)
+    assert sum(len(rows) for rows in per_shard) == 13
+
+    # The item listing pages through all shards in ID order
+    users, cursor, ids = [], None, []
+    while True:
+        page = client.get("/favorites/item/5/users", params={"limit": 5, **({"cursor": cursor} if cursor else {})})
+        users += [f["user_id"] for f in page.json()]
+        ids += [f["id"] for f in page.json()]
+        cursor = page.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert sorted(users) == list(range(1, 13)) and ids == sorted(ids)
+
+    etag = client.get("/favorites/item/5/users").headers["ETag"]
+    assert client.get("/favorites/item/5/users", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/favorites/item/5/count").json()["favorite_count"] == 12
+    assert client.get("/favorites/popular", params={"limit": 2}).json() == [
+        {"item_id": 5, "favorite_count": 12}, {"item_id": 6, "favorite_count": 1}
+    ]
+    exported = [json.loads(line)["id"] for line in client.get("/favorites/export").text.splitlines()]
+    assert exported == sorted(exported) and len(exported) == 13
+
+    # User-scoped routes go to the user's shard
+    favorite_id = next(f["id"] for f in client.get("/favorites/7").json())
+    assert client.delete(f"/favorites/{favorite_id}?user_id=7").status_code == 200
+    assert client.get("/favorites/7").json() == []
+    assert client.get("/favorites/item/5/users", headers={"If-None-Match": etag}).status_code == 200
+    assert client.get("/favorites/item/5/count").json()["favorite_count"] == 11
+    assert client.get("/favorites/user/1/item/6").json()["is_favorited"]
+
+
+def test_deleting_another_users_favorite_on_another_shard_is_unauthorized(sharded_client):
+    client, shards = sharded_client
+    # Users 1, 3 and 4 hash to shards 0, 1 and 2 of 3
+    assert [shard_for(user_id, 3) for user_id in (1, 3, 4)] == [0, 1, 2]
+    ids = {}
+    for user_id in (1, 3, 4):
+        response = client.post("/favorites/", json={"user_id": user_id, "item_id": 9, "item_name": "Scone"})
+        ids[user_id] = response.json()["id"]
+
+    # User 1's shard does not hold the others' favorites, but they still exist
+    for user_id in (3, 4):
+        response = client.delete(f"/favorites/{ids[user_id]}?user_id=1")
+        assert response.status_code == 401
+        assert response.json()["error"]["details"]["favorite_belongs_to_user"] == user_id
+    missing_id = (2 << SHARD_ID_BITS) + 100
+    assert client.delete(f"/favorites/{missing_id}?user_id=1").status_code == 404
+
+    response = client.post("/favorites/user/1/delete", json={"favorite_ids": [ids[1], ids[3], ids[4], missing_id]})
+    body = response.json()
+    assert body["deleted_favorite_ids"] == [ids[1]]
+    assert body["not_owned_favorite_ids"] == [ids[3], ids[4]]
+    assert body["not_found_favorite_ids"] == [missing_id]
+    assert sum(len(rows) for rows in stored(shards)) == 2
+
+
+def test_deleting_own_favorite_left_on_another_shard(sharded_client):
+    client, shards = sharded_client
+    # User 1 hashes to shard 0, but a rebalance in progress left one of its favorites on shard 1
+    assert shard_for(1, 3) == 0
+    with shards.session(1) as session:
+        session.add(FavoriteModel(id=(1 << SHARD_ID_BITS) + 50, user_id=1, item_id=9, item_name="Scone"))
+        session.add(ItemFavoriteCount(item_id=9, favorite_count=1))
+        session.commit()
+
+    response = client.delete(f"/favorites/{(1 << SHARD_ID_BITS) + 50}?user_id=1")
+    assert response.status_code == 200
+    assert response.json()["deleted_favorite"]["item_name"] == "Scone"
+    assert stored(shards) == [[], [], []]
+    with shards.session(1) as session:
+        assert session.get(ItemFavoriteCount, 9).favorite_count == 0
+
+
+def test_rebalance_copies_into_a_new_layout(sharded_client, tmp_path):
+    client, shards = sharded_client
+    client.post("/favorites/bulk", json={"favorites": [
+        {"user_id": user_id, "item_id": item_id, "item_name": "Tart"}
+        for user_id in range(1, 41) for item_id in (1, 2)
+    ]})
+    old_ids = sorted(id_ for rows in stored(shards) for id_, _, _ in rows)
+    version = client.get("/favorites/item/1/users").headers["ETag"].split("-")[2]
+
+    targets = [create_engine(f"sqlite:///{tmp_path / f'new{shard}.db'}") for shard in range(2)]
+    result = rebalance(shards.engines, targets, setup_database)
+    assert result["favorites"] == 80 and sum(result["per_shard"]) == 80
+    assert set(result) == {"favorites", "per_shard", "first_ids"}
+    with pytest.raises(ValueError):
+        rebalance(shards.engines, targets, setup_database)  # targets must be empty
+
+    new_shards = ShardSet(targets)
+    try:
+        rows = stored(new_shards)
+        assert sorted(id_ for shard_rows in rows for id_, _, _ in shard_rows) == old_ids
+        assert [len(shard_rows) for shard_rows in rows] == result["per_shard"]
+        for shard, shard_rows in enumerate(rows):
+            assert all(shard_for(user_id, 2) == shard for _, user_id, _ in shard_rows)
+            with new_shards.session(shard) as session:
+                assert session.scalar(select(func.sum(ItemFavoriteCount.favorite_count))) == len(shard_rows)
+
+        app.dependency_overrides[get_shards] = lambda: new_shards
+        assert client.get("/favorites/item/1/count").json()["favorite_count"] == 40
+        assert client.get("/favorites/item/1/users").headers["ETag"].split("-")[2] == version
+        new_id = client.post("/favorites/", json={"user_id": 3, "item_id": 9, "item_name": "Pie"}).json()["id"]
+        assert new_id > max(old_ids)
+    finally:
+        new_shards.dispose()
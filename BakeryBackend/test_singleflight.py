@@ -0,0 +1,80 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from BakeryBackend.metrics import single_flight_requests
+from BakeryBackend.singleflight import SingleFlight
+
+KEY = ("item", 1, 100, 0)
+
+
+def test_concurrent_callers_share_one_call():
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def load():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return ["row"]
+
+    followers_before = single_flight_requests.value(role="follower")
+    with ThreadPoolExecutor(10) as pool:
+        leader = pool.submit(flights.do, KEY, load)
+        started.wait(5)
+        followers = [pool.submit(flights.do, KEY, load) for _ in range(7)]
+        time.sleep(0.2)  # let them reach the wait
+        assert pool.submit(flights.do, ("item", 2, 100, 0), lambda: "other").result() == "other"
+        assert flights.stats()["in_flight"] == 1
+        release.set()
+        results = [leader.result()] + [f.result() for f in followers]
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert single_flight_requests.value(role="follower") == followers_before + 7
+    assert flights.stats() == {"in_flight": 0, "windowed": 0}
+
+
+def test_errors_are_shared_but_not_kept():
+    now = [0.0]
+    flights = SingleFlight(window_seconds=1.0, clock=lambda: now[0])
+
+    def fail():
+        raise RuntimeError("database is locked")
+
+    with pytest.raises(RuntimeError):
+        flights.do(KEY, fail)
+    assert flights.do(KEY, lambda: "ok") == "ok"
+    assert flights.do(KEY, lambda: "newer") == "ok"  # within the window
+    now[0] = 1.0
+    assert flights.do(KEY, lambda: "newer") == "newer"
+
+    flights.forget(item_ids=(1,))
+    assert flights.do(KEY, lambda: "after write") == "after write"
+
+
+def test_cancelled_leader_hands_over_to_a_waiter():
+    async def scenario():
+        flights = SingleFlight()
+        started = asyncio.Event()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            started.set()
+            await asyncio.sleep(0.05 if len(calls) > 1 else 10)
+            return len(calls)
+
+        leader = asyncio.create_task(flights.do_async(KEY, load))
+        await started.wait()
+        follower = asyncio.create_task(flights.do_async(KEY, load))
+        await asyncio.sleep(0)
+        leader.cancel()  # e.g. its client disconnected
+        assert await follower == 2
+        assert leader.cancelled()
+
+    asyncio.run(scenario())
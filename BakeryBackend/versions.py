@@ -0,0 +1,87 @@
+"""
+Version counters and ETags for the favorites listings.
+
+Every write to a user's favorites bumps that user's version and the
+version of each item it touched, in the same transaction as the write.
+A listing's ETag is derived from its version and page parameters, so a
+conditional GET is answered with one primary-key lookup: if the client's
+ETag still matches, the endpoint returns 304 without loading any rows.
+
+The version is read before the rows. A write landing in between can only
+make the ETag older than the body, which costs the client one extra full
+response later but can never produce a wrong 304.
+"""
+
+from typing import Dict, Iterable, Optional
+
+from fastapi import Response
+from sqlalchemy import select
+
+from BakeryBackend.config import Settings
+from BakeryBackend.models import FavoriteListVersion
+from BakeryBackend.popularity import UPSERT_INSERTS
+
+USER_SCOPE = "user"
+ITEM_SCOPE = "item"
+
+
+def bump_versions_statement(dialect_name: str):
+    """INSERT ... ON CONFLICT DO UPDATE adding one to each (scope, owner_id) version"""
+    if dialect_name not in UPSERT_INSERTS:
+        raise NotImplementedError(f"List versions do not support the '{dialect_name}' dialect")
+    stmt = UPSERT_INSERTS[dialect_name](FavoriteListVersion)
+    return stmt.on_conflict_do_update(
+        index_elements=[FavoriteListVersion.scope, FavoriteListVersion.owner_id],
+        set_={"version": FavoriteListVersion.version + 1}
+    )
+
+
+def bump_params(user_ids: Iterable[int] = (), item_ids: Iterable[int] = ()) -> list:
+    params = [{"scope": USER_SCOPE, "owner_id": user_id, "version": 1} for user_id in set(user_ids)]
+    params.extend({"scope": ITEM_SCOPE, "owner_id": item_id, "version": 1} for item_id in set(item_ids))
+    return params
+
+
+def bump_versions(db, user_ids: Iterable[int] = (), item_ids: Iterable[int] = ()):
+    """Bump the listing versions of these users and items inside db's transaction"""
+    params = bump_params(user_ids, item_ids)
+    if params:
+        db.execute(bump_versions_statement(db.get_bind().dialect.name), params)
+
+
+def version_query(scope: str, owner_id: int):
+    return select(FavoriteListVersion.version).where(
+        FavoriteListVersion.scope == scope,
+        FavoriteListVersion.owner_id == owner_id
+    )
+
+
+def list_version(db, scope: str, owner_id: int) -> int:
+    """Current version of a listing; 0 until its first write"""
+    return db.scalar(version_query(scope, owner_id)) or 0
+
+
+def list_etag(scope: str, owner_id: int, version: int, limit: int, after_id: int) -> str:
+    """Strong ETag for one page of a listing"""
+    return f'"{scope}-{owner_id}-{version}-{limit}-{after_id}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match comparison (weak, as RFC 9110 requires for this header)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def cache_headers(etag: str, settings: Settings) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": settings.list_cache_control}
+
+
+def not_modified(etag: str, settings: Settings) -> Response:
+    """304 for a conditional GET whose ETag still matches; no rows are loaded or encoded"""
+    return Response(status_code=304, headers=cache_headers(etag, settings))
@@ -0,0 +1,101 @@
+"""
+Shared helpers for the BakeryBackend benchmarks
+"""
+
+import dataclasses
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Iterable
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from BakeryBackend.config import Settings, get_settings
+from BakeryBackend.main import create_app, setup_storage
+from BakeryBackend.models import Favorite as FavoriteModel
+
+# Rows per INSERT when seeding
+SEED_BATCH_SIZE = 10000
+
+
+def bench_settings(directory: str, **overrides) -> Settings:
+    """
+    The environment's settings with the database (and any shard files) in
+    directory, request logging off and schema setup left to temp_app
+    """
+    return dataclasses.replace(
+        get_settings(),
+        database_url=f"sqlite:///{os.path.join(directory, 'bench.db')}",
+        async_database_url=None,
+        db_shard_url_template=f"sqlite:///{os.path.join(directory, 'shard{shard}.db')}",
+        db_create_schema=False,
+        request_log_sample_rate=0.0,
+        **overrides
+    )
+
+
+@contextmanager
+def temp_app(favorites: Iterable[dict] = (), **overrides):
+    """
+    Yield create_app(bench_settings(...)) on fresh SQLite files in a temporary
+    directory. The schema is set up after seeding favorites (dicts of user_id,
+    item_id, item_name) into the unsharded database, so that the counters are
+    backfilled from them
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(bench_settings(tmp, **overrides))
+        database = app.state.database
+        rows = list(favorites)
+        if rows:
+            FavoriteModel.__table__.create(bind=database.engine)
+            with database.engine.begin() as conn:
+                for start in range(0, len(rows), SEED_BATCH_SIZE):
+                    conn.execute(insert(FavoriteModel), rows[start:start + SEED_BATCH_SIZE])
+        setup_storage(database)
+        try:
+            yield app
+        finally:
+            if app.state.group_committer is not None:
+                app.state.group_committer.close()
+            database.dispose()
+
+
+@contextmanager
+def temp_database_client(**overrides):
+    """Yield a TestClient for temp_app(**overrides)"""
+    with temp_app(**overrides) as app:
+        with TestClient(app) as client:
+            yield client
+
+
+@contextmanager
+def timer():
+    """Measure wall-clock time; the elapsed seconds are in result["seconds"]"""
+    result = {}
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result["seconds"] = time.perf_counter() - start
+
+
+def percentile(samples, pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def latency_summary(latencies, seconds: float) -> dict:
+    """Throughput and tail latency (in ms) for one load run"""
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / seconds if seconds else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
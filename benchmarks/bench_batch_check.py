@@ -0,0 +1,45 @@
+"""
+Compare N single GET /favorites/user/{user_id}/item/{item_id} calls with one
+POST /favorites/user/{user_id}/check for a product grid of N items.
+
+    python -m benchmarks.bench_batch_check --grid 48 --rounds 50
+"""
+
+import argparse
+import logging
+
+from benchmarks._harness import temp_database_client, timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--grid", type=int, default=48, help="items rendered per page")
+    parser.add_argument("--rounds", type=int, default=50, help="page renders to time")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    item_ids = list(range(1, args.grid + 1))
+    with temp_database_client() as client:
+        # Half the grid is favorited
+        client.post("/favorites/bulk", json={"favorites": [
+            {"user_id": 1, "item_id": i, "item_name": f"Item {i}"} for i in item_ids[::2]
+        ]})
+
+        with timer() as single:
+            for _ in range(args.rounds):
+                for item_id in item_ids:
+                    assert client.get(f"/favorites/user/1/item/{item_id}").status_code == 200
+        with timer() as batched:
+            for _ in range(args.rounds):
+                response = client.post("/favorites/user/1/check", json={"item_ids": item_ids})
+                assert response.status_code == 200
+
+    single_ms = single["seconds"] / args.rounds * 1000
+    batched_ms = batched["seconds"] / args.rounds * 1000
+    print(f"{args.grid} single checks : {single_ms:8.2f} ms per grid")
+    print(f"1 batched check   : {batched_ms:8.2f} ms per grid")
+    print(f"speedup           : {single_ms / batched_ms:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Compare per-row POST /favorites/ against POST /favorites/bulk.
+
+    python -m benchmarks.bench_bulk_insert --rows 2000
+"""
+
+import argparse
+import logging
+
+from benchmarks._harness import temp_database_client, timer
+
+
+def make_payload(rows: int):
+    return [
+        {"user_id": 1 + i // 100, "item_id": 1 + i % 100, "item_name": f"Item {i}"}
+        for i in range(rows)
+    ]
+
+
+def bench_per_row(rows: int) -> float:
+    payload = make_payload(rows)
+    with temp_database_client() as client, timer() as t:
+        for item in payload:
+            assert client.post("/favorites/", json=item).status_code == 200
+    return rows / t["seconds"]
+
+
+def bench_bulk(rows: int) -> float:
+    payload = make_payload(rows)
+    with temp_database_client() as client, timer() as t:
+        response = client.post("/favorites/bulk", json={"favorites": payload})
+        assert response.status_code == 200
+        assert response.json()["created"] == rows
+    return rows / t["seconds"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    # Request logging would dominate the per-row numbers
+    logging.disable(logging.INFO)
+
+    per_row = bench_per_row(args.rows)
+    bulk = bench_bulk(args.rows)
+    print(f"per-row POST /favorites/     : {per_row:10.0f} rows/sec")
+    print(f"bulk    POST /favorites/bulk : {bulk:10.0f} rows/sec")
+    print(f"speedup                      : {bulk / per_row:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Cold-start cost of the app: importing BakeryBackend.main, running schema
+setup against a fresh and an already-populated database, and the time from
+launching `python -m BakeryBackend serve` to the first healthy response.
+
+Before the app factory every worker paid import + schema setup on boot; now
+schema setup runs once in the master and workers are forked from it.
+
+    python -m benchmarks.bench_cold_start --runs 5 --rows 100000 --workers 2
+"""
+
+import argparse
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import BakeryBackend.main; "
+    "print(time.perf_counter() - start)"
+)
+SETUP_SNIPPET = (
+    "import time; from BakeryBackend.main import setup_database; "
+    "from BakeryBackend.database import engine; start = time.perf_counter(); "
+    "setup_database(engine); print(time.perf_counter() - start)"
+)
+
+
+def run_env(db_url: str):
+    return dict(os.environ, PYTHONPATH=ROOT, BAKERY_DATABASE_URL=db_url, BAKERY_REQUEST_LOG_SAMPLE_RATE="0")
+
+
+def timed_snippet(snippet: str, db_url: str) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", snippet], env=run_env(db_url), check=True, capture_output=True, text=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def seed(db_url: str, rows: int):
+    from BakeryBackend.main import setup_database
+    from BakeryBackend.models import Favorite as FavoriteModel
+
+    engine = create_engine(db_url)
+    setup_database(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(FavoriteModel), [
+            {"user_id": i // 50 + 1, "item_id": i % 50 + 1, "item_name": f"Item {i}"} for i in range(rows)
+        ])
+    engine.dispose()
+
+
+def time_to_healthy(db_url: str, workers: int) -> float:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+
+    start = time.perf_counter()
+    master = subprocess.Popen(
+        [sys.executable, "-m", "BakeryBackend", "serve", "--port", str(port), "--workers", str(workers)],
+        env=run_env(db_url), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while True:
+            try:
+                with socket.create_connection(("127.0.0.1", port), timeout=1) as conn:
+                    conn.sendall(b"GET /health HTTP/1.0\r\n\r\n")
+                    if conn.recv(64).startswith(b"HTTP/1.1 200"):
+                        return time.perf_counter() - start
+            except OSError:
+                pass
+            if master.poll() is not None:
+                raise RuntimeError("serve exited before becoming healthy")
+            time.sleep(0.01)
+    finally:
+        master.send_signal(signal.SIGTERM)
+        master.wait(timeout=30)
+
+
+def report(label: str, samples):
+    print(f"{label:<34}: median {statistics.median(samples) * 1000:8.1f} ms  (min {min(samples) * 1000:.1f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--rows", type=int, default=100000, help="favorites in the populated database")
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fresh = [f"sqlite:///{os.path.join(tmp, f'fresh{i}.db')}" for i in range(args.runs)]
+        populated = f"sqlite:///{os.path.join(tmp, 'populated.db')}"
+        seed(populated, args.rows)
+
+        imports = [timed_snippet(IMPORT_SNIPPET, populated) for _ in range(args.runs)]
+        report("import BakeryBackend.main", imports)
+        report("schema setup, fresh database", [timed_snippet(SETUP_SNIPPET, url) for url in fresh])
+        setups = [timed_snippet(SETUP_SNIPPET, populated) for _ in range(args.runs)]
+        report(f"schema setup, {args.rows} rows", setups)
+        report(
+            f"serve --workers {args.workers} to first 200",
+            [time_to_healthy(populated, args.workers) for _ in range(args.runs)]
+        )
+        per_worker = (statistics.median(imports) + statistics.median(setups)) * 1000
+        print(f"previously paid by every worker   : ~{per_worker:.1f} ms (import + schema setup)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Bytes on the wire and CPU per request for GET /favorites/{user_id} in each
+available encoding, with and without the compressed body cache.
+
+The app is driven in-process over the ASGI transport; CPU is process time
+(all threads) per request, so it includes routing, the query and encoding
+as well as compression. br and zstd rows only appear when the brotli /
+zstandard packages are installed.
+
+    python -m benchmarks.bench_compression --favorites 1000 --rounds 300
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+try:
+    import httpx2 as httpx
+except ModuleNotFoundError:
+    import httpx
+from fastapi import FastAPI
+
+from BakeryBackend.compression import DEFAULT_LEVELS, ENCODINGS, available_encodings
+from benchmarks._harness import temp_app
+
+# The setting holding each encoding's level
+LEVEL_SETTINGS = {
+    "gzip": "compression_gzip_level",
+    "br": "compression_brotli_quality",
+    "zstd": "compression_zstd_level"
+}
+
+
+def compression_settings(encoding: str, level: int, cached: bool) -> dict:
+    return {
+        "compression_encodings": encoding,
+        LEVEL_SETTINGS[encoding]: level,
+        "compression_cache_entries": 1024 if cached else 0
+    }
+
+
+async def measure(app: FastAPI, path: str, accept_encoding: str, rounds: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        headers = {"Accept-Encoding": accept_encoding}
+        response = await client.get(path, headers=headers)
+        assert response.status_code == 200, response.text
+        wire_bytes = int(response.headers["Content-Length"])
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        for _ in range(rounds):
+            await client.get(path, headers=headers)
+        cpu = time.process_time() - cpu_start
+        wall = time.perf_counter() - wall_start
+    return {"bytes": wire_bytes, "cpu_ms": cpu / rounds * 1000, "wall_ms": wall / rounds * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--favorites", type=int, default=1000, help="favorites in the listed page")
+    parser.add_argument("--rounds", type=int, default=300)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    seed = [
+        {"user_id": 1, "item_id": i, "item_name": f"Sourdough loaf no. {i}"}
+        for i in range(1, args.favorites + 1)
+    ]
+    path = f"/favorites/1?limit={args.favorites}"
+
+    runs = [("identity", "identity", "gzip", DEFAULT_LEVELS["gzip"], False)]
+    for encoding in available_encodings(ENCODINGS):
+        default = DEFAULT_LEVELS[encoding]
+        for level in sorted({1, default, 9} if encoding == "gzip" else {default}):
+            runs.append((f"{encoding} {level}", encoding, encoding, level, False))
+        runs.append((f"{encoding} {default} cached", encoding, encoding, default, True))
+
+    baseline = None
+    for name, accept_encoding, encoding, level, cached in runs:
+        with temp_app(seed, **compression_settings(encoding, level, cached)) as app:
+            result = asyncio.run(measure(app, path, accept_encoding, args.rounds))
+        baseline = baseline or result["bytes"]
+        print(
+            f"{name:>15}: {result['bytes']:8d} bytes ({result['bytes'] / baseline:6.1%}) | "
+            f"cpu {result['cpu_ms']:6.2f} ms/req | wall {result['wall_ms']:6.2f} ms/req"
+        )
+
+if __name__ == "__main__":
+    main()
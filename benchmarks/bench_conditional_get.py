@@ -0,0 +1,43 @@
+"""
+Cost of a full GET /favorites/{user_id} compared with revalidating it with
+If-None-Match (a version lookup and an empty 304).
+
+    python -m benchmarks.bench_conditional_get --favorites 100 --rounds 500
+"""
+
+import argparse
+import logging
+
+from benchmarks._harness import temp_database_client, timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--favorites", type=int, default=100, help="favorites in the polled list")
+    parser.add_argument("--rounds", type=int, default=500)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    with temp_database_client() as client:
+        client.post("/favorites/bulk", json={"favorites": [
+            {"user_id": 1, "item_id": i, "item_name": f"Item {i}"} for i in range(1, args.favorites + 1)
+        ]})
+        first = client.get("/favorites/1")
+        etag = first.headers["ETag"]
+
+        with timer() as full:
+            for _ in range(args.rounds):
+                assert client.get("/favorites/1").status_code == 200
+        with timer() as revalidate:
+            for _ in range(args.rounds):
+                assert client.get("/favorites/1", headers={"If-None-Match": etag}).status_code == 304
+
+    full_ms = full["seconds"] / args.rounds * 1000
+    revalidate_ms = revalidate["seconds"] / args.rounds * 1000
+    print(f"full fetch   : {full_ms:7.2f} ms, {len(first.content)} body bytes")
+    print(f"revalidation : {revalidate_ms:7.2f} ms, 0 body bytes")
+    print(f"speedup      : {full_ms / revalidate_ms:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Load test the favorites routes in sync (threadpool) and async (event loop) DB modes.
+
+Each mode gets a freshly seeded on-disk SQLite database and is driven
+in-process over the ASGI transport with a fixed number of concurrent clients.
+
+    python -m benchmarks.bench_db_modes --requests 5000 --concurrency 200
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import time
+
+try:
+    import httpx2 as httpx
+except ModuleNotFoundError:
+    import httpx
+from fastapi import FastAPI
+
+from benchmarks._harness import latency_summary, temp_app
+
+USERS = 500
+ITEMS_PER_USER = 20
+
+# Match the pool to the default 40-thread pool so sync mode never waits on
+# connections its own dependency teardown is holding
+POOL = {"db_pool_size": 40, "db_max_overflow": 0}
+
+
+def seed_rows():
+    return [
+        {"user_id": u, "item_id": i, "item_name": f"Item {i}"}
+        for u in range(1, USERS + 1) for i in range(1, ITEMS_PER_USER + 1)
+    ]
+
+
+def request_paths(count: int):
+    rng = random.Random(42)
+    paths = []
+    for _ in range(count):
+        user_id = rng.randint(1, USERS)
+        item_id = rng.randint(1, ITEMS_PER_USER)
+        paths.append(rng.choice([
+            f"/favorites/{user_id}",
+            f"/favorites/user/{user_id}/item/{item_id}",
+        ]))
+    return paths
+
+
+async def run_load(app: FastAPI, paths, concurrency: int) -> dict:
+    queue = asyncio.Queue()
+    for path in paths:
+        queue.put_nowait(path)
+    latencies = []
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            while not queue.empty():
+                path = queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200, response.text
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return latency_summary(latencies, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    paths = request_paths(args.requests)
+
+    for db_mode in ("sync", "async"):
+        with temp_app(seed_rows(), db_mode=db_mode, compression_encodings="", **POOL) as app:
+            result = asyncio.run(run_load(app, paths, args.concurrency))
+        print(
+            f"{db_mode:>5}: {result['rps']:8.0f} req/s | "
+            f"p50 {result['p50_ms']:7.1f} ms | p95 {result['p95_ms']:7.1f} ms | "
+            f"p99 {result['p99_ms']:7.1f} ms"
+        )
+
+if __name__ == "__main__":
+    main()
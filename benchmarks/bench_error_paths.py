@@ -0,0 +1,147 @@
+"""
+Throughput of the 400/404/409 error paths with the table-driven exception
+handler, compared with the per-class handlers it replaced.
+
+Routes raise the same exceptions the favorites router raises for invalid
+IDs, missing favorites and duplicate adds, without touching the database,
+and the apps are called directly over ASGI so handler cost dominates.
+Logging runs at INFO by default, as in production, into /dev/null.
+
+    python -m benchmarks.bench_error_paths --requests 20000
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from BakeryBackend.exceptions import ValidationError, NotFoundError, ConflictError
+from BakeryBackend.exception_handlers import register_exception_handlers
+from benchmarks._harness import latency_summary
+
+logger = logging.getLogger("benchmarks.legacy_exception_handlers")
+
+ERROR_PATHS = ("/invalid-id", "/missing", "/duplicate")
+
+
+def legacy_error_response(status_code, error_type, message, details=None, request_id=None):
+    """create_error_response as it was before the table-driven handler"""
+    error_response = {
+        "error": {
+            "type": error_type,
+            "message": message,
+            "timestamp": datetime.utcnow().isoformat(),
+            "status_code": status_code
+        }
+    }
+    if details:
+        error_response["error"]["details"] = details
+    if request_id:
+        error_response["error"]["request_id"] = request_id
+    return JSONResponse(status_code=status_code, content=error_response)
+
+
+def legacy_handler(status_code: int, error_type: str, level: int, label: str):
+    async def handler(request: Request, exc):
+        logger.log(level, f"{label}: {exc.message}")
+        return legacy_error_response(
+            status_code=status_code,
+            error_type=error_type,
+            message=exc.message,
+            details=exc.details,
+            request_id=getattr(request.state, 'request_id', None)
+        )
+    return handler
+
+
+def build_app(legacy: bool) -> FastAPI:
+    app = FastAPI()
+    if legacy:
+        app.add_exception_handler(
+            ValidationError, legacy_handler(400, "ValidationError", logging.WARNING, "Custom Validation Error")
+        )
+        app.add_exception_handler(
+            NotFoundError, legacy_handler(404, "NotFoundError", logging.INFO, "Not Found Error")
+        )
+        app.add_exception_handler(
+            ConflictError, legacy_handler(409, "ConflictError", logging.WARNING, "Conflict Error")
+        )
+    else:
+        register_exception_handlers(app)
+
+    @app.get("/invalid-id")
+    async def invalid_id():
+        raise ValidationError(
+            message="Invalid user ID provided",
+            details={"user_id": 0, "requirement": "must be positive integer"}
+        )
+
+    @app.get("/missing")
+    async def missing():
+        raise NotFoundError(message="Favorite not found", details={"favorite_id": 999999})
+
+    @app.get("/duplicate")
+    async def duplicate():
+        raise ConflictError(
+            message="Favorite already exists for this user and item",
+            details={"user_id": 1, "item_id": 101, "existing_favorite_id": 1}
+        )
+
+    return app
+
+
+async def drive(app, path: str, requests: int):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": b"", "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1234),
+        "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(requests):
+        began = time.perf_counter()
+        await app(dict(scope), receive, send)
+        latencies.append(time.perf_counter() - began)
+    return latency_summary(latencies, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20000, help="requests per error path and handler")
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level)
+    logging.getLogger().setLevel(args.log_level)
+    for handler in logging.getLogger().handlers:
+        handler.setStream(open(os.devnull, "w"))
+
+    apps = {"per-class": build_app(legacy=True), "table-driven": build_app(legacy=False)}
+    print(f"{'path':<12} {'handler':<13} {'req/s':>9} {'p50 us':>8} {'p99 us':>8}")
+    for path in ERROR_PATHS:
+        rps = {}
+        for name, app in apps.items():
+            summary = asyncio.run(drive(app, path, args.requests))
+            rps[name] = summary["rps"]
+            print(
+                f"{path:<12} {name:<13} {summary['rps']:>9.0f} "
+                f"{summary['p50_ms'] * 1000:>8.1f} {summary['p99_ms'] * 1000:>8.1f}"
+            )
+        print(f"{'':<12} {'gain':<13} {rps['table-driven'] / rps['per-class']:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
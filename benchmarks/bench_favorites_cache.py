@@ -0,0 +1,46 @@
+"""
+Latency of repeated GET /favorites/{user_id} with and without the list cache.
+
+    python -m benchmarks.bench_favorites_cache --favorites 200 --reads 2000
+"""
+
+import argparse
+import logging
+import time
+
+from benchmarks._harness import temp_database_client, latency_summary
+
+
+def bench(cache_backend: str, favorites: int, reads: int):
+    """Latency summary of the reads, and the stats of the app's cache"""
+    with temp_database_client(cache_backend=cache_backend) as client:
+        client.post("/favorites/bulk", json={"favorites": [
+            {"user_id": 1, "item_id": i, "item_name": f"Item {i}"} for i in range(1, favorites + 1)
+        ]})
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(reads):
+            t0 = time.perf_counter()
+            assert client.get("/favorites/1").status_code == 200
+            latencies.append(time.perf_counter() - t0)
+        return latency_summary(latencies, time.perf_counter() - start), client.app.state.favorites_cache.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--favorites", type=int, default=200)
+    parser.add_argument("--reads", type=int, default=2000)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    for name, cache_backend in (("no cache", "none"), ("lru cache", "memory")):
+        result, stats = bench(cache_backend, args.favorites, args.reads)
+        print(
+            f"{name:>9}: {result['rps']:8.0f} req/s | p50 {result['p50_ms']:6.2f} ms | "
+            f"p99 {result['p99_ms']:6.2f} ms"
+        )
+    print(f"lru stats: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Writes/sec of POST /favorites/ with a commit per request versus group commit.
+
+Each mode gets a fresh on-disk SQLite database and is driven in-process over
+the ASGI transport by concurrent clients adding distinct favorites (a
+"heart" storm). --synchronous FULL makes every commit fsync, as a durable
+deployment would.
+
+    python -m benchmarks.bench_group_commit --writes 5000 --concurrency 100
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+try:
+    import httpx2 as httpx
+except ModuleNotFoundError:
+    import httpx
+from fastapi import FastAPI
+
+from benchmarks._harness import latency_summary, temp_app
+
+# Enough connections that the sync threadpool never waits on the pool
+POOL = {"db_pool_size": 40, "db_max_overflow": 0}
+
+
+async def run_writes(app: FastAPI, writes: int, concurrency: int) -> dict:
+    queue = asyncio.Queue()
+    for i in range(writes):
+        queue.put_nowait({"user_id": i % 1000 + 1, "item_id": i // 1000 + 1, "item_name": "Heart"})
+    latencies = []
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            while not queue.empty():
+                payload = queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.post("/favorites/", json=payload)
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200, response.text
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return latency_summary(latencies, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writes", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--synchronous", default="FULL", help="SQLite PRAGMA synchronous")
+    parser.add_argument("--max-ops", type=int, default=256)
+    parser.add_argument("--max-delay-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    for name, group_commit in (("per-request commit", False), ("group commit", True)):
+        with temp_app(
+            sqlite_synchronous=args.synchronous, group_commit=group_commit,
+            group_commit_max_ops=args.max_ops, group_commit_max_delay_ms=args.max_delay_ms,
+            compression_encodings="", **POOL
+        ) as app:
+            result = asyncio.run(run_writes(app, args.writes, args.concurrency))
+        print(
+            f"{name:>18}: {result['rps']:8.0f} writes/s | "
+            f"p50 {result['p50_ms']:7.1f} ms | p99 {result['p99_ms']:7.1f} ms"
+        )
+
+if __name__ == "__main__":
+    main()
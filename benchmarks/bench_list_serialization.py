@@ -0,0 +1,76 @@
+"""
+Time GET /favorites/{user_id} for pages of 10, 1k and 100k rows with the
+default response_model path and with BAKERY_FAST_JSON_LISTS.
+
+    python -m benchmarks.bench_list_serialization --rounds 20
+"""
+
+import argparse
+import dataclasses
+import logging
+import os
+
+# Allow a whole 100k-row list in one page; must be set before settings load
+os.environ.setdefault("BAKERY_PAGE_MAX_LIMIT", "100000")
+
+from benchmarks._harness import temp_database_client, timer  # noqa: E402
+from BakeryBackend import responses  # noqa: E402
+from BakeryBackend.routers.favorites import BULK_MAX_ITEMS  # noqa: E402
+
+PAGE_SIZES = (10, 1000, 100000)
+
+
+def seed(client, user_id: int, rows: int):
+    for start in range(0, rows, BULK_MAX_ITEMS):
+        response = client.post("/favorites/bulk", json={"favorites": [
+            {"user_id": user_id, "item_id": i, "item_name": f"Item {i}"}
+            for i in range(start + 1, min(rows, start + BULK_MAX_ITEMS) + 1)
+        ]})
+        assert response.status_code == 200
+
+
+def encoder_name() -> str:
+    """The encoder the fast path uses in this environment"""
+    if responses.orjson is not None:
+        return f"orjson {responses.orjson.__version__}"
+    return "json (standard library; orjson is not installed)"
+
+
+def set_fast_json_lists(app, enabled: bool):
+    app.state.settings = dataclasses.replace(app.state.settings, fast_json_lists=enabled)
+
+
+def time_page(client, user_id: int, rows: int, rounds: int) -> float:
+    """Mean milliseconds per request, checking the page is complete"""
+    with timer() as elapsed:
+        for _ in range(rounds):
+            response = client.get(f"/favorites/{user_id}", params={"limit": rows})
+            assert response.status_code == 200
+    assert len(response.json()) == rows
+    return elapsed["seconds"] / rounds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=20, help="requests per page size and mode")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    with temp_database_client() as client:
+        for user_id, rows in enumerate(PAGE_SIZES, start=1):
+            seed(client, user_id, rows)
+
+        print(f"fast path encoder: {encoder_name()}")
+        print(f"{'rows':>8} {'default ms':>12} {'fast ms':>10} {'speedup':>8}")
+        for user_id, rows in enumerate(PAGE_SIZES, start=1):
+            # Fewer rounds for the largest page keeps the run short
+            rounds = max(1, args.rounds // 10) if rows >= 100000 else args.rounds
+            set_fast_json_lists(client.app, False)
+            default_ms = time_page(client, user_id, rows, rounds)
+            set_fast_json_lists(client.app, True)
+            fast_ms = time_page(client, user_id, rows, rounds)
+            print(f"{rows:>8} {default_ms:>12.2f} {fast_ms:>10.2f} {default_ms / fast_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
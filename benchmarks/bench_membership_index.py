@@ -0,0 +1,76 @@
+"""
+Memory per user and lookup latency of the membership index, compared with
+the indexed (user_id, item_id) query it replaces.
+
+    python -m benchmarks.bench_membership_index --users 10000 --favorites 50
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import create_engine, insert, select
+
+from BakeryBackend.database import Base
+from BakeryBackend.membership import MembershipIndex
+from BakeryBackend.models import Favorite as FavoriteModel
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--favorites", type=int, default=50, help="favorites per user")
+    parser.add_argument("--lookups", type=int, default=100000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    rows = {
+        user_id: [(item_id, user_id * args.favorites + n)
+                  for n, item_id in enumerate(rng.sample(range(1, 100000), args.favorites))]
+        for user_id in range(1, args.users + 1)
+    }
+
+    index = MembershipIndex(max_users=args.users, max_bytes=1 << 40)
+    tracemalloc.start()
+    for user_id, user_rows in rows.items():
+        index.load(user_id, user_rows, 0)
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    probes = [(rng.randint(1, args.users), rng.randint(1, 100000)) for _ in range(args.lookups)]
+    start = time.perf_counter()
+    for user_id, item_id in probes:
+        index.get(user_id).favorite_id(item_id)
+    index_ns = (time.perf_counter() - start) / len(probes) * 1e9
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(insert(FavoriteModel), [
+                {"id": favorite_id, "user_id": user_id, "item_id": item_id, "item_name": "x"}
+                for user_id, user_rows in rows.items() for item_id, favorite_id in user_rows
+            ])
+        query = select(FavoriteModel.id).where(
+            FavoriteModel.user_id == 0, FavoriteModel.item_id == 0
+        )
+        db_probes = probes[:5000]
+        with engine.connect() as conn:
+            start = time.perf_counter()
+            for user_id, item_id in db_probes:
+                conn.execute(query, {"user_id_1": user_id, "item_id_1": item_id}).first()
+            db_ns = (time.perf_counter() - start) / len(db_probes) * 1e9
+        engine.dispose()
+
+    print(f"users warmed          : {args.users} x {args.favorites} favorites")
+    print(f"index accounting      : {index.stats()['bytes'] / args.users:8.0f} bytes/user")
+    print(f"tracemalloc measured  : {traced / args.users:8.0f} bytes/user")
+    print(f"index lookup          : {index_ns:8.0f} ns")
+    print(f"indexed SQLite query  : {db_ns:8.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
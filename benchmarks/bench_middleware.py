@@ -0,0 +1,102 @@
+"""
+Per-request overhead of RequestMiddleware, compared with the previous
+BaseHTTPMiddleware implementation and with no middleware at all.
+
+The apps are called directly over ASGI (no HTTP client), so the numbers
+are dominated by middleware cost.
+
+    python -m benchmarks.bench_middleware --requests 20000
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+import uuid
+
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from BakeryBackend.middleware import RequestMiddleware
+
+logger = logging.getLogger("benchmarks.legacy_middleware")
+
+
+class LegacyRequestMiddleware(BaseHTTPMiddleware):
+    """The BaseHTTPMiddleware version RequestMiddleware replaced"""
+
+    async def dispatch(self, request, call_next):
+        request_id = str(uuid.uuid4())
+        request.state.request_id = request_id
+        start_time = time.time()
+        logger.info(
+            f"Request started - ID: {request_id} | "
+            f"Method: {request.method} | "
+            f"URL: {request.url} | "
+            f"Client: {request.client.host if request.client else 'unknown'}"
+        )
+        response = await call_next(request)
+        duration = time.time() - start_time
+        response.headers["X-Request-ID"] = request_id
+        logger.info(
+            f"Request completed - ID: {request_id} | "
+            f"Status: {response.status_code} | "
+            f"Duration: {duration:.3f}s"
+        )
+        return response
+
+
+def build_app(middleware_class=None):
+    app = Starlette(routes=[Route("/", lambda request: PlainTextResponse("ok"))])
+    if middleware_class is not None:
+        app.add_middleware(middleware_class)
+    return app
+
+
+async def drive(app, requests: int) -> float:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/", "raw_path": b"/", "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1234), "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--log-level", default="WARNING", help="INFO includes the cost of emitting log lines")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level)
+    logging.getLogger().setLevel(args.log_level)
+    # Keep emitted lines out of the measurement when logging at INFO
+    for handler in logging.getLogger().handlers:
+        handler.setStream(open(os.devnull, "w"))
+
+    baseline = asyncio.run(drive(build_app(), args.requests))
+    print(f"no middleware          : {baseline * 1e6:8.1f} us/request")
+    for name, middleware_class in (("BaseHTTPMiddleware", LegacyRequestMiddleware),
+                                   ("pure ASGI", RequestMiddleware)):
+        per_request = asyncio.run(drive(build_app(middleware_class), args.requests))
+        print(
+            f"{name:<23}: {per_request * 1e6:8.1f} us/request "
+            f"(+{(per_request - baseline) * 1e6:.1f} us overhead)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Writes/sec of POST /favorites/ with storage sharded over 1, 4 and 8 SQLite files.
+
+Each layout gets fresh shard files and is driven in-process over the ASGI
+transport by concurrent clients adding favorites for many distinct users,
+so writes spread over every shard. With one shard, all writes queue on one
+file's write lock. With more shards, commits to different files overlap.
+--synchronous FULL makes every commit fsync, as a durable deployment would.
+
+    python -m benchmarks.bench_sharding --writes 5000 --concurrency 100 --shards 1,4,8
+"""
+
+import argparse
+import asyncio
+import logging
+
+from benchmarks._harness import temp_app
+from benchmarks.bench_group_commit import POOL, run_writes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writes", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--shards", default="1,4,8", help="comma-separated shard counts to compare")
+    parser.add_argument("--synchronous", default="FULL", help="SQLite PRAGMA synchronous")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    baseline = None
+    for shards in (int(count) for count in args.shards.split(",")):
+        with temp_app(
+            db_shards=shards, sqlite_synchronous=args.synchronous, compression_encodings="", **POOL
+        ) as app:
+            result = asyncio.run(run_writes(app, args.writes, args.concurrency))
+        baseline = baseline or result["rps"]
+        print(
+            f"{shards:>3} shard{'s' if shards > 1 else ' '}: {result['rps']:8.0f} writes/s "
+            f"({result['rps'] / baseline:4.1f}x) | p50 {result['p50_ms']:7.1f} ms | p99 {result['p99_ms']:7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Thundering herd on the favorites listings, with and without single flight.
+
+Each wave sends --herd identical concurrent requests for the same page. By
+default that is GET /favorites/item/{item_id}/users of a popular item, or
+GET /favorites/{user_id} with --path user. The requests are driven
+in-process over the ASGI transport, so the sync endpoints run on the
+threadpool as under uvicorn. The report counts the SQL statements that
+reach the database and the request latencies over all waves.
+
+    python -m benchmarks.bench_single_flight --herd 200 --waves 20 --window-ms 5
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+try:
+    import httpx2 as httpx
+except ModuleNotFoundError:
+    import httpx
+from fastapi import FastAPI
+from sqlalchemy import event
+
+from benchmarks._harness import latency_summary, temp_app, timer
+
+PATHS = {"item": "/favorites/item/1/users", "user": "/favorites/1"}
+
+
+async def herd(app: FastAPI, path: str, size: int, waves: int):
+    latencies = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def get():
+            start = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.text
+
+        await get()  # warm up the pool and the route
+        latencies.clear()
+        with timer() as elapsed:
+            for _ in range(waves):
+                await asyncio.gather(*(get() for _ in range(size)))
+    return latencies, elapsed["seconds"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--path", choices=sorted(PATHS), default="item")
+    parser.add_argument("--herd", type=int, default=200, help="concurrent identical requests per wave")
+    parser.add_argument("--waves", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=100, help="favorites on the requested page")
+    parser.add_argument("--window-ms", type=float, default=5.0, help="coalescing window for the last run")
+    parser.add_argument("--fast-json", action="store_true", help="run with BAKERY_FAST_JSON_LISTS")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    # item 1 is favorited by users 1..rows, and user 1 favorites items 1..rows
+    seed = [
+        {"user_id": i, "item_id": 1, "item_name": "Croissant"} for i in range(1, args.rows + 1)
+    ] + [
+        {"user_id": 1, "item_id": i, "item_name": f"Pastry {i}"} for i in range(2, args.rows + 1)
+    ]
+    runs = [
+        ("off", {"single_flight": False}),
+        ("single flight", {"single_flight": True}),
+        (f"window {args.window_ms:g} ms", {"single_flight": True, "single_flight_window_ms": args.window_ms}),
+    ]
+    requests = args.herd * args.waves
+    print(f"{args.waves} waves of {args.herd} x GET {PATHS[args.path]}")
+    for name, overrides in runs:
+        with temp_app(
+            seed, fast_json_lists=args.fast_json, compression_encodings="",
+            db_pool_size=20, db_max_overflow=args.herd, **overrides
+        ) as app:
+            statements = [0]
+
+            def count(conn, cursor, statement, parameters, context, executemany):
+                statements[0] += 1
+
+            event.listen(app.state.database.engine, "before_cursor_execute", count)
+            latencies, seconds = asyncio.run(herd(app, PATHS[args.path], args.herd, args.waves))
+        stats = latency_summary(latencies, seconds)
+        queries = statements[0]
+        print(
+            f"{name:>16}: {queries:6d} queries ({queries / requests:5.2f}/req) | "
+            f"{stats['rps']:7.0f} req/s | p50 {stats['p50_ms']:7.1f} ms | p99 {stats['p99_ms']:7.1f} ms"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+Load test every favorites endpoint, in-process and against a real server.
+
+Each target gets its own database seeded with --users users holding
+--favorites-per-user favorites each, drawn from --items items (seeded RNG,
+so every target and run sees the same data):
+
+  asgi     the app from create_app(), driven over the ASGI transport
+  uvicorn  `python -m BakeryBackend serve` on a local port, over TCP
+
+Every scenario sends --requests requests from --concurrency clients; reads
+run before writes so they see the seeded data. For each target and scenario
+it reports throughput, p50/p95/p99 latency, non-2xx responses and, for the
+asgi target, the average per-request peak of traced allocations (KiB above
+the baseline, from tracemalloc in a separate sequential pass so tracing does
+not skew the timings).
+
+--json writes the results with run metadata (commit, Python, arguments);
+--compare prints throughput and p99 against such a file from an earlier run.
+
+    python -m benchmarks.bench_suite --users 1000 --items 5000 --requests 2000 --json results.json
+    python -m benchmarks.bench_suite --targets asgi --compare results.json
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import signal
+import socket
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import httpx2 as httpx
+except ModuleNotFoundError:
+    import httpx
+
+from benchmarks._harness import latency_summary, temp_app
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGETS = ("asgi", "uvicorn")
+POOL = {"db_pool_size": 40, "db_max_overflow": 0}
+ALLOCATION_SAMPLES = 50
+
+# (method, url, json body or None)
+Request = Tuple[str, str, Optional[dict]]
+
+
+@dataclasses.dataclass
+class Workload:
+    """Seeded data the scenarios draw request parameters from"""
+    users: int
+    items: int
+    # Seeded favorites as (favorite_id, user_id), shuffled; deletes pop from it
+    deletable: List[Tuple[int, int]]
+    rng: random.Random
+    new_item_ids: "itertools.count" = dataclasses.field(default=None)
+
+    def __post_init__(self):
+        # Items above the seeded range, so every add creates a new favorite
+        self.new_item_ids = itertools.count(self.items + 1)
+
+    def user(self) -> int:
+        return self.rng.randint(1, self.users)
+
+    def item(self) -> int:
+        return self.rng.randint(1, self.items)
+
+
+def _new_favorite(w: Workload) -> dict:
+    item_id = next(w.new_item_ids)
+    return {"user_id": w.user(), "item_id": item_id, "item_name": f"Item {item_id}"}
+
+
+def _delete(w: Workload) -> Request:
+    favorite_id, user_id = w.deletable.pop()
+    return "DELETE", f"/favorites/{favorite_id}?user_id={user_id}", None
+
+
+SCENARIOS: Dict[str, Callable[[Workload], Request]] = {
+    "list_user": lambda w: ("GET", f"/favorites/{w.user()}", None),
+    "list_item_users": lambda w: ("GET", f"/favorites/item/{w.item()}/users", None),
+    "item_count": lambda w: ("GET", f"/favorites/item/{w.item()}/count", None),
+    "popular": lambda w: ("GET", "/favorites/popular?limit=10", None),
+    "check_one": lambda w: ("GET", f"/favorites/user/{w.user()}/item/{w.item()}", None),
+    "check_batch": lambda w: (
+        "POST", f"/favorites/user/{w.user()}/check",
+        {"item_ids": w.rng.sample(range(1, w.items + 1), min(50, w.items))}
+    ),
+    "export_user": lambda w: ("GET", f"/favorites/export?user_id={w.user()}", None),
+    "add": lambda w: ("POST", "/favorites/", _new_favorite(w)),
+    "bulk_add": lambda w: ("POST", "/favorites/bulk", {"favorites": [_new_favorite(w) for _ in range(20)]}),
+    "delete": _delete,
+    # After delete, so it cannot remove favorites that delete's requests name
+    "bulk_delete": lambda w: (
+        "POST", f"/favorites/user/{w.user()}/delete",
+        {"item_ids": w.rng.sample(range(1, w.items + 1), min(10, w.items))}
+    ),
+}
+
+
+def seed_rows(users: int, items: int, per_user: int, seed_value: int) -> List[dict]:
+    """The seeded favorites; inserted in order into an empty table, their ids are 1..n"""
+    rng = random.Random(seed_value)
+    return [
+        {"user_id": user_id, "item_id": item_id, "item_name": f"Item {item_id}"}
+        for user_id in range(1, users + 1)
+        for item_id in rng.sample(range(1, items + 1), min(per_user, items))
+    ]
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def start_server(database_url: str, port: int, workers: int) -> subprocess.Popen:
+    env = dict(
+        os.environ, PYTHONPATH=ROOT,
+        BAKERY_DATABASE_URL=database_url, BAKERY_REQUEST_LOG_SAMPLE_RATE="0"
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "BakeryBackend", "serve", "--port", str(port), "--workers", str(workers)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("server did not become healthy")
+
+
+async def send_request(client, request: Request):
+    method, url, body = request
+    response = await client.request(method, url, json=body)
+    await response.aread()
+    return response
+
+
+async def run_scenario(client, build: Callable[[Workload], Request], workload: Workload,
+                       requests: int, concurrency: int) -> dict:
+    # Build every request up front so the RNG is not timed
+    pending = [build(workload) for _ in range(requests)]
+    pending.reverse()
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while pending:
+            request = pending.pop()
+            start = time.perf_counter()
+            response = await send_request(client, request)
+            latencies.append(time.perf_counter() - start)
+            if not 200 <= response.status_code < 300:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result = latency_summary(latencies, time.perf_counter() - start)
+    result["errors"] = errors
+    return result
+
+
+async def allocation_peak_kib(client, build: Callable[[Workload], Request], workload: Workload) -> float:
+    """Average per-request peak of traced memory above the pre-request level, in KiB"""
+    requests = [build(workload) for _ in range(ALLOCATION_SAMPLES)]
+    peaks = []
+    tracemalloc.start()
+    try:
+        for request in requests:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            await send_request(client, request)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return sum(peaks) / len(peaks) / 1024
+
+
+async def run_target(target: str, client, workload: Workload, scenarios: List[str], args) -> List[dict]:
+    results = []
+    for name in scenarios:
+        result = await run_scenario(client, SCENARIOS[name], workload, args.requests, args.concurrency)
+        result["alloc_peak_kib"] = (
+            await allocation_peak_kib(client, SCENARIOS[name], workload) if target == "asgi" else None
+        )
+        results.append({"target": target, "scenario": name, **result})
+        print_result(results[-1])
+    return results
+
+
+def print_result(result: dict):
+    alloc = result["alloc_peak_kib"]
+    print(
+        f"{result['target']:>8} {result['scenario']:>16}: {result['rps']:8.0f} req/s | "
+        f"p50 {result['p50_ms']:7.2f} | p95 {result['p95_ms']:7.2f} | p99 {result['p99_ms']:7.2f} ms | "
+        f"errors {result['errors']:4d} | alloc {'-' if alloc is None else f'{alloc:8.1f} KiB'}"
+    )
+
+
+def print_comparison(results: List[dict], baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = {(r["target"], r["scenario"]): r for r in json.load(f)["results"]}
+    print(f"\ncompared with {baseline_path}:")
+    for result in results:
+        before = baseline.get((result["target"], result["scenario"]))
+        if before is None or not before["rps"] or not before["p99_ms"]:
+            continue
+        print(
+            f"{result['target']:>8} {result['scenario']:>16}: throughput {result['rps'] / before['rps']:6.2f}x | "
+            f"p99 {result['p99_ms'] / before['p99_ms']:6.2f}x"
+        )
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--favorites-per-user", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--targets", default=",".join(TARGETS))
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset to run")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes for the uvicorn target")
+    parser.add_argument("--json", help="write results and run metadata to this file")
+    parser.add_argument("--compare", help="results file from an earlier run to compare against")
+    args = parser.parse_args()
+
+    targets = [t for t in args.targets.split(",") if t]
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = set(targets) - set(TARGETS) | set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown targets/scenarios: {sorted(unknown)}")
+
+    logging.disable(logging.INFO)
+    results = []
+    rows = seed_rows(args.users, args.items, args.favorites_per_user, args.seed)
+    seeded = [(favorite_id, row["user_id"]) for favorite_id, row in enumerate(rows, start=1)]
+    deletes_needed = args.requests + ALLOCATION_SAMPLES
+    if "delete" in scenarios and len(seeded) < deletes_needed:
+        parser.error(f"the delete scenario needs at least {deletes_needed} seeded favorites")
+
+    for target in targets:
+        rng = random.Random(args.seed)
+        deletable = list(seeded)
+        rng.shuffle(deletable)
+        workload = Workload(args.users, args.items, deletable, rng)
+
+        with temp_app(rows, **POOL) as app:
+            if target == "asgi":
+                async def run_asgi():
+                    transport = httpx.ASGITransport(app=app)
+                    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                        return await run_target(target, client, workload, scenarios, args)
+                results.extend(asyncio.run(run_asgi()))
+            else:
+                port = free_port()
+                server = start_server(app.state.settings.database_url, port, args.workers)
+                try:
+                    async def run_uvicorn():
+                        limits = httpx.Limits(max_connections=args.concurrency)
+                        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits) as client:
+                            return await run_target(target, client, workload, scenarios, args)
+                    results.extend(asyncio.run(run_uvicorn()))
+                finally:
+                    server.send_signal(signal.SIGTERM)
+                    server.wait(timeout=60)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "meta": {
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "commit": git_commit(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "cpus": os.cpu_count(),
+                    "args": vars(args),
+                },
+                "results": results,
+            }, f, indent=2)
+    if args.compare:
+        print_comparison(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()